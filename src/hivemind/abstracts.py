@@ -2,14 +2,19 @@
 from __future__ import annotations
 from abc import ABC, abstractmethod, abstractproperty
 from carg_io.abstracts import ParameterSet, Parameter, units
-from typing import List, Dict, Tuple
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, List, Dict, NamedTuple, Tuple
+import hashlib
+import threading
+import numpy as np
 
 class Base(ABC):
     """Base offers a template for create parameteric object supporting finite states.
     
     E.g. A class BallastTank(Base) will accept a ParameterSet outlining the static properties
     of the tank (such as width, height, length) and may have a finite number of different
-    states, such as Empty, InterMediate, Full.
+    states, such as Empty, InterMediate, Full (see hivemind.tanks).
 
     see https://refactoring.guru/design-patterns/template-method
     
@@ -40,9 +45,64 @@ class Base(ABC):
     So now, the structure will return different values for the same method,
     depending on what state is is.
 
+    -------------------------------------------------------------------------------
+
+    CACHING:
+
+    The methods listed in `_cached_methods` are memoized per instance. Results are
+    keyed on the method arguments, a hash of the parameters and the active state, and
+    kept in a bounded LRU cache of `cache_size` entries. The cache is cleared when
+    `change_state` runs or when a parameter value changed since the previous call.
+    Subclasses get this automatically; see `cache_info` for hit and miss counters.
 
+    If `result_store` is set (on Base, a subclass or an instance) to a
+    hivemind.store.ResultStore, results missing from the memory cache are looked up
+    on disk before they are computed, and stored after.
     
     """
+    _cached_methods: Tuple[str, ...] = ()
+    cache_size: int = 32
+    result_store = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for name in cls._cached_methods:
+            method = cls.__dict__.get(name)
+            if callable(method) and not getattr(method, "__isabstractmethod__", False):
+                setattr(cls, name, cached(method))
+        method = cls.__dict__.get("change_state")
+        if callable(method) and not getattr(method, "__isabstractmethod__", False):
+            setattr(cls, "change_state", _invalidates_cache(method))
+
+    def _get_cache(self) -> _Cache:
+        cache = self.__dict__.get("_cache")
+        if cache is None:  # setdefault is atomic, threads racing here share one cache
+            cache = self.__dict__.setdefault("_cache", _Cache())
+        return cache
+
+    def cache_info(self) -> CacheInfo:
+        """Return the hit and miss counters and the size of the result cache"""
+        cache = self._get_cache()
+        return CacheInfo(cache.hits, cache.misses, self.cache_size, len(cache.entries))
+
+    def cache_clear(self):
+        """Drop all cached results (the counters are kept)"""
+        self._get_cache().clear()
+
+    def _cache_key(self) -> Tuple[str, str|None]:
+        """Return (parameter hash, state name) identifying the current configuration.
+        The hash includes the configuration of the Base objects held by this one, such
+        as the Structure of a Naval."""
+        try:
+            state = type(self.state).__name__
+        except NotImplementedError:
+            state = None
+        parameters = parameter_hash(self.parameters)
+        held = [v._cache_key() for v in vars(self).values() if isinstance(v, Base)]
+        if held:
+            parameters = hashlib.sha1(repr((parameters, held)).encode()).hexdigest()
+        return parameters, state
+
     @abstractproperty
     def parameters(self) -> ParameterSet:
         ...
@@ -71,6 +131,114 @@ class Base(ABC):
     
 
 
+class CacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+
+
+class _Cache:
+    """Per instance LRU storage used by `cached`. The lock guards the entries and the
+    counters, so one instance can be used from several threads."""
+
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.parameters = None
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.RLock()
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        del state["lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.RLock()
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.parameters = None
+
+
+def cached(method):
+    """Memoize a method of a Base subclass, see Base for the caching rules.
+    Calls with unhashable arguments bypass the cache. The cache is locked during lookup
+    and insertion only; results are computed outside the lock, so concurrent misses
+    of the same call may compute it twice."""
+    if getattr(method, "_cached", False):
+        return method
+
+    @wraps(method)
+    def wrapper(self:Base, *args, **kwargs):
+        cache = self._get_cache()
+        parameters, state = self._cache_key()
+        hashable = True
+        key = (method.__name__, state, args, tuple(sorted(kwargs.items())))
+        compute = lambda: method(self, *args, **kwargs)
+        if self.result_store is not None:
+            store = self.result_store
+            compute = lambda: store.lookup(self, method.__name__, args, kwargs, lambda: method(self, *args, **kwargs))
+        with cache.lock:
+            if parameters != cache.parameters:  # a parameter changed: older entries are stale
+                cache.clear()
+                cache.parameters = parameters
+            try:
+                result = cache.entries[key]
+            except KeyError:
+                cache.misses += 1
+            except TypeError:  # unhashable arguments
+                hashable = False
+            else:
+                cache.entries.move_to_end(key)
+                cache.hits += 1
+                return result
+        if not hashable:
+            return compute()
+
+        result = compute()
+        with cache.lock:
+            if cache.parameters == parameters:  # not invalidated while computing
+                cache.entries[key] = result
+                while len(cache.entries) > self.cache_size:
+                    cache.entries.popitem(last=False)
+        return result
+
+    wrapper._cached = True
+    return wrapper
+
+
+def _invalidates_cache(method):
+    if getattr(method, "_invalidates_cache", False):
+        return method
+
+    @wraps(method)
+    def wrapper(self:Base, *args, **kwargs):
+        out = method(self, *args, **kwargs)
+        self._get_cache().clear()
+        return out
+
+    wrapper._invalidates_cache = True
+    return wrapper
+
+
+def parameter_hash(parameters:ParameterSet) -> str:
+    """Return a stable hash of the name and values of a ParameterSet.
+
+    Values are compared in their default unit, so setting a length as 1000 mm or 1 m
+    gives the same hash. The hash does not depend on the Python process, so it can be
+    used as a key for results stored on disk.
+    """
+    items = [parameters.name]
+    for parameter in parameters:
+        items.append(f"{parameter.name}={parameter.normalized_value}")
+    return hashlib.sha1("|".join(items).encode()).hexdigest()
+
+
+
 class State(ABC):
     """
     Abstract base class that represents one of the finite states a Structure may take on.
@@ -82,6 +250,57 @@ class State(ABC):
         self.base = base
 
 
+class DeltaState(State):
+    """A state defined as a set of changes (deltas) on top of a parent state.
+
+    E.g. a Weathered state adds a marine growth thickness, extra mass per area and a
+    larger drag diameter to the InSitu state. The deltas work on per-item attribute
+    arrays (one value per panel or per line). `apply` returns a new attribute
+    dictionary that shares every unchanged array with its input and only allocates
+    the arrays that change (copy-on-write), so switching states costs O(changed data)
+    instead of a rebuild.
+    """
+
+    parent: str|None = None  # name of the parent state in base.possible_states
+
+    def get_deltas(self) -> Dict[str, Any]:
+        """Return the increments w.r.t. the parent state by attribute name, as
+        scalars or arrays with one value per item. May depend on self.base.parameters."""
+        return {}
+
+    def where(self, context) -> np.ndarray|None:
+        """Optionally return a boolean mask of the items the deltas apply to, e.g. only
+        the submerged panels of a mesh (`context`)."""
+        return None
+
+    def chain(self) -> List[DeltaState]:
+        """Return the delta states from the root down to (and including) self"""
+        chain = []
+        state = self
+        while isinstance(state, DeltaState):
+            if state in chain:
+                raise ValueError(f"Circular parent states: {[type(s).__name__ for s in chain]}")
+            chain.append(state)
+            state = self.base.possible_states[state.parent] if state.parent else None
+        return chain[::-1]
+
+    def apply(self, attributes:Dict[str, np.ndarray], n:int, context=None) -> Dict[str, np.ndarray]:
+        """Return the attributes of n items in this state, given those of the root state"""
+        out = dict(attributes)
+        for state in self.chain():
+            mask = state.where(context)
+            for name, increment in state.get_deltas().items():
+                current = out.get(name)
+                new = np.zeros(n) if current is None else np.array(current, dtype=np.float64)
+                increment = np.broadcast_to(np.asarray(increment, dtype=np.float64), (n,))
+                if mask is None:
+                    new += increment
+                else:
+                    new[mask] += increment[mask]
+                out[name] = new
+        return out
+
+
 
 class Inertia(ABC):
     """Describes the inertial properties of a point mass"""
@@ -118,6 +337,19 @@ class Mesh(ABC):
 
 
 
+def magnitude(value, unit:str):
+    """Return the magnitude of `value` expressed in `unit`.
+
+    Values carrying a unit (e.g. a Parameter or a pint Quantity) are converted,
+    plain numbers and arrays are assumed to be expressed in `unit` already.
+    """
+    if isinstance(value, Parameter):
+        return value[unit]
+    if hasattr(value, "m_as"):
+        return value.m_as(unit)
+    return value
+
+
 def test_subclass(instance:Base):
 
     assert isinstance(instance, Base)
@@ -0,0 +1,244 @@
+"""Performance benchmarks of the core analyses, with baseline comparison.
+
+Every benchmark runs on synthetic inputs at three sizes (small, medium, large): a
+parametric hull, tapered towards bow and stern, meshed at increasing resolution, and
+mooring layouts with an increasing number of bundles and lines. Timed are
+
+    mesh:       building the hull mesh and its centroids, normals and areas
+    inertia:    aggregating point masses into one rigid-body mass matrix
+    stiffness:  hydrostatics and stiffness matrices for a batch of positions
+    periods:    batched natural periods of the same positions
+    mooring:    quasi-static solution of all lines for a batch of offsets
+
+For every benchmark and size the best time over `repeat` samples (each long enough to
+be measured reliably, see timeit.Timer.autorange), the throughput (items per second,
+e.g. panels or line solutions) and the peak memory allocated during one run are
+recorded. Results can be saved as a JSON baseline and later runs compared against
+it, e.g. before a release:
+
+    python -m hivemind.benchmark --sizes small medium --save baseline.json
+    python -m hivemind.benchmark --sizes small medium --compare baseline.json
+
+The comparison exits with status 1 if any benchmark got slower or used more memory than
+the baseline by more than the tolerance. Timings are only comparable on the same machine.
+"""
+from __future__ import annotations
+from . import __version__
+from .hydrostatics import hydrostatics, stiffness_matrices
+from .inertia import InertiaCollection
+from .mesh import ArrayMesh, box
+from .mooring import MooringSystem, MooringSystemParameters
+from .periods import natural_periods
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Sequence, Tuple
+import argparse
+import json
+import platform
+import sys
+import timeit
+import tracemalloc
+import numpy as np
+
+
+RHO = 1025.0
+
+# per size: hull mesh divisions, point masses, hydrostatic positions,
+# mooring (bundles, lines per bundle) and offsets
+SIZES = {
+    "small": dict(panels=(20, 8, 4), masses=1_000, positions=10, mooring=(3, 2), offsets=100),
+    "medium": dict(panels=(100, 40, 20), masses=100_000, positions=50, mooring=(4, 4), offsets=2_000),
+    "large": dict(panels=(300, 120, 60), masses=1_000_000, positions=200, mooring=(6, 6), offsets=20_000),
+}
+
+
+class BenchmarkResult(NamedTuple):
+    name: str
+    size: str
+    items: int           # units of work in one run, see `throughput`
+    seconds: float       # best of the repeats
+    throughput: float    # items per second
+    peak_memory: int     # bytes allocated at most during one run
+
+
+class Regression(NamedTuple):
+    name: str
+    size: str
+    metric: str          # "seconds" or "peak_memory"
+    baseline: float
+    current: float
+
+    @property
+    def ratio(self) -> float:
+        return self.current / self.baseline
+
+
+def synthetic_hull(length:float=100.0, width:float=40.0, depth:float=20.0, nx:int=10, ny:int=4, nz:int=4) -> ArrayMesh:
+    """Return a closed box-like hull whose width narrows towards bow and stern"""
+    mesh = box(length, width, depth, nx, ny, nz)
+    nodes = mesh.nodes.copy()
+    x = 2*nodes[:, 0]/length
+    nodes[:, 1] *= 1 - 0.6*x**4
+    return ArrayMesh(nodes, mesh.indptr, mesh.indices)
+
+
+def synthetic_mooring(bundles:int, lines:int) -> MooringSystem:
+    p = MooringSystemParameters()
+    p.NumberOfBundles[None] = bundles
+    p.NumberOfLinesPerBundle[None] = lines
+    return MooringSystem(p)
+
+
+def _positions(n:int, rng:np.random.Generator) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    return rng.uniform(6, 14, n), rng.uniform(-2, 2, n), rng.uniform(-5, 5, n)
+
+
+# Every setup returns (run, items): `run` is the timed call, everything else is prepared.
+
+def _mesh(size, rng):
+    nx, ny, nz = size["panels"]
+    def run():
+        mesh = synthetic_hull(nx=nx, ny=ny, nz=nz)
+        return mesh.centroids, mesh.normals, mesh.areas
+    return run, synthetic_hull(nx=nx, ny=ny, nz=nz).n_panels
+
+
+def _inertia(size, rng):
+    n = size["masses"]
+    masses = rng.uniform(1e3, 1e5, n)
+    locations = rng.uniform([-50, -20, 0], [50, 20, 40], (n, 3))
+    def run():
+        return InertiaCollection.from_arrays(masses, locations).mass_matrix()
+    return run, n
+
+
+def _stiffness(size, rng):
+    nx, ny, nz = size["panels"]
+    mesh = synthetic_hull(nx=nx, ny=ny, nz=nz)
+    drafts, trims, heels = _positions(size["positions"], rng)
+    def run():
+        properties = hydrostatics(mesh, drafts, trims, heels)
+        return stiffness_matrices(properties, RHO, mass=properties.volume*RHO, centre_of_gravity=[0, 0, 10])
+    return run, size["positions"]*mesh.n_panels
+
+
+def _periods(size, rng):
+    nx, ny, nz = size["panels"]
+    mesh = synthetic_hull(nx=nx, ny=ny, nz=nz)
+    drafts, trims, heels = _positions(size["positions"], rng)
+    properties = hydrostatics(mesh, drafts, trims, heels)
+    mass = properties.volume*RHO
+    C = stiffness_matrices(properties, RHO, mass=mass, centre_of_gravity=[0, 0, 10])
+    C = 0.5*(C + np.swapaxes(C, -1, -2))
+    inertia = InertiaCollection.from_arrays([1.0], [[0, 0, 10]], np.diag([14.0, 30.0, 30.0])**2)
+    M = mass[:, None, None]*inertia.mass_matrix()
+    def run():
+        return natural_periods(M, C)
+    return run, size["positions"]
+
+
+def _mooring(size, rng):
+    system = synthetic_mooring(*size["mooring"])
+    offsets = rng.uniform([-30, -30, -5], [30, 30, 5], (size["offsets"], 3))
+    def run():
+        return system.solve(offsets)
+    return run, size["offsets"]*system.number_of_lines
+
+
+BENCHMARKS: Dict[str, Callable] = {
+    "mesh": _mesh,
+    "inertia": _inertia,
+    "stiffness": _stiffness,
+    "periods": _periods,
+    "mooring": _mooring,
+}
+
+
+def measure(name:str, size:str, repeat:int=3, seed:int=0) -> BenchmarkResult:
+    """Run one benchmark at one size"""
+    run, items = BENCHMARKS[name](SIZES[size], np.random.default_rng(seed))
+    run()  # warm up, e.g. imports and first-call caches
+    timer = timeit.Timer(run)
+    number, _ = timer.autorange()  # calls per sample, such that short runs are not just noise
+    best = min(timer.repeat(repeat, number)) / number
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return BenchmarkResult(name, size, items, best, items/best if best > 0 else np.inf, peak)
+
+
+def run(sizes:Sequence[str]=("small", "medium"), names:Sequence[str]|None=None, repeat:int=3,
+        seed:int=0) -> List[BenchmarkResult]:
+    return [measure(name, size, repeat, seed) for size in sizes for name in (names or BENCHMARKS)]
+
+
+def save(results:Sequence[BenchmarkResult], file:Path|str) -> Path:
+    file = Path(file)
+    data = {
+        "hivemind": __version__,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "results": [r._asdict() for r in results],
+    }
+    file.write_text(json.dumps(data, indent=2))
+    return file
+
+
+def load(file:Path|str) -> List[BenchmarkResult]:
+    data = json.loads(Path(file).read_text())
+    return [BenchmarkResult(**r) for r in data["results"]]
+
+
+def compare(results:Sequence[BenchmarkResult], baseline:Sequence[BenchmarkResult],
+            tolerance:float=0.2, memory_tolerance:float=0.1) -> List[Regression]:
+    """Return the benchmarks that are slower, or use more memory, than the baseline by
+    more than the relative tolerances. Benchmarks missing from the baseline are skipped."""
+    reference = {(r.name, r.size): r for r in baseline}
+    regressions = []
+    for r in results:
+        b = reference.get((r.name, r.size))
+        if b is None:
+            continue
+        if r.seconds > b.seconds*(1 + tolerance):
+            regressions.append(Regression(r.name, r.size, "seconds", b.seconds, r.seconds))
+        if r.peak_memory > b.peak_memory*(1 + memory_tolerance):
+            regressions.append(Regression(r.name, r.size, "peak_memory", b.peak_memory, r.peak_memory))
+    return regressions
+
+
+def format_results(results:Sequence[BenchmarkResult]) -> str:
+    lines = [f"{'benchmark':<10} {'size':<7} {'items':>10} {'seconds':>10} {'items/s':>12} {'peak MB':>9}"]
+    for r in results:
+        lines.append(f"{r.name:<10} {r.size:<7} {r.items:>10d} {r.seconds:>10.4f} {r.throughput:>12.4g} "
+                     f"{r.peak_memory/2**20:>9.1f}")
+    return "\n".join(lines)
+
+
+def main(argv:Sequence[str]|None=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the core analyses of hivemind")
+    parser.add_argument("--sizes", nargs="+", default=["small", "medium"], choices=list(SIZES))
+    parser.add_argument("--benchmarks", nargs="+", default=None, choices=list(BENCHMARKS))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--save", type=Path, help="write the results as a baseline")
+    parser.add_argument("--compare", type=Path, help="compare against a baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative slow-down")
+    parser.add_argument("--memory-tolerance", type=float, default=0.1, help="allowed relative memory increase")
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.benchmarks, args.repeat)
+    print(format_results(results))
+    if args.save:
+        save(results, args.save)
+    if args.compare:
+        regressions = compare(results, load(args.compare), args.tolerance, args.memory_tolerance)
+        for r in regressions:
+            print(f"REGRESSION {r.name} ({r.size}): {r.metric} {r.baseline:.4g} -> {r.current:.4g} ({r.ratio:.2f}x)")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
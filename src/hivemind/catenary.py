@@ -0,0 +1,124 @@
+"""Quasi-static elastic catenary, solved for many lines at once.
+
+A line hangs between an anchor on a flat, frictionless seabed and a fairlead that
+lies X further horizontally and Z higher. With unstretched length L, submerged weight
+per length w and axial stiffness EA, the horizontal and vertical tension (H, V) at the
+fairlead follow from the classic elastic catenary equations (e.g. Jonkman, 2007):
+
+    no seabed contact (V > wL):
+        X = H/w [asinh(V/H) - asinh((V-wL)/H)] + H L/EA
+        Z = H/w [sqrt(1+(V/H)^2) - sqrt(1+((V-wL)/H)^2)] + (V L - w L^2/2)/EA
+
+    part of the line on the seabed (V <= wL), touchdown length L - V/w:
+        X = L - V/w + H/w asinh(V/H) + H L/EA
+        Z = H/w [sqrt(1+(V/H)^2) - 1] + V^2/(2 EA w)
+
+A line that is longer than X + Z cannot be in tension on a frictionless seabed; it
+is treated as slack: H = 0 and V = wZ (the weight of the vertical hanging part).
+
+All inputs are arrays that broadcast together; the Newton iteration runs on the whole
+batch at once with an analytical Jacobian.
+"""
+from __future__ import annotations
+from typing import NamedTuple
+import numpy as np
+
+
+
+class CatenarySolution(NamedTuple):
+    horizontal: np.ndarray    # H, horizontal tension at the fairlead [N]
+    vertical: np.ndarray      # V, vertical tension at the fairlead [N]
+    converged: np.ndarray     # bool
+
+    @property
+    def tension(self) -> np.ndarray:
+        """Effective tension at the fairlead [N]"""
+        return np.hypot(self.horizontal, self.vertical)
+
+
+def _residual_and_jacobian(H, V, X, Z, L, w, EA):
+    a = V / H
+    sa = np.sqrt(1 + a*a)
+    asinh_a = np.arcsinh(a)
+    lift = V > w*L  # no seabed contact
+
+    # Suspended line
+    b = np.where(lift, (V - w*L) / H, 0.0)
+    sb = np.sqrt(1 + b*b)
+    asinh_b = np.arcsinh(b)
+    x_s = H/w*(asinh_a - asinh_b) + H*L/EA
+    z_s = H/w*(sa - sb) + (V*L - 0.5*w*L*L)/EA
+    dxdH_s = (asinh_a - asinh_b - a/sa + b/sb)/w + L/EA
+    dxdV_s = (1/sa - 1/sb)/w
+    dzdH_s = dxdV_s
+    dzdV_s = (a/sa - b/sb)/w + L/EA
+
+    # Line resting partly on the seabed
+    x_c = L - V/w + H/w*asinh_a + H*L/EA
+    z_c = H/w*(sa - 1) + V*V/(2*EA*w)
+    dxdH_c = (asinh_a - a/sa)/w + L/EA
+    dxdV_c = (1/sa - 1)/w
+    dzdH_c = dxdV_c
+    dzdV_c = a/sa/w + V/(EA*w)
+
+    pick = lambda s, c: np.where(lift, s, c)
+    return (pick(x_s, x_c) - X, pick(z_s, z_c) - Z,
+            pick(dxdH_s, dxdH_c), pick(dxdV_s, dxdV_c), pick(dzdH_s, dzdH_c), pick(dzdV_s, dzdV_c))
+
+
+def initial_guess(X, Z, L, w):
+    """Starting point of Peyrot and Goulois (1979), as used by most catenary solvers"""
+    chord2 = X*X + Z*Z
+    with np.errstate(invalid="ignore", divide="ignore"):
+        lam = np.where(L*L <= chord2, 0.2, np.sqrt(np.maximum(3*((L*L - Z*Z)/np.maximum(X*X, 1e-12) - 1), 1e-12)))
+    lam = np.where(X <= 1e-6*L, 1e6, lam)
+    H = np.maximum(np.abs(w*X/(2*lam)), 1e-6*w*L)
+    V = 0.5*w*(Z/np.tanh(lam) + L)
+    return H, V
+
+
+def solve_catenary(X, Z, L, w, EA, tol:float=1e-8, max_iter:int=100, guess=None) -> CatenarySolution:
+    """Solve the fairlead tensions of a batch of catenary lines.
+
+    X, Z: horizontal and vertical distance from anchor to fairlead [m]
+    L: unstretched line length [m]; w: submerged weight per length [N/m]; EA: axial stiffness [N]
+    tol: tolerance on the geometric residual, relative to the line length
+    guess: optional (H, V) to warm start from, e.g. the solution at a nearby offset
+    """
+    X, Z, L, w, EA = np.broadcast_arrays(*(np.asarray(v, dtype=np.float64) for v in (X, Z, L, w, EA)))
+    if guess is None:
+        H, V = initial_guess(X, Z, L, w)
+    else:
+        H, V = (np.array(np.broadcast_to(g, X.shape), dtype=np.float64) for g in guess)
+    H_min = np.broadcast_to(1e-9*w*L, X.shape)
+    slack = X + Z <= L
+    H = np.where(slack, H_min, H)
+    V = np.where(slack, w*Z, V)
+
+    # Iterate on the flattened batch, dropping lines from the active set once converged
+    shape = X.shape
+    X, Z, L, w, EA, H, V, H_min, slack = (np.ravel(a) for a in (X, Z, L, w, EA, H, V, H_min, slack))
+    H, V = H.copy(), V.copy()
+    converged = slack.copy()
+    active = np.flatnonzero(~converged)
+    for _ in range(max_iter):
+        if not len(active):
+            break
+        a = active
+        rx, rz, dxdH, dxdV, dzdH, dzdV = _residual_and_jacobian(H[a], V[a], X[a], Z[a], L[a], w[a], EA[a])
+        done = np.maximum(np.abs(rx), np.abs(rz)) <= tol*L[a]
+        converged[a[done]] = True
+        keep = ~done
+        a, rx, rz, dxdH, dxdV, dzdH, dzdV = (v[keep] for v in (a, rx, rz, dxdH, dxdV, dzdH, dzdV))
+        det = dxdH*dzdV - dxdV*dzdH
+        with np.errstate(invalid="ignore", divide="ignore"):
+            dH = np.where(det != 0, -(dzdV*rx - dxdV*rz)/det, 0.0)
+            dV = np.where(det != 0, -(-dzdH*rx + dxdH*rz)/det, 0.0)
+            # Damped step along the Newton direction: never drop H or V by more than half
+            alpha = np.minimum(1.0, np.minimum(np.where(dH < 0, -0.5*H[a]/dH, 1.0), np.where(dV < 0, -0.5*V[a]/dV, 1.0)))
+        H[a] = np.maximum(H[a] + alpha*dH, H_min[a])
+        V[a] = V[a] + alpha*dV
+        active = a
+
+    H, V, converged, slack = (v.reshape(shape) for v in (H, V, converged, slack))
+    return CatenarySolution(np.where(slack, 0.0, H), V, converged)
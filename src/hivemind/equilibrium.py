@@ -0,0 +1,100 @@
+"""Free floating equilibrium of a body for a batch of load cases.
+
+A load case is a total mass and centre of gravity (in body coordinates). Its
+equilibrium is the draft, trim and heel at which the buoyancy balances the weight and
+the centre of buoyancy lies on the vertical through the centre of gravity, i.e. the
+net heave force and roll and pitch moments about the body origin vanish.
+
+The residual forces are found from the hydrostatics of all unconverged cases at once,
+and a Newton step is taken with the heave/roll/pitch block of the hydrostatic
+restoring matrix (including weight) as the Jacobian. Cases drop out of the iteration
+once converged. A previous solution can be passed as `guess`: cases that differ
+little from it converge in one or two steps.
+
+Positions follow the conventions of hivemind.hydrostatics.
+"""
+from __future__ import annotations
+from .hydrostatics import GRAVITY, hydrostatics, stiffness_matrices
+from .mesh import ArrayMesh
+from typing import NamedTuple
+import numpy as np
+
+
+class Equilibrium(NamedTuple):
+    draft: np.ndarray       # (K,) [m]
+    trim: np.ndarray        # (K,) [deg]
+    heel: np.ndarray        # (K,) [deg]
+    converged: np.ndarray   # (K,) bool
+    iterations: np.ndarray  # (K,) number of Newton steps taken
+
+
+def initial_guess(mesh:ArrayMesh, volume) -> np.ndarray:
+    """Return level drafts [m] that roughly displace `volume` [m3], from the waterplane
+    area halfway up the mesh"""
+    low, high = mesh.bounds
+    middle = 0.5*(low[2] + high[2])
+    props = hydrostatics(mesh, middle)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        draft = middle + (np.asarray(volume, dtype=np.float64) - props.volume[0]) / props.waterplane_area[0]
+    return np.clip(np.nan_to_num(draft, nan=middle), low[2], high[2])
+
+
+def solve_equilibrium(mesh:ArrayMesh, density:float, mass, centre_of_gravity, guess=None,
+                      tol:float=1e-8, max_iter:int=50, gravity:float=GRAVITY) -> Equilibrium:
+    """Solve the equilibrium positions of K load cases at once.
+
+    mass: (K,) or scalar [kg]; centre_of_gravity: (K,3) or (3,) in body coordinates [m]
+    guess: optional (draft, trim, heel), e.g. a previous Equilibrium, to warm start from
+    tol: tolerance on the heave force relative to the weight, and on the moments
+        relative to the weight times the size of the mesh
+    """
+    mesh = ArrayMesh.from_mesh(mesh)
+    mass = np.atleast_1d(np.asarray(mass, dtype=np.float64))
+    cog = np.atleast_2d(np.asarray(centre_of_gravity, dtype=np.float64))
+    K = max(len(mass), len(cog))
+    mass, cog = np.broadcast_to(mass, (K,)), np.broadcast_to(cog, (K, 3))
+
+    if guess is None:
+        position = np.zeros((K, 3))
+        position[:, 0] = initial_guess(mesh, mass/density)
+    else:
+        position = np.stack([np.broadcast_to(np.asarray(g, dtype=np.float64), (K,)) for g in guess[:3]], axis=1)
+
+    low, high = mesh.bounds
+    size = float(np.linalg.norm(high - low))
+    max_step = np.array([0.25*(high[2] - low[2]), 5.0, 5.0])  # draft [m], trim and heel [deg]
+    weight = mass*gravity
+    converged = np.zeros(K, dtype=bool)
+    iterations = np.zeros(K, dtype=np.int64)
+    active = np.arange(K)
+    for iteration in range(max_iter + 1):
+        if not len(active):
+            break
+        a = active
+        props = hydrostatics(mesh, position[a, 0], position[a, 1], position[a, 2])
+        origin = props.translation
+        buoyancy = density*gravity*props.volume
+        arm_b = props.centre_of_buoyancy - origin
+        arm_g = props.to_earth(cog[a]) - origin
+        # heave force and roll/pitch moments about the body origin (earth axes)
+        residual = np.stack([
+            buoyancy - weight[a],
+            buoyancy*arm_b[:, 1] - weight[a]*arm_g[:, 1],
+            -buoyancy*arm_b[:, 0] + weight[a]*arm_g[:, 0],
+        ], axis=1)
+        done = (np.abs(residual[:, 0]) <= tol*weight[a]) & (np.abs(residual[:, 1:]) <= tol*weight[a, None]*size).all(axis=1)
+        converged[a[done]] = True
+        if iteration == max_iter:
+            break
+        C = stiffness_matrices(props, density, gravity, mass=mass[a], centre_of_gravity=cog[a])[:, 2:5, 2:5]
+        keep = ~done
+        a, residual, C = a[keep], residual[keep], C[keep]
+        dq = (np.linalg.pinv(C) @ residual[:, :, None])[:, :, 0]   # heave [m] up, roll, pitch [rad]
+        step = np.stack([-dq[:, 0], np.degrees(dq[:, 2]), np.degrees(dq[:, 1])], axis=1)
+        scale = np.minimum(1.0, (max_step / np.maximum(np.abs(step), 1e-300)).min(axis=1))
+        position[a] += scale[:, None]*step
+        position[a, 0] = np.clip(position[a, 0], low[2], high[2])
+        iterations[a] += 1
+        active = a
+
+    return Equilibrium(position[:, 0], position[:, 1], position[:, 2], converged, iterations)
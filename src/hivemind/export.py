@@ -0,0 +1,140 @@
+"""Batch export of hivemind objects to an external analysis model.
+
+Creating objects one by one through the API of an external tool (e.g. OrcaFlex's
+``model.CreateObject``) costs a round trip per object and per property. Instead,
+objects first describe themselves in a flat `ModelDescription`: one structured numpy
+array per kind of object (line types, lines, segments, ...). The description is then
+written to the model in a single call, `model.create_batch(description)`.
+
+Adapters for a commercial tool implement `create_batch`, for instance by rendering
+the description into one data file and loading it at once. `LocalModel` is an
+in-memory stand-in that implements both the batched and the per-object interface,
+so exports can be tested and benchmarked without the tool installed.
+"""
+from __future__ import annotations
+from typing import Dict, List
+import numpy as np
+
+
+NAME = "U64"
+
+# Record layout of every kind of object a ModelDescription can hold
+SCHEMA: Dict[str, np.dtype] = {
+    "line_types": np.dtype([
+        ("name", NAME),
+        ("weight", "f8"),            # submerged weight per length [N/m]
+        ("axial_stiffness", "f8"),   # EA [N]
+        ("drag_diameter", "f8"),     # [m]
+    ]),
+    "lines": np.dtype([
+        ("name", NAME),
+        ("end_a", "f8", (3,)),       # anchor position, earth frame [m]
+        ("end_b", "f8", (3,)),       # fairlead position [m], in the frame of connection_b
+        ("connection_a", NAME),
+        ("connection_b", NAME),
+    ]),
+    "segments": np.dtype([
+        ("line", "i8"),              # row in "lines"
+        ("line_type", "i8"),         # row in "line_types"
+        ("length", "f8"),            # unstretched length [m]
+        ("target_segment_length", "f8"),
+    ]),
+}
+
+
+class ModelDescription:
+    """Flat, column-oriented description of the objects to create in a model"""
+
+    def __init__(self):
+        self._chunks: Dict[str, List[np.ndarray]] = {kind: [] for kind in SCHEMA}
+        self._size: Dict[str, int] = {kind: 0 for kind in SCHEMA}
+
+    def add(self, kind:str, **columns) -> np.ndarray:
+        """Append records of `kind`, given as columns that broadcast to a common length.
+        Returns the row numbers of the new records (to reference them from other kinds).
+        Fields that are not given are left zero / empty. Names longer than the field
+        width (see NAME) raise ValueError."""
+        dtype = SCHEMA[kind]
+        unknown = set(columns) - set(dtype.names)
+        if unknown:
+            raise KeyError(f"Unknown fields for '{kind}': {sorted(unknown)}")
+        # a column is per record if it has one dimension more than its field
+        n = max((len(v) if np.ndim(v) > dtype[k].ndim else 1) for k, v in columns.items())
+        records = np.zeros(n, dtype=dtype)
+        for name, values in columns.items():
+            field = dtype[name]
+            if field.kind == "U":  # numpy silently truncates strings to the field width
+                width = field.itemsize // 4
+                too_long = [v for v in np.ravel(values).tolist() if len(str(v)) > width]
+                if too_long:
+                    raise ValueError(f"'{kind}.{name}' holds at most {width} characters, got {too_long[0]!r}")
+            records[name] = values
+        self._chunks[kind].append(records)
+        start = self._size[kind]
+        self._size[kind] += n
+        return np.arange(start, start + n)
+
+    def __getitem__(self, kind:str) -> np.ndarray:
+        chunks = self._chunks[kind]
+        if len(chunks) != 1:
+            merged = np.concatenate(chunks) if chunks else np.zeros(0, dtype=SCHEMA[kind])
+            self._chunks[kind] = [merged]
+        return self._chunks[kind][0]
+
+    def __len__(self) -> int:
+        """Total number of objects"""
+        return sum(self._size.values())
+
+    def counts(self) -> Dict[str, int]:
+        return dict(self._size)
+
+    def __repr__(self):
+        return f"ModelDescription({self.counts()})"
+
+
+def write(description:ModelDescription, model):
+    """Write all objects of the description to `model` in one batched call"""
+    if not hasattr(model, "create_batch"):
+        raise TypeError(f"{type(model).__name__} does not support batched creation (create_batch)")
+    model.create_batch(description)
+
+
+def write_per_object(description:ModelDescription, model):
+    """Reference path: create every record through a separate `model.CreateObject` call,
+    as the original create_in_ofx methods would. Only useful for comparison."""
+    for kind in SCHEMA:
+        for record in description[kind]:
+            obj = model.CreateObject(kind)
+            for field in record.dtype.names:
+                setattr(obj, field, record[field])
+
+
+class LocalModel:
+    """In-memory stand-in for an external model.
+
+    Supports the batched interface (`create_batch`) as well as a per-object interface
+    mimicking ``CreateObject``, and counts the API calls made through either.
+    """
+
+    class Object:
+        def __init__(self, kind:str):
+            self.kind = kind
+
+    def __init__(self):
+        self.tables: Dict[str, np.ndarray] = {kind: np.zeros(0, dtype=dtype) for kind, dtype in SCHEMA.items()}
+        self.objects: List[LocalModel.Object] = []
+        self.calls = 0
+
+    def create_batch(self, description:ModelDescription):
+        self.calls += 1
+        for kind in SCHEMA:
+            self.tables[kind] = np.concatenate([self.tables[kind], description[kind]])
+
+    def CreateObject(self, kind:str) -> LocalModel.Object:
+        self.calls += 1
+        obj = LocalModel.Object(kind)
+        self.objects.append(obj)
+        return obj
+
+    def __len__(self) -> int:
+        return sum(len(t) for t in self.tables.values()) + len(self.objects)
@@ -0,0 +1,212 @@
+"""Space frame (3D Euler-Bernoulli beam) finite element model and modal analysis.
+
+A frame is a set of nodes connected by beam elements, e.g. the members of a jacket
+or the segments of a tower. Every node has six degrees of freedom (ux, uy, uz, rx, ry,
+rz). The element stiffness and consistent mass matrices are built for all elements at
+once as (E,12,12) arrays, rotated to the global axes and scattered into sparse global
+matrices (COO, converted to CSR, which sums the contributions of shared nodes).
+
+The lowest eigenmodes are found with scipy's Lanczos solver in shift-invert mode, which
+factorizes the stiffness once and never forms a dense matrix, so models with 1e5 and
+more degrees of freedom fit in memory.
+
+Requires scipy, available through the `frame` extra: pip install hivemind[frame].
+"""
+from __future__ import annotations
+from .mesh import ArrayMesh
+from typing import NamedTuple
+import numpy as np
+import scipy.sparse as sparse
+import scipy.sparse.linalg as sparse_linalg
+
+
+DOFS_PER_NODE = 6
+
+
+class Section(NamedTuple):
+    """Cross section and material of beam elements; every field is a scalar or one
+    value per element. Iy and Iz are the second moments of area about the local axes."""
+    area: np.ndarray         # [m2]
+    Iy: np.ndarray           # [m4]
+    Iz: np.ndarray           # [m4]
+    J: np.ndarray            # torsion constant [m4]
+    youngs_modulus: np.ndarray = 2.1e11  # [Pa]
+    shear_modulus: np.ndarray = 8.1e10   # [Pa]
+    density: np.ndarray = 7850.0         # [kg/m3]
+
+    @classmethod
+    def tube(cls, diameter, thickness, youngs_modulus=2.1e11, poisson=0.3, density=7850.0) -> Section:
+        """Circular hollow section of outer `diameter` and wall `thickness` [m]"""
+        d, t = np.asarray(diameter, dtype=np.float64), np.asarray(thickness, dtype=np.float64)
+        inner = d - 2*t
+        area = np.pi/4*(d**2 - inner**2)
+        I = np.pi/64*(d**4 - inner**4)
+        return cls(area, I, I, 2*I, youngs_modulus, youngs_modulus/(2*(1 + poisson)), density)
+
+
+class Modes(NamedTuple):
+    frequencies: np.ndarray  # (k,) natural frequencies [Hz], ascending
+    shapes: np.ndarray       # (n_nodes*6, k) mass normalized mode shapes, zero on fixed DOFs
+
+    @property
+    def periods(self) -> np.ndarray:
+        with np.errstate(divide="ignore"):
+            return 1/self.frequencies
+
+    def displacements(self, mode:int) -> np.ndarray:
+        """Return the (n_nodes,3) translations of a mode"""
+        return self.shapes[:, mode].reshape(-1, DOFS_PER_NODE)[:, :3]
+
+
+def mesh_edges(mesh:ArrayMesh) -> np.ndarray:
+    """Return the (E,2) unique edges of the panels of `mesh`, e.g. to model the
+    stiffeners of a plated structure or a truss meshed as thin panels"""
+    mesh = ArrayMesh.from_mesh(mesh)
+    idx = mesh.indices[mesh.indptr[0]:mesh.indptr[-1]]
+    starts = mesh.indptr[:-1] - mesh.indptr[0]
+    sizes = mesh.panel_sizes
+    position = np.arange(len(idx))
+    following = position + 1
+    last = starts + sizes - 1
+    following[last] = starts  # close every panel outline
+    edges = np.sort(np.stack([idx, idx[following]], axis=1), axis=1)
+    return np.unique(edges, axis=0)
+
+
+def local_axes(nodes:np.ndarray, edges:np.ndarray, reference=(0.0, 0.0, 1.0)):
+    """Return the element lengths (E,) and (E,3,3) rotations whose rows are the local
+    x (along the element), y and z axes. Local y lies in the plane of the element and the
+    `reference` direction; elements parallel to it use the global y axis instead."""
+    d = nodes[edges[:, 1]] - nodes[edges[:, 0]]
+    length = np.linalg.norm(d, axis=1)
+    ex = d / length[:, None]
+    v = np.broadcast_to(np.asarray(reference, dtype=np.float64), ex.shape).copy()
+    parallel = np.linalg.norm(np.cross(ex, v), axis=1) < 1e-6*np.linalg.norm(v, axis=1)
+    v[parallel] = (0.0, 1.0, 0.0)
+    ey = v - np.einsum("ij,ij->i", v, ex)[:, None]*ex
+    ey /= np.linalg.norm(ey, axis=1)[:, None]
+    ez = np.cross(ex, ey)
+    return length, np.stack([ex, ey, ez], axis=1)
+
+
+def element_matrices(length, section:Section):
+    """Return the (E,12,12) local stiffness and consistent mass matrices"""
+    L = np.asarray(length, dtype=np.float64)
+    E = len(L)
+    b = lambda v: np.broadcast_to(np.asarray(v, dtype=np.float64), (E,))
+    A, Iy, Iz, J = b(section.area), b(section.Iy), b(section.Iz), b(section.J)
+    EA, GJ = b(section.youngs_modulus)*A, b(section.shear_modulus)*J
+    EIy, EIz = b(section.youngs_modulus)*Iy, b(section.youngs_modulus)*Iz
+    rho = b(section.density)
+
+    k = np.zeros((E, 12, 12))
+    m = np.zeros((E, 12, 12))
+
+    def pair(matrix, i, j, a, b_):  # 2x2 block [[a, b], [b, a]] on dofs i, j
+        matrix[:, i, i] += a
+        matrix[:, j, j] += a
+        matrix[:, i, j] += b_
+        matrix[:, j, i] += b_
+
+    pair(k, 0, 6, EA/L, -EA/L)
+    pair(k, 3, 9, GJ/L, -GJ/L)
+    mass = rho*A*L
+    pair(m, 0, 6, mass/3, mass/6)
+    polar = rho*(Iy + Iz)*L
+    pair(m, 3, 9, polar/3, polar/6)
+
+    # bending in the local xy plane (uy, rz) and xz plane (uz, -ry)
+    for dofs, EI, s in (((1, 5, 7, 11), EIz, 1.0), ((2, 4, 8, 10), EIy, -1.0)):
+        c = EI/L**3
+        kb = np.stack([
+            [12*c, s*6*L*c, -12*c, s*6*L*c],
+            [s*6*L*c, 4*L*L*c, -s*6*L*c, 2*L*L*c],
+            [-12*c, -s*6*L*c, 12*c, -s*6*L*c],
+            [s*6*L*c, 2*L*L*c, -s*6*L*c, 4*L*L*c],
+        ])
+        q = mass/420
+        mb = np.stack([
+            [156*q, s*22*L*q, 54*q, -s*13*L*q],
+            [s*22*L*q, 4*L*L*q, s*13*L*q, -3*L*L*q],
+            [54*q, s*13*L*q, 156*q, -s*22*L*q],
+            [-s*13*L*q, -3*L*L*q, -s*22*L*q, 4*L*L*q],
+        ])
+        ix = np.ix_(range(E), dofs, dofs)
+        k[ix] += np.moveaxis(kb, -1, 0)
+        m[ix] += np.moveaxis(mb, -1, 0)
+    return k, m
+
+
+class FrameModel:
+    """Beam element model of a space frame.
+
+    nodes: (N,3) node coordinates [m]
+    edges: (E,2) node indices of the elements
+    section: Section with scalars or one value per element
+    fixed: indices of the nodes whose six DOFs are clamped
+    node_masses: optional (N,) lumped masses [kg] added to the translational DOFs
+    reference: direction that sets the local y axis of the elements, see `local_axes`
+    """
+
+    def __init__(self, nodes, edges, section:Section, fixed=(), node_masses=None, reference=(0.0, 0.0, 1.0)):
+        self.nodes = np.asarray(nodes, dtype=np.float64)
+        self.edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+        self.section = section
+        self.fixed = np.unique(np.asarray(fixed, dtype=np.int64))
+        self.node_masses = node_masses
+        self.reference = reference
+
+    @classmethod
+    def from_mesh(cls, mesh:ArrayMesh, section:Section, **kwargs) -> FrameModel:
+        """Model every panel edge of `mesh` as a beam element"""
+        mesh = ArrayMesh.from_mesh(mesh)
+        return cls(mesh.nodes, mesh_edges(mesh), section, **kwargs)
+
+    @property
+    def n_dofs(self) -> int:
+        return DOFS_PER_NODE*len(self.nodes)
+
+    def assemble(self):
+        """Return the global (n_dofs, n_dofs) stiffness and mass matrices in CSR form"""
+        length, axes = local_axes(self.nodes, self.edges, self.reference)
+        k, m = element_matrices(length, self.section)
+        T = np.zeros((len(length), 12, 12))
+        for block in range(4):
+            T[:, 3*block:3*block+3, 3*block:3*block+3] = axes
+        Tt = np.swapaxes(T, 1, 2)
+        k, m = Tt @ k @ T, Tt @ m @ T
+
+        dofs = (DOFS_PER_NODE*self.edges[:, :, None] + np.arange(DOFS_PER_NODE)).reshape(-1, 12)
+        rows = np.repeat(dofs, 12, axis=1).ravel()
+        cols = np.tile(dofs, (1, 12)).ravel()
+        shape = (self.n_dofs, self.n_dofs)
+        K = sparse.coo_matrix((k.ravel(), (rows, cols)), shape=shape).tocsr()
+        M = sparse.coo_matrix((m.ravel(), (rows, cols)), shape=shape).tocsr()
+        if self.node_masses is not None:
+            lumped = np.zeros((len(self.nodes), DOFS_PER_NODE))
+            lumped[:, :3] = np.asarray(self.node_masses, dtype=np.float64)[:, None]
+            M = M + sparse.diags(lumped.ravel())
+        return K, M
+
+    @property
+    def free_dofs(self) -> np.ndarray:
+        free = np.ones((len(self.nodes), DOFS_PER_NODE), dtype=bool)
+        free[self.fixed] = False
+        return np.flatnonzero(free)
+
+    def modes(self, n:int=10, shift:float=-1.0) -> Modes:
+        """Return the `n` lowest eigenmodes.
+
+        shift: the eigenvalue (omega^2, [rad2/s2]) around which shift-invert looks. A
+        small negative value keeps K - shift*M non-singular for free-floating models.
+        """
+        K, M = self.assemble()
+        free = self.free_dofs
+        K, M = K[free][:, free].tocsc(), M[free][:, free].tocsc()
+        n = min(n, len(free) - 1)
+        values, vectors = sparse_linalg.eigsh(K, k=n, M=M, sigma=shift, which="LM")
+        order = np.argsort(values)
+        values, vectors = values[order], vectors[:, order]
+        shapes = np.zeros((self.n_dofs, n))
+        shapes[free] = vectors
+        return Modes(np.sqrt(np.maximum(values, 0.0))/(2*np.pi), shapes)
@@ -0,0 +1,139 @@
+"""Incremental recomputation of the outputs of a project.
+
+A project combines several Base objects, e.g. a Site, a Structure, a Naval holding
+that structure and a MooringSystem. The outputs of a study (a mesh, a stiffness
+matrix, natural periods, a restoring table, ...) are registered as the nodes of a
+`DependencyGraph`. Each node declares
+
+    sources: the Base objects whose parameters and state it reads
+    inputs:  the other nodes whose results it takes, as keyword arguments
+
+The graph records the configuration of every source (a hash of its parameters and its
+state, see `Base._cache_key`) at the time a node was computed. `run` recomputes only
+the nodes whose sources changed since, or that depend on a recomputed node, and
+returns the results of all nodes. Nodes that do not depend on each other run
+concurrently on an executor:
+
+    graph = DependencyGraph()
+    graph.add("mesh", structure.get_mesh, sources=[structure])
+    graph.add("stiffness", lambda mesh: naval.get_hydrostatic_stiffness(10), inputs=["mesh"], sources=[naval])
+    graph.add("table", mooring.get_restoring_table, sources=[mooring])
+    graph.run(ThreadPoolExecutor())
+    mooring.change_state("Weathered")
+    graph.run()  # only recomputes "table"
+
+Numpy-heavy nodes release the GIL, so a thread pool is usually enough. Nodes may share
+source objects on a thread pool: the result caches of Base objects are locked per
+instance (see `cached`). A ProcessPoolExecutor requires picklable node functions.
+"""
+from __future__ import annotations
+from .abstracts import Base
+from concurrent.futures import Executor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Tuple
+
+
+class Node(NamedTuple):
+    name: str
+    function: Callable[..., Any]
+    inputs: Tuple[str, ...]
+    sources: Tuple[Base, ...]
+
+
+def _fingerprint(node:Node) -> Tuple:
+    return tuple(source._cache_key() for source in node.sources)
+
+
+class DependencyGraph:
+    """Outputs of a project and their dependencies, see the module docstring"""
+
+    def __init__(self):
+        self._nodes: Dict[str, Node] = {}
+        self._results: Dict[str, Any] = {}
+        self._fingerprints: Dict[str, Tuple] = {}
+        self._stale: set = set()
+        self.computed: List[str] = []  # nodes recomputed by the last run, in order
+
+    def add(self, name:str, function:Callable[..., Any], inputs:Iterable[str]=(), sources:Iterable[Base]=()) -> Node:
+        """Register an output. `function` is called with the results of `inputs` as
+        keyword arguments. Inputs must be registered before the nodes that use them."""
+        if name in self._nodes:
+            raise KeyError(f"Node '{name}' already exists")
+        inputs = tuple(inputs)
+        missing = [i for i in inputs if i not in self._nodes]
+        if missing:
+            raise KeyError(f"Unknown inputs of '{name}': {missing}")
+        node = self._nodes[name] = Node(name, function, inputs, tuple(sources))
+        return node
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def __contains__(self, name:str) -> bool:
+        return name in self._nodes
+
+    def __getitem__(self, name:str) -> Any:
+        """Return the result of a node from the last run"""
+        return self._results[name]
+
+    def downstream(self, names:Iterable[str]) -> List[str]:
+        """Return the given nodes and all nodes that depend on them, in registration order"""
+        affected = set(names)
+        for node in self._nodes.values():  # registration order is a topological order
+            if affected.intersection(node.inputs):
+                affected.add(node.name)
+        return [name for name in self._nodes if name in affected]
+
+    def invalidate(self, *names:str):
+        """Force the given nodes (and everything downstream) to be recomputed"""
+        self._stale.update(names)
+
+    def dirty(self) -> List[str]:
+        """Return the nodes the next run would recompute"""
+        changed = [name for name, node in self._nodes.items()
+                   if name not in self._results or name in self._stale
+                   or self._fingerprints.get(name) != _fingerprint(node)]
+        return self.downstream(changed)
+
+    def run(self, executor:Executor|None=None) -> Dict[str, Any]:
+        """Recompute the dirty nodes and return the results of all nodes.
+
+        Without an executor the nodes run one by one in this thread. With an executor
+        every node is submitted as soon as its inputs are available.
+        """
+        todo = self.dirty()
+        pending = set(todo)
+        self.computed = []
+
+        def ready(name):
+            return not pending.intersection(self._nodes[name].inputs)
+
+        def finish(name, fingerprint, result):
+            self._results[name] = result
+            self._fingerprints[name] = fingerprint
+            self._stale.discard(name)
+            pending.discard(name)
+            self.computed.append(name)
+
+        def call(node):
+            return node.function(**{i: self._results[i] for i in node.inputs})
+
+        if executor is None:
+            for name in todo:
+                node = self._nodes[name]
+                fingerprint = _fingerprint(node)
+                finish(name, fingerprint, call(node))
+            return dict(self._results)
+
+        running = {}
+        queued = list(todo)
+        while queued or running:
+            for name in [n for n in queued if ready(n)]:
+                queued.remove(name)
+                node = self._nodes[name]
+                inputs = {i: self._results[i] for i in node.inputs}
+                running[executor.submit(node.function, **inputs)] = (name, _fingerprint(node))
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, fingerprint = running.pop(future)
+                finish(name, fingerprint, future.result())
+        return dict(self._results)
@@ -0,0 +1,245 @@
+"""Hydrostatic properties of a floating body, integrated over its panel mesh.
+
+Conventions:
+
+    The mesh is given in body coordinates and must be closed (at least below the
+    waterline) with outward pointing normals. A floating position is described by a
+    draft, a trim and a heel: the body is rotated about its origin by the heel
+    (about x) and the trim (about y), and then lowered by the draft, such that the
+    body origin ends up at z = -draft. The free surface is the plane z = 0.
+
+    Angles are in degrees and follow the right-hand rule. All other quantities are
+    in SI units.
+
+All functions accept a batch of K positions and evaluate them together; the
+submerged part of the hull is found by clipping all triangles of the mesh against
+the free surface for all positions at once.
+"""
+from __future__ import annotations
+from .mesh import ArrayMesh
+from typing import NamedTuple
+import numpy as np
+
+
+GRAVITY = 9.80665  # m/s2
+
+# Upper bound on (number of positions) x (number of triangles) processed at once
+CHUNK_SIZE = 2_000_000
+
+
+def rotation_matrices(heels, trims) -> np.ndarray:
+    """Return the (K,3,3) rotation matrices R = Ry(trim) @ Rx(heel) for angles in degrees"""
+    phi = np.radians(np.atleast_1d(np.asarray(heels, dtype=np.float64)))
+    theta = np.radians(np.atleast_1d(np.asarray(trims, dtype=np.float64)))
+    phi, theta = np.broadcast_arrays(phi, theta)
+    cp, sp = np.cos(phi), np.sin(phi)
+    ct, st = np.cos(theta), np.sin(theta)
+    R = np.empty(phi.shape + (3, 3))
+    R[..., 0, 0] = ct
+    R[..., 0, 1] = st*sp
+    R[..., 0, 2] = st*cp
+    R[..., 1, 0] = 0.0
+    R[..., 1, 1] = cp
+    R[..., 1, 2] = -sp
+    R[..., 2, 0] = -st
+    R[..., 2, 1] = ct*sp
+    R[..., 2, 2] = ct*cp
+    return R
+
+
+def broadcast_positions(drafts, trims=0.0, heels=0.0):
+    """Broadcast drafts, trims and heels to three 1D arrays of equal length K"""
+    drafts, trims, heels = np.broadcast_arrays(
+        np.atleast_1d(np.asarray(drafts, dtype=np.float64)),
+        np.atleast_1d(np.asarray(trims, dtype=np.float64)),
+        np.atleast_1d(np.asarray(heels, dtype=np.float64)),
+    )
+    if drafts.ndim != 1:
+        raise ValueError("drafts, trims and heels must be scalars or 1D arrays")
+    return drafts, trims, heels
+
+
+class HydrostaticProperties(NamedTuple):
+    """Hydrostatic properties for a batch of K floating positions.
+
+    All coordinates are in the earth-fixed frame (see module docstring), waterplane
+    moments are taken about the earth-fixed origin.
+    """
+    rotation: np.ndarray            # (K,3,3) body to earth rotation
+    translation: np.ndarray         # (K,3) body origin in the earth frame
+    volume: np.ndarray              # (K,) displaced volume [m3]
+    centre_of_buoyancy: np.ndarray  # (K,3) [m]
+    waterplane_area: np.ndarray     # (K,) [m2]
+    waterplane_moment: np.ndarray   # (K,2) first moments (int x dA, int y dA) [m3]
+    waterplane_inertia: np.ndarray  # (K,3) second moments (int x2 dA, int y2 dA, int xy dA) [m4]
+    wetted_area: np.ndarray         # (K,) [m2]
+
+    @property
+    def centre_of_flotation(self) -> np.ndarray:
+        """(K,2) centroid of the waterplane area"""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return self.waterplane_moment / self.waterplane_area[:, None]
+
+    def to_earth(self, points) -> np.ndarray:
+        """Transform (3,) or (K,3) points from body to earth coordinates"""
+        points = np.asarray(points, dtype=np.float64)
+        return np.einsum("kij,...kj->...ki", self.rotation, np.broadcast_to(points, self.translation.shape)) \
+            + self.translation
+
+
+def _submerged_triangles(v:np.ndarray):
+    """Clip triangles against the plane z = 0 and keep the part below it.
+
+    v: (...,3,3) array of triangle vertices (last axis xyz), counter-clockwise.
+    Returns two (...,3,3) arrays of triangles, which together cover the submerged
+    part of each input triangle with the same orientation. Triangles that are not
+    needed are degenerate (all vertices equal), hence have zero area.
+    """
+    z = v[..., 2]
+    wet = z < 0
+    n_wet = wet.sum(axis=-1)
+
+    # The 'odd' vertex is the only wet vertex (n_wet == 1) or the only dry one (n_wet == 2).
+    odd = np.where(n_wet == 1, np.argmax(wet, axis=-1), np.argmax(~wet, axis=-1))
+    order = (odd[..., None] + np.arange(3)) % 3  # cyclic roll keeps the orientation
+    r = np.take_along_axis(v, order[..., None], axis=-2)
+    r0, r1, r2 = r[..., 0, :], r[..., 1, :], r[..., 2, :]
+
+    def crossing(a, b):
+        za, zb = a[..., 2:3], b[..., 2:3]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            t = np.where(za != zb, za / (za - zb), 0.0)
+        p = a + t*(b - a)
+        p[..., 2] = 0.0
+        return p
+
+    p01 = crossing(r0, r1)
+    p20 = crossing(r2, r0)
+
+    one = (n_wet == 1)[..., None, None]
+    two = (n_wet == 2)[..., None, None]
+    three = (n_wet == 3)[..., None, None]
+
+    tri1 = np.where(three, v, np.where(one, np.stack([r0, p01, p20], axis=-2),
+                                       np.stack([r1, r2, p20], axis=-2)))
+    tri2 = np.stack([r1, p20, p01], axis=-2)
+    # Collapse unused triangles onto one point such that they have no area
+    tri1 = np.where(one | two | three, tri1, v[..., :1, :])
+    tri2 = np.where(two, tri2, v[..., :1, :])
+    return tri1, tri2
+
+
+def _integrate(tri:np.ndarray):
+    """Return the surface integrals needed for the hydrostatics of (K,T,3,3) triangles,
+    summed over T."""
+    a = 0.5*np.cross(tri[..., 1, :] - tri[..., 0, :], tri[..., 2, :] - tri[..., 0, :])
+    az = a[..., 2]
+    x, y, z = tri[..., 0], tri[..., 1], tri[..., 2]
+    sx, sy, sz = x.sum(-1), y.sum(-1), z.sum(-1)
+
+    # Exact integrals of linear and quadratic functions over the triangles; the
+    # volume integrals follow from the divergence theorem (the lid at z=0 does not
+    # contribute), the waterplane integrals from the closedness of the wetted
+    # surface plus the lid.
+    q = lambda f, g, sf, sg: ((f*g).sum(-1) + sf*sg) / 12.0
+    out = np.stack([
+        (az*sz/3).sum(-1),                    # volume
+        (az*q(x, z, sx, sz)).sum(-1),         # int x dV
+        (az*q(y, z, sy, sz)).sum(-1),         # int y dV
+        (az*q(z, z, sz, sz)/2).sum(-1),       # int z dV
+        -az.sum(-1),                          # waterplane area
+        -(az*sx/3).sum(-1),                   # int x dA
+        -(az*sy/3).sum(-1),                   # int y dA
+        -(az*q(x, x, sx, sx)).sum(-1),        # int x2 dA
+        -(az*q(y, y, sy, sy)).sum(-1),        # int y2 dA
+        -(az*q(x, y, sx, sy)).sum(-1),        # int xy dA
+        np.linalg.norm(a, axis=-1).sum(-1),   # wetted area
+    ], axis=-1)
+    return out
+
+
+def hydrostatics(mesh:ArrayMesh, drafts, trims=0.0, heels=0.0, chunk_size:int=CHUNK_SIZE) -> HydrostaticProperties:
+    """Compute the hydrostatic properties of `mesh` for a batch of floating positions.
+
+    drafts, trims, heels: scalars or 1D arrays that broadcast to a common length K.
+    """
+    mesh = ArrayMesh.from_mesh(mesh)
+    drafts, trims, heels = broadcast_positions(drafts, trims, heels)
+    K = len(drafts)
+    R = rotation_matrices(heels, trims)
+    t = np.zeros((K, 3))
+    t[:, 2] = -drafts
+
+    body = mesh.nodes[mesh.triangles()]  # (T,3,3)
+    T = max(len(body), 1)
+    step = max(1, chunk_size // T)
+
+    totals = np.zeros((K, 11))
+    for k0 in range(0, K, step):
+        sl = slice(k0, k0 + step)
+        earth = np.einsum("kij,tvj->ktvi", R[sl], body) + t[sl, None, None, :]
+        for tri in _submerged_triangles(earth):
+            totals[sl] += _integrate(tri)
+
+    volume = totals[:, 0]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cob = totals[:, 1:4] / volume[:, None]
+
+    return HydrostaticProperties(
+        rotation=R,
+        translation=t,
+        volume=volume,
+        centre_of_buoyancy=cob,
+        waterplane_area=totals[:, 4],
+        waterplane_moment=totals[:, 5:7],
+        waterplane_inertia=totals[:, 7:10],
+        wetted_area=totals[:, 10],
+    )
+
+
+def stiffness_matrices(properties:HydrostaticProperties, density:float, gravity:float=GRAVITY,
+                       mass=None, centre_of_gravity=None, reference_point=None) -> np.ndarray:
+    """Return the (K,6,6) hydrostatic restoring matrices.
+
+    density: water density [kg/m3]
+    mass, centre_of_gravity: if given, the restoring contribution of the weight is
+        included. The centre of gravity is given in body coordinates, the mass may be
+        a scalar or one value per position.
+    reference_point: point in body coordinates about which the matrix is expressed.
+        Defaults to the body origin.
+    """
+    p = properties
+    K = len(p.volume)
+    rg = density*gravity
+
+    ref = p.to_earth(np.zeros(3) if reference_point is None else reference_point)
+    xr, yr = ref[:, 0], ref[:, 1]
+
+    A = p.waterplane_area
+    Sx, Sy = p.waterplane_moment[:, 0], p.waterplane_moment[:, 1]
+    Ixx = p.waterplane_inertia[:, 0] - 2*xr*Sx + xr**2*A  # int (x-xr)^2 dA
+    Iyy = p.waterplane_inertia[:, 1] - 2*yr*Sy + yr**2*A
+    Ixy = p.waterplane_inertia[:, 2] - xr*Sy - yr*Sx + xr*yr*A
+    V = p.volume
+    xb, yb, zb = (p.centre_of_buoyancy - ref).T
+
+    C = np.zeros((K, 6, 6))
+    C[:, 2, 2] = rg*A
+    C[:, 2, 3] = C[:, 3, 2] = rg*(Sy - yr*A)
+    C[:, 2, 4] = C[:, 4, 2] = -rg*(Sx - xr*A)
+    C[:, 3, 3] = rg*(Iyy + V*zb)
+    C[:, 4, 4] = rg*(Ixx + V*zb)
+    C[:, 3, 4] = C[:, 4, 3] = -rg*Ixy
+    C[:, 3, 5] = -rg*V*xb
+    C[:, 4, 5] = -rg*V*yb
+
+    if mass is not None:
+        if centre_of_gravity is None:
+            raise ValueError("centre_of_gravity is required when mass is given")
+        mg = np.broadcast_to(np.asarray(mass, dtype=np.float64), (K,))*gravity
+        xg, yg, zg = (p.to_earth(centre_of_gravity) - ref).T
+        C[:, 3, 3] -= mg*zg
+        C[:, 4, 4] -= mg*zg
+        C[:, 3, 5] += mg*xg
+        C[:, 4, 5] += mg*yg
+    return C
@@ -1,6 +1,7 @@
 from hivemind.structural import Structure
 from hivemind.naval import Naval
 from hivemind.abstracts import ParameterSet, Parameter, units
+from hivemind.mesh import ArrayMesh, box
 
 m = units.meter
 
@@ -21,8 +22,9 @@ class MyStructure(Structure):
     def get_inertia(self):
         raise NotImplementedError()
         
-    def get_mesh(self):
-        raise NotImplementedError()
+    def get_mesh(self) -> ArrayMesh:
+        p = self.parameters
+        return box(p.Length[m], p.Width[m], p.Depth[m], nx=10, ny=4, nz=4)
     
     @property
     def parameters(self) -> MyDesign:
@@ -0,0 +1,239 @@
+from __future__ import annotations
+from .abstracts import Inertia, DeltaState, magnitude
+from typing import Dict, Iterable
+import numpy as np
+
+
+
+def skew(vectors) -> np.ndarray:
+    """Return the (...,3,3) skew-symmetric matrices S such that S @ b == cross(a, b)"""
+    a = np.asarray(vectors, dtype=np.float64)
+    S = np.zeros(a.shape + (3,))
+    S[..., 0, 1], S[..., 0, 2] = -a[..., 2], a[..., 1]
+    S[..., 1, 0], S[..., 1, 2] = a[..., 2], -a[..., 0]
+    S[..., 2, 0], S[..., 2, 1] = -a[..., 1], a[..., 0]
+    return S
+
+
+def rigid_body_mass_matrix(mass, location, rotation=None, reference_point=(0.0, 0.0, 0.0)) -> np.ndarray:
+    """Return the 6x6 rigid-body mass matrix of a body about `reference_point`.
+
+    mass: (...,) mass [kg]
+    location: (...,3) centre of gravity [m]
+    rotation: (...,3,3) rotational inertia about the centre of gravity [kg m2]
+    All arguments broadcast, such that a stack of bodies returns a (...,6,6) stack.
+    """
+    mass = np.asarray(mass, dtype=np.float64)
+    r = np.asarray(location, dtype=np.float64) - np.asarray(reference_point, dtype=np.float64)
+    if rotation is None:
+        rotation = np.zeros(r.shape + (3,))
+    rotation = np.asarray(rotation, dtype=np.float64)
+
+    shape = np.broadcast_shapes(mass.shape, r.shape[:-1], rotation.shape[:-2])
+    m = np.broadcast_to(mass, shape)[..., None, None]
+    S = skew(np.broadcast_to(r, shape + (3,)))
+
+    M = np.zeros(shape + (6, 6))
+    M[..., :3, :3] = m*np.eye(3)
+    M[..., :3, 3:] = -m*S
+    M[..., 3:, :3] = m*S
+    M[..., 3:, 3:] = rotation - m*(S @ S)  # parallel axis: I + m(|r|^2 I - r r^T)
+    return M
+
+
+def mass_matrix(inertia:Inertia, reference_point=(0.0, 0.0, 0.0)) -> np.ndarray:
+    """Return the 6x6 mass matrix of an Inertia about `reference_point`"""
+    mass = np.atleast_1d(magnitude(inertia.translation, "kg"))[-1]
+    rotation = magnitude(inertia.rotation, "kg*m**2")
+    location = magnitude(inertia.location, "m")
+    return rigid_body_mass_matrix(mass, location, rotation, reference_point)
+
+
+class InertiaCollection(Inertia):
+    """Array-backed collection of point masses, e.g. the equipment list of a topside.
+
+    Masses, locations and rotational inertias (about each item's own location) are
+    held in contiguous arrays. Items can be added and removed cheaply: removal moves
+    the last item into the freed slot, so the arrays stay dense. Every item gets an
+    integer id that stays valid until it is removed.
+
+    As an Inertia, the collection represents the combined body: `translation` is the
+    total mass, `location` the centre of gravity and `rotation` the inertia tensor
+    about the centre of gravity. It can therefore be returned directly from
+    `Structure.get_inertia()`.
+    """
+
+    def __init__(self, capacity:int=16):
+        capacity = max(int(capacity), 1)
+        self._masses = np.zeros(capacity)
+        self._locations = np.zeros((capacity, 3))
+        self._rotations = np.zeros((capacity, 3, 3))
+        self._ids = np.zeros(capacity, dtype=np.int64)
+        self._size = 0
+        self._next_id = 0
+        self._slot_of: Dict[int, int] = {}
+
+    @classmethod
+    def from_arrays(cls, masses, locations, rotations=None) -> InertiaCollection:
+        masses = np.atleast_1d(np.asarray(masses, dtype=np.float64))
+        collection = cls(capacity=len(masses))
+        collection.add(masses, locations, rotations)
+        return collection
+
+    @classmethod
+    def from_inertias(cls, inertias:Iterable[Inertia]) -> InertiaCollection:
+        inertias = list(inertias)
+        masses = [np.atleast_1d(magnitude(i.translation, "kg"))[-1] for i in inertias]
+        locations = [magnitude(i.location, "m") for i in inertias]
+        rotations = [magnitude(i.rotation, "kg*m**2") for i in inertias]
+        return cls.from_arrays(masses, np.reshape(locations, (-1, 3)), np.reshape(rotations, (-1, 3, 3)))
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __repr__(self):
+        return f"InertiaCollection(n={self._size}, mass={self.total_mass:g})"
+
+    @property
+    def masses(self) -> np.ndarray:
+        return self._masses[:self._size]
+
+    @property
+    def locations(self) -> np.ndarray:
+        return self._locations[:self._size]
+
+    @property
+    def rotations(self) -> np.ndarray:
+        return self._rotations[:self._size]
+
+    @property
+    def ids(self) -> np.ndarray:
+        return self._ids[:self._size]
+
+    def _reserve(self, n:int):
+        capacity = len(self._masses)
+        if n <= capacity:
+            return
+        capacity = max(n, 2*capacity)
+        for name in ("_masses", "_locations", "_rotations", "_ids"):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self._size] = old[:self._size]
+            setattr(self, name, new)
+
+    def add(self, masses, locations, rotations=None) -> np.ndarray:
+        """Add one or more items and return their ids.
+
+        masses: (n,) or scalar [kg]
+        locations: (n,3) or (3,) [m]
+        rotations: (n,3,3) or (3,3) rotational inertia about the item location [kg m2]
+        """
+        masses = np.atleast_1d(np.asarray(masses, dtype=np.float64))
+        n = len(masses)
+        locations = np.broadcast_to(np.asarray(locations, dtype=np.float64), (n, 3))
+        rotations = np.zeros((n, 3, 3)) if rotations is None else \
+            np.broadcast_to(np.asarray(rotations, dtype=np.float64), (n, 3, 3))
+
+        start, stop = self._size, self._size + n
+        self._reserve(stop)
+        ids = np.arange(self._next_id, self._next_id + n)
+        self._masses[start:stop] = masses
+        self._locations[start:stop] = locations
+        self._rotations[start:stop] = rotations
+        self._ids[start:stop] = ids
+        self._slot_of.update(zip(ids.tolist(), range(start, stop)))
+        self._size = stop
+        self._next_id += n
+        return ids
+
+    def remove(self, ids):
+        """Remove the items with the given id(s)"""
+        for item in np.atleast_1d(ids).tolist():
+            slot = self._slot_of.pop(item)
+            last = self._size - 1
+            if slot != last:
+                self._masses[slot] = self._masses[last]
+                self._locations[slot] = self._locations[last]
+                self._rotations[slot] = self._rotations[last]
+                self._ids[slot] = self._ids[last]
+                self._slot_of[int(self._ids[slot])] = slot
+            self._size = last
+
+    def update(self, ids, masses=None, locations=None, rotations=None):
+        """Change the properties of existing items in place"""
+        slots = np.array([self._slot_of[i] for i in np.atleast_1d(ids).tolist()], dtype=np.int64)
+        if masses is not None:
+            self._masses[slots] = masses
+        if locations is not None:
+            self._locations[slots] = locations
+        if rotations is not None:
+            self._rotations[slots] = rotations
+
+    @property
+    def total_mass(self) -> float:
+        return float(self.masses.sum())
+
+    def mass_matrix(self, reference_point=(0.0, 0.0, 0.0)) -> np.ndarray:
+        """Return the combined 6x6 rigid-body mass matrix about `reference_point`,
+        computed in one vectorized pass over all items."""
+        m = self.masses
+        r = self.locations - np.asarray(reference_point, dtype=np.float64)
+        mass = m.sum()
+        first = m @ r                                   # sum m r
+        second = np.einsum("i,ij,ik->jk", m, r, r)      # sum m r r^T
+        S = skew(first)
+
+        M = np.zeros((6, 6))
+        M[:3, :3] = mass*np.eye(3)
+        M[:3, 3:] = -S
+        M[3:, :3] = S
+        M[3:, 3:] = self.rotations.sum(axis=0) + np.trace(second)*np.eye(3) - second
+        return M
+
+    # --- Inertia interface: the combined body ---------------------------------------
+
+    @property
+    def translation(self) -> float:
+        return self.total_mass
+
+    @property
+    def location(self) -> np.ndarray:
+        mass = self.total_mass
+        if mass == 0:
+            return np.zeros(3)
+        return self.masses @ self.locations / mass
+
+    @property
+    def rotation(self) -> np.ndarray:
+        """Combined rotational inertia tensor about the centre of gravity"""
+        return self.mass_matrix(self.location)[3:, 3:]
+
+
+def surface_inertia(mesh, mass_per_area) -> InertiaCollection:
+    """Return the point masses of a surface mass per area [kg/m2] (scalar or one value
+    per panel) lumped at the panel centroids of `mesh`"""
+    masses = np.broadcast_to(np.asarray(mass_per_area, dtype=np.float64), (mesh.n_panels,)) * mesh.areas
+    hit = masses != 0
+    return InertiaCollection.from_arrays(masses[hit], mesh.centroids[hit])
+
+
+def inertia_in_state(inertia:Inertia, mesh, state, attribute:str="mass_per_area") -> Inertia:
+    """Return the inertia of a body in `state`, given its root state inertia and mesh.
+
+    For a DeltaState, the change of the `attribute` panel mass per area w.r.t. the
+    root state is lumped at the panel centroids and added to the root inertia; the
+    root inertia itself is not recomputed. Other states return `inertia` unchanged.
+    """
+    if not isinstance(state, DeltaState):
+        return inertia
+    n = mesh.n_panels
+    before = np.broadcast_to(mesh.attributes.get(attribute, 0.0), (n,))
+    after = state.apply(mesh.attributes, n, context=mesh).get(attribute, before)
+    extra = surface_inertia(mesh, after - before)
+    if not len(extra):
+        return inertia
+    combined = inertia if isinstance(inertia, InertiaCollection) else InertiaCollection.from_inertias([inertia])
+    out = InertiaCollection(capacity=len(combined) + len(extra))
+    out.add(combined.masses, combined.locations, combined.rotations)
+    out.add(extra.masses, extra.locations)
+    return out
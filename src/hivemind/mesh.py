@@ -0,0 +1,481 @@
+from __future__ import annotations
+from .abstracts import Mesh, DeltaState, State
+from .spatial import BoundingVolumeHierarchy
+from functools import cached_property
+from pathlib import Path
+from typing import Callable, Dict, Sequence, Tuple
+import json
+import os
+import numpy as np
+
+
+
+class ArrayMesh(Mesh):
+    """Mesh of polygonal panels backed by contiguous numpy arrays.
+
+    The nodes are stored as one (N,3) float64 array. The panels are stored in
+    compressed sparse row (CSR) form: the node indices of panel i are
+    ``indices[indptr[i]:indptr[i+1]]``. Panels are expected to be ordered
+    counter-clockwise when seen from outside, such that normals point outward.
+
+    Per-panel data (e.g. a component label or a coating thickness) can be attached
+    through `attributes`, a dictionary of arrays with one entry per panel.
+
+    Derived panel properties (centroids, normals, areas) are computed once,
+    vectorized over all panels, and cached on the instance. An ArrayMesh is
+    therefore considered immutable after construction.
+    """
+
+    def __init__(self, nodes, indptr, indices, attributes:Dict[str, np.ndarray]|None=None):
+        nodes = np.asarray(nodes, dtype=np.float64)
+        indptr = np.asarray(indptr, dtype=np.int64)
+        indices = np.asarray(indices, dtype=np.int64)
+
+        if nodes.ndim != 2 or nodes.shape[1] != 3:
+            raise ValueError(f"nodes must have shape (N,3), got {nodes.shape}")
+        if indptr.ndim != 1 or len(indptr) < 1:
+            raise ValueError("indptr must be a 1D array with at least one entry")
+        if np.any(np.diff(indptr) < 3):
+            raise ValueError("Every panel must have at least 3 nodes")
+
+        self._nodes = np.ascontiguousarray(nodes)
+        self._indptr = indptr
+        self._indices = indices
+        self._attributes = {}
+        for name, values in (attributes or {}).items():
+            values = np.asarray(values)
+            if len(values) != self.n_panels:
+                raise ValueError(f"Attribute '{name}' has {len(values)} entries, expected {self.n_panels}")
+            self._attributes[name] = values
+
+    @classmethod
+    def from_panels(cls, nodes, panels:Sequence[Sequence[int]], attributes=None) -> ArrayMesh:
+        """Create an ArrayMesh from a sequence of panels, each a sequence of node indices.
+        Panels may have a different number of nodes."""
+        sizes = np.fromiter((len(p) for p in panels), dtype=np.int64, count=len(panels))
+        indptr = np.zeros(len(sizes)+1, dtype=np.int64)
+        np.cumsum(sizes, out=indptr[1:])
+        if len(panels):
+            indices = np.fromiter((i for p in panels for i in p), dtype=np.int64, count=indptr[-1])
+        else:
+            indices = np.zeros(0, dtype=np.int64)
+        return cls(nodes, indptr, indices, attributes)
+
+    @classmethod
+    def from_array(cls, nodes, panels, attributes=None) -> ArrayMesh:
+        """Create an ArrayMesh from a (P,k) array of panels that all have k nodes,
+        e.g. an array of triangles or quadrilaterals."""
+        panels = np.asarray(panels, dtype=np.int64)
+        if panels.ndim != 2:
+            raise ValueError(f"panels must have shape (P,k), got {panels.shape}")
+        n_panels, k = panels.shape
+        indptr = np.arange(0, n_panels*k + 1, k, dtype=np.int64)
+        return cls(nodes, indptr, panels.ravel(), attributes)
+
+    @classmethod
+    def from_mesh(cls, mesh:Mesh) -> ArrayMesh:
+        """Convert any Mesh whose `connectivity` is a sequence of panels into an ArrayMesh.
+        ArrayMesh instances are returned as is."""
+        if isinstance(mesh, ArrayMesh):
+            return mesh
+        return cls.from_panels(mesh.nodes, mesh.connectivity)
+
+    @property
+    def nodes(self) -> np.ndarray:
+        """(N,3) array of node coordinates"""
+        return self._nodes
+
+    @property
+    def connectivity(self) -> Tuple[np.ndarray, np.ndarray]:
+        """The CSR connectivity as a tuple (indptr, indices)"""
+        return self._indptr, self._indices
+
+    @property
+    def indptr(self) -> np.ndarray:
+        return self._indptr
+
+    @property
+    def indices(self) -> np.ndarray:
+        return self._indices
+
+    @property
+    def attributes(self) -> Dict[str, np.ndarray]:
+        return self._attributes
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self._nodes)
+
+    @property
+    def n_panels(self) -> int:
+        return len(self._indptr) - 1
+
+    @property
+    def panel_sizes(self) -> np.ndarray:
+        """Number of nodes of each panel"""
+        return np.diff(self._indptr)
+
+    def panel(self, i:int) -> np.ndarray:
+        """Return the node indices of panel i"""
+        return self._indices[self._indptr[i]:self._indptr[i+1]]
+
+    def __len__(self) -> int:
+        return self.n_panels
+
+    def __repr__(self):
+        return f"ArrayMesh(n_nodes={self.n_nodes}, n_panels={self.n_panels})"
+
+    # --- Vectorized panel properties -------------------------------------------------
+
+    @cached_property
+    def _local_indices(self) -> np.ndarray:
+        """The part of `indices` referenced by this mesh (a view, not a copy)"""
+        return self._indices[self._indptr[0]:self._indptr[-1]]
+
+    @cached_property
+    def _fan(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Fan triangulation of all panels: returns the node indices of each triangle
+        (three arrays) and the panel each triangle belongs to."""
+        sizes = self.panel_sizes
+        starts = self._indptr[:-1] - self._indptr[0]
+        n_tri = sizes - 2
+        owner = np.repeat(np.arange(self.n_panels), n_tri)
+        # position of the second triangle node within the local index array
+        offset = np.arange(len(owner)) - np.repeat(np.cumsum(n_tri) - n_tri, n_tri)
+        second = starts[owner] + 1 + offset
+        idx = self._local_indices
+        return idx[starts[owner]], idx[second], idx[second+1], owner
+
+    def triangles(self) -> np.ndarray:
+        """(T,3) array of node indices of the fan triangulation of all panels"""
+        i0, i1, i2, _ = self._fan
+        return np.stack([i0, i1, i2], axis=1)
+
+    @cached_property
+    def _triangle_properties(self):
+        i0, i1, i2, owner = self._fan
+        p0, p1, p2 = self._nodes[i0], self._nodes[i1], self._nodes[i2]
+        area_vectors = 0.5*np.cross(p1 - p0, p2 - p0)
+        centroids = (p0 + p1 + p2) / 3.0
+        return area_vectors, centroids, owner
+
+    @cached_property
+    def area_vectors(self) -> np.ndarray:
+        """(P,3) array of panel normals scaled with the panel area"""
+        tri_vectors, _, owner = self._triangle_properties
+        return _sum_by(owner, tri_vectors, self.n_panels)
+
+    @cached_property
+    def areas(self) -> np.ndarray:
+        """(P,) array of panel areas"""
+        return np.linalg.norm(self.area_vectors, axis=1)
+
+    @cached_property
+    def normals(self) -> np.ndarray:
+        """(P,3) array of unit panel normals"""
+        areas = self.areas
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(areas[:, None] > 0, self.area_vectors / areas[:, None], 0.0)
+
+    @cached_property
+    def centroids(self) -> np.ndarray:
+        """(P,3) array of panel centroids (area weighted for non-triangular panels)"""
+        tri_vectors, tri_centroids, owner = self._triangle_properties
+        # weigh each triangle with its area projected on the panel normal, which is
+        # exact for planar panels and well-behaved for slightly warped ones.
+        weights = np.einsum("ij,ij->i", tri_vectors, self.normals[owner])
+        moment = _sum_by(owner, tri_centroids * weights[:, None], self.n_panels)
+        total = np.bincount(owner, weights=weights, minlength=self.n_panels)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            centroids = moment / total[:, None]
+        # degenerate panels fall back on the mean of their nodes
+        bad = ~(total > 0)
+        if np.any(bad):
+            starts = self._indptr[:-1] - self._indptr[0]
+            sums = np.add.reduceat(self._nodes[self._local_indices], starts, axis=0)
+            centroids[bad] = sums[bad] / self.panel_sizes[bad, None]
+        return centroids
+
+    @property
+    def total_area(self) -> float:
+        return float(self.areas.sum())
+
+    @cached_property
+    def spatial_index(self) -> BoundingVolumeHierarchy:
+        """Bounding volume hierarchy over the panels, built on first use and cached with
+        the mesh. See hivemind.spatial for the plane, box and nearest panel queries."""
+        return BoundingVolumeHierarchy(self)
+
+    @property
+    def bounds(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the (min, max) corner of the axis-aligned bounding box of the nodes"""
+        return self._nodes.min(axis=0), self._nodes.max(axis=0)
+
+    # --- Subsets -------------------------------------------------------------------
+
+    def view(self, start:int, stop:int) -> ArrayMesh:
+        """Return the contiguous range of panels [start, stop) as a new ArrayMesh.
+
+        This is zero-copy: the returned mesh shares the node, index and attribute
+        arrays with this mesh.
+        """
+        start, stop, _ = slice(start, stop).indices(self.n_panels)
+        stop = max(start, stop)
+        attributes = {k: v[start:stop] for k, v in self._attributes.items()}
+        return ArrayMesh(self._nodes, self._indptr[start:stop+1], self._indices, attributes)
+
+    def select(self, panels) -> ArrayMesh:
+        """Return the panels selected by a boolean mask or an index array as a new ArrayMesh.
+
+        The node array is shared with this mesh; only the (small) connectivity of the
+        selected panels is gathered. Use `view` where the selection is a contiguous range.
+        """
+        panels = np.asarray(panels)
+        if panels.dtype == bool:
+            if len(panels) != self.n_panels:
+                raise ValueError(f"Boolean mask has {len(panels)} entries, expected {self.n_panels}")
+            panels = np.flatnonzero(panels)
+        sizes = self.panel_sizes[panels]
+        indptr = np.zeros(len(panels)+1, dtype=np.int64)
+        np.cumsum(sizes, out=indptr[1:])
+        starts = self._indptr[panels]
+        positions = np.repeat(starts - indptr[:-1], sizes) + np.arange(indptr[-1])
+        attributes = {k: v[panels] for k, v in self._attributes.items()}
+        return ArrayMesh(self._nodes, indptr, self._indices[positions], attributes)
+
+    def component(self, label, attribute:str="component") -> ArrayMesh:
+        """Return the panels for which `attributes[attribute] == label`.
+
+        When the panels of the component are stored contiguously (which is the case
+        if the mesh was assembled component by component) a zero-copy view is returned.
+        """
+        if attribute not in self._attributes:
+            raise KeyError(f"Mesh has no attribute '{attribute}'")
+        hits = np.flatnonzero(self._attributes[attribute] == label)
+        if len(hits) and hits[-1] - hits[0] + 1 == len(hits):
+            return self.view(hits[0], hits[-1] + 1)
+        return self.select(hits)
+
+    def compact(self) -> ArrayMesh:
+        """Return a copy that only holds the nodes that are referenced by the panels.
+        This is useful before storing a small subset of a large mesh."""
+        used, inverse = np.unique(self._local_indices, return_inverse=True)
+        indptr = self._indptr - self._indptr[0]
+        attributes = {k: np.array(v) for k, v in self._attributes.items()}
+        return ArrayMesh(self._nodes[used], indptr, inverse.reshape(-1), attributes)
+
+    # --- Storage ---------------------------------------------------------------------
+
+    def save(self, file:Path|str, metadata:Dict[str, str]|None=None, include_derived:bool=True) -> Path:
+        """Store the mesh in the binary mesh format, see `load`.
+
+        metadata: small dictionary of strings stored in the header, e.g. the hash of
+            the parameters the mesh was generated from.
+        include_derived: also store centroids, normals and areas, such that they page in
+            from disk instead of being recomputed by every process that loads the mesh.
+        """
+        mesh = self.compact() if self._indptr[0] != 0 or len(self._indices) != self._indptr[-1] else self
+        arrays = {"nodes": mesh.nodes, "indptr": mesh.indptr, "indices": mesh.indices}
+        arrays.update({f"attribute:{k}": v for k, v in mesh.attributes.items()})
+        if include_derived:
+            arrays.update({f"derived:{k}": getattr(mesh, k) for k in _DERIVED})
+        return _write_arrays(file, arrays, metadata or {})
+
+    @classmethod
+    def load(cls, file:Path|str, mmap:bool=True) -> ArrayMesh:
+        """Load a mesh stored with `save`.
+
+        With `mmap` the arrays are opened read-only through numpy.memmap: nothing is read
+        until it is used, and processes that open the same file share its pages through
+        the OS page cache.
+        """
+        arrays, _ = _read_arrays(file, mmap)
+        attributes = {k.split(":", 1)[1]: v for k, v in arrays.items() if k.startswith("attribute:")}
+        mesh = cls(arrays["nodes"], arrays["indptr"], arrays["indices"], attributes)
+        for k in _DERIVED:
+            if f"derived:{k}" in arrays:
+                mesh.__dict__[k] = arrays[f"derived:{k}"]  # prefill the cached_property
+        return mesh
+
+    def with_attributes(self, attributes:Dict[str, np.ndarray]) -> ArrayMesh:
+        """Return a mesh with other per-panel attributes that shares the geometry with
+        this mesh, including the derived panel properties that were already computed."""
+        mesh = ArrayMesh(self._nodes, self._indptr, self._indices, attributes)
+        mesh.__dict__.update({k: v for k, v in self.__dict__.items() if k in _GEOMETRY_CACHE})
+        return mesh
+
+    def in_state(self, state:State) -> ArrayMesh:
+        """Return this (root state) mesh as seen in `state`.
+
+        For a DeltaState the deltas of the state and its parents are applied to the
+        panel attributes copy-on-write; the geometry is shared. Other states return
+        the mesh itself.
+        """
+        if not isinstance(state, DeltaState):
+            return self
+        return self.with_attributes(state.apply(self._attributes, self.n_panels, context=self))
+
+    def transformed(self, rotation=None, translation=None) -> ArrayMesh:
+        """Return a new ArrayMesh with nodes ``rotation @ node + translation``.
+        The connectivity and attributes are shared."""
+        nodes = self._nodes
+        if rotation is not None:
+            nodes = nodes @ np.asarray(rotation, dtype=np.float64).T
+        if translation is not None:
+            nodes = nodes + np.asarray(translation, dtype=np.float64)
+        return ArrayMesh(nodes, self._indptr, self._indices, self._attributes)
+
+
+# Binary mesh format:
+#   8 bytes magic, 8 bytes little-endian header length, a JSON header and the raw
+#   array data. The header lists the dtype, shape and offset of every array; the
+#   arrays are aligned to _ALIGN bytes such that they can be memory-mapped directly.
+_MAGIC = b"HMMESH01"
+_ALIGN = 64
+_DERIVED = ("centroids", "normals", "areas", "area_vectors")
+_GEOMETRY_CACHE = _DERIVED + ("_local_indices", "_fan", "_triangle_properties", "spatial_index")
+
+
+def _write_arrays(file:Path|str, arrays:Dict[str, np.ndarray], metadata:Dict[str, str]) -> Path:
+    file = Path(file)
+    entries = {}
+    offset = 0
+    for name, array in arrays.items():
+        array = np.asarray(array)
+        dtype = array.dtype.newbyteorder("<") if array.dtype.byteorder not in "|" else array.dtype
+        entries[name] = {"dtype": dtype.str, "shape": list(array.shape), "offset": offset}
+        offset += -(-array.nbytes // _ALIGN) * _ALIGN
+
+    header = json.dumps({"version": 1, "arrays": entries, "metadata": metadata}).encode()
+    data_start = -(-(len(_MAGIC) + 8 + len(header)) // _ALIGN) * _ALIGN
+
+    # Write to a temporary file first, so readers never see a partial mesh
+    tmp = file.with_name(f"{file.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(_MAGIC)
+        f.write(len(header).to_bytes(8, "little"))
+        f.write(header)
+        for name, array in arrays.items():
+            f.seek(data_start + entries[name]["offset"])
+            f.write(np.ascontiguousarray(array, dtype=entries[name]["dtype"]).tobytes())
+        f.truncate(data_start + offset)
+    os.replace(tmp, file)
+    return file
+
+
+def _read_header(file:Path|str) -> Tuple[dict, int]:
+    with open(file, "rb") as f:
+        if f.read(len(_MAGIC)) != _MAGIC:
+            raise ValueError(f"{file} is not a hivemind mesh file")
+        size = int.from_bytes(f.read(8), "little")
+        header = json.loads(f.read(size))
+    data_start = -(-(len(_MAGIC) + 8 + size) // _ALIGN) * _ALIGN
+    return header, data_start
+
+
+def _read_arrays(file:Path|str, mmap:bool=True) -> Tuple[Dict[str, np.ndarray], Dict[str, str]]:
+    header, data_start = _read_header(file)
+    arrays = {}
+    for name, entry in header["arrays"].items():
+        dtype, shape = np.dtype(entry["dtype"]), tuple(entry["shape"])
+        if mmap and np.prod(shape) > 0:
+            arrays[name] = np.memmap(file, dtype=dtype, mode="r", offset=data_start + entry["offset"], shape=shape)
+        else:
+            with open(file, "rb") as f:
+                f.seek(data_start + entry["offset"])
+                arrays[name] = np.fromfile(f, dtype=dtype, count=int(np.prod(shape))).reshape(shape)
+    return arrays, header["metadata"]
+
+
+def read_metadata(file:Path|str) -> Dict[str, str]:
+    """Return the metadata stored in the header of a mesh file without touching the arrays"""
+    return _read_header(file)[0]["metadata"]
+
+
+def cached_mesh(file:Path|str, build:Callable[[], ArrayMesh], key:str) -> ArrayMesh:
+    """Return the mesh stored in `file` if it was built for `key`, otherwise call `build`,
+    store its result and return it memory-mapped.
+
+    Typical use in a Structure, where the key ties the file to the design:
+
+        def get_mesh(self):
+            return cached_mesh(self.mesh_file, self._build_mesh, parameter_hash(self.parameters))
+    """
+    file = Path(file)
+    if file.exists():
+        try:
+            if read_metadata(file).get("key") == key:
+                return ArrayMesh.load(file)
+        except (ValueError, OSError):
+            pass  # unreadable or outdated file: rebuild
+    ArrayMesh.from_mesh(build()).save(file, metadata={"key": key})
+    return ArrayMesh.load(file)
+
+
+def _sum_by(owner:np.ndarray, values:np.ndarray, n:int) -> np.ndarray:
+    """Sum the rows of the (T,3) array `values` into n bins given by `owner`"""
+    if len(owner) == n:  # one triangle per panel
+        return np.array(values, dtype=np.float64)
+    return np.stack([np.bincount(owner, weights=values[:, k], minlength=n) for k in range(3)], axis=1)
+
+
+def merge(meshes:Sequence[ArrayMesh], attribute:str|None="component") -> ArrayMesh:
+    """Concatenate several meshes into one ArrayMesh.
+
+    If `attribute` is given, a per-panel array with that name is added holding the
+    position of the source mesh, such that `ArrayMesh.component` returns zero-copy
+    views of the original parts.
+    """
+    meshes = [ArrayMesh.from_mesh(m) for m in meshes]
+    node_offsets = np.cumsum([0] + [m.n_nodes for m in meshes])
+    nodes = np.concatenate([m.nodes for m in meshes]) if meshes else np.zeros((0, 3))
+    indices = np.concatenate([m._local_indices + off for m, off in zip(meshes, node_offsets)]) \
+        if meshes else np.zeros(0, dtype=np.int64)
+    sizes = np.concatenate([m.panel_sizes for m in meshes]) if meshes else np.zeros(0, dtype=np.int64)
+    indptr = np.zeros(len(sizes)+1, dtype=np.int64)
+    np.cumsum(sizes, out=indptr[1:])
+
+    names = set.intersection(*(set(m.attributes) for m in meshes)) if meshes else set()
+    attributes = {name: np.concatenate([m.attributes[name] for m in meshes]) for name in names}
+    if attribute:
+        attributes[attribute] = np.repeat(np.arange(len(meshes)), [m.n_panels for m in meshes])
+    return ArrayMesh(nodes, indptr, indices, attributes)
+
+
+def box(length:float, width:float, depth:float, nx:int=1, ny:int=1, nz:int=1) -> ArrayMesh:
+    """Return a closed box mesh of quadrilateral panels with outward normals.
+
+    The box spans x in [-length/2, length/2], y in [-width/2, width/2] and
+    z in [0, depth], i.e. the origin is at keel level in the centre of the box.
+    """
+    xs = np.linspace(-length/2, length/2, nx+1)
+    ys = np.linspace(-width/2, width/2, ny+1)
+    zs = np.linspace(0.0, depth, nz+1)
+
+    nodes = []
+    panels = []
+
+    def add_face(u, v, point):
+        # u, v: 1D arrays of the grid coordinates; point(u, v) -> xyz, oriented such
+        # that (du x dv) points outward.
+        offset = sum(len(n) for n in nodes)
+        U, V = np.meshgrid(u, v, indexing="ij")
+        nodes.append(point(U.ravel(), V.ravel()))
+        nu, nv = len(u), len(v)
+        i, j = np.meshgrid(np.arange(nu-1), np.arange(nv-1), indexing="ij")
+        i, j = i.ravel(), j.ravel()
+        n0 = offset + i*nv + j
+        panels.append(np.stack([n0, n0 + nv, n0 + nv + 1, n0 + 1], axis=1))
+
+    full = lambda c: np.full_like(c, 0.0)
+    add_face(xs, ys[::-1], lambda u, v: np.stack([u, v, full(u)], axis=1))              # bottom, -z
+    add_face(xs, ys, lambda u, v: np.stack([u, v, full(u) + depth], axis=1))            # top, +z
+    add_face(xs, zs, lambda u, v: np.stack([u, full(u) - width/2, v], axis=1))          # y-, -y
+    add_face(xs, zs[::-1], lambda u, v: np.stack([u, full(u) + width/2, v], axis=1))    # y+, +y
+    add_face(ys, zs[::-1], lambda u, v: np.stack([full(u) - length/2, u, v], axis=1))   # x-, -x
+    add_face(ys, zs, lambda u, v: np.stack([full(u) + length/2, u, v], axis=1))         # x+, +x
+
+    # Merge coincident nodes on the box edges
+    all_nodes = np.concatenate(nodes)
+    unique, inverse = np.unique(np.round(all_nodes, 9), axis=0, return_inverse=True)
+    return ArrayMesh.from_array(unique, inverse.reshape(-1)[np.concatenate(panels)])
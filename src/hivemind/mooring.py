@@ -1,14 +1,22 @@
 from __future__ import annotations
-from .abstracts import Base, State
+from .abstracts import Base, State, DeltaState, magnitude, parameter_hash
+from .catenary import solve_catenary
+from .export import LocalModel, ModelDescription, write
+from .mesh import ArrayMesh
 from abc import ABC, abstractmethod, abstractproperty
 from enum import Enum
-from typing import Dict
+from pathlib import Path
+from typing import Dict, NamedTuple, Tuple
 from carg_io.abstracts import ParameterSet, Parameter, units
+import hashlib
+import numpy as np
 
 
 
 class MooringSystem(Base):
-    
+
+    _cached_methods = ("get_line_attributes", "get_restoring_table")
+
     def __init__(self, parameters:ParameterSet):
         self._parameters = parameters
         self._possible_states = {
@@ -18,6 +26,7 @@ class MooringSystem(Base):
         }
         self._state = self._possible_states["InSitu"]
         self._previous_state = None
+        self.table_directory: Path|None = None
 
     @property   
     def state(self) -> MooringSystemState:
@@ -42,41 +51,317 @@ class MooringSystem(Base):
 
     @property
     def previous_state(self) -> MooringSystemState|None:
-        raise NotImplementedError()
+        """The state before the last change_state. States only hold deltas on shared
+        data, so the previous state is a cheap snapshot that can be queried as is."""
+        return self._previous_state
 
     def create_in_ofx(self, model):
         self.state.create_in_ofx(model)
 
+    def describe(self, description:ModelDescription|None=None) -> ModelDescription:
+        """Return the flat description of all objects the current state would create"""
+        description = ModelDescription() if description is None else description
+        self.state.describe(description)
+        return description
+
+    @property
+    def number_of_lines(self) -> int:
+        p = self.parameters
+        return int(p.NumberOfBundles[None]) * int(p.NumberOfLinesPerBundle[None])
+
+    def get_layout(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the (n,3) anchor positions (earth frame) and (n,3) fairlead positions
+        (vessel frame) of all lines, bundle by bundle.
+
+        The bundles are spread evenly around the vessel, the first one along +x. Within
+        a bundle the lines are `BundleSpread` apart, centred on the bundle heading.
+        """
+        p = self.parameters
+        n_bundles = int(p.NumberOfBundles[None])
+        n_lines = int(p.NumberOfLinesPerBundle[None])
+        spread = magnitude(p.BundleSpread, "rad")
+        bundle = 2*np.pi*np.arange(n_bundles) / n_bundles
+        within = spread*(np.arange(n_lines) - (n_lines - 1)/2)
+        heading = (bundle[:, None] + within[None, :]).ravel()
+        c, s = np.cos(heading), np.sin(heading)
+
+        anchor_radius = magnitude(p.AnchorRadius, "m")
+        fairlead_radius = magnitude(p.FairleadRadius, "m")
+        anchors = np.stack([anchor_radius*c, anchor_radius*s, np.full_like(c, -magnitude(p.WaterDepth, "m"))], axis=1)
+        fairleads = np.stack([fairlead_radius*c, fairlead_radius*s, np.full_like(c, -magnitude(p.FairleadDepth, "m"))], axis=1)
+        return anchors, fairleads
+
+    def get_fairlead_attachments(self, mesh, draft:float) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the hull panel nearest to every fairlead and its distance [m], e.g. to
+        check that the fairleads sit on the hull or to attach the lines to the panels.
+
+        mesh: the hull, in body coordinates (origin at the keel, see hivemind.hydrostatics)
+        draft: of the vessel [m], which places the fairleads (given below the waterline)
+            in body coordinates
+        """
+        _, fairleads = self.get_layout()
+        return ArrayMesh.from_mesh(mesh).spatial_index.nearest(fairleads + (0.0, 0.0, draft))
+
+    def get_line_attributes(self, state:MooringSystemState|None=None) -> Dict[str, np.ndarray]:
+        """Return per-line arrays of the unstretched length [m], submerged weight [N/m],
+        axial stiffness [N] and drag diameter [m] in `state` (default: the current state).
+
+        States that are DeltaStates (e.g. Weathered) apply their changes on top of the
+        arrays of their parent copy-on-write.
+        """
+        p = self.parameters
+        n = self.number_of_lines
+        attributes = {
+            "length": np.full(n, float(magnitude(p.LineLength, "m"))),
+            "weight": np.full(n, float(magnitude(p.LineSubmergedWeight, "N/m"))),
+            "axial_stiffness": np.full(n, float(magnitude(p.LineAxialStiffness, "N"))),
+            "drag_diameter": np.full(n, float(magnitude(p.LineDiameter, "m"))),
+        }
+        state = self.state if state is None else state
+        if isinstance(state, DeltaState):
+            attributes = state.apply(attributes, n)
+        return attributes
+
+    def get_line_properties(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Return the (n,) unstretched length [m], submerged weight [N/m] and axial stiffness [N] of all lines"""
+        attributes = self.get_line_attributes()
+        return attributes["length"], attributes["weight"], attributes["axial_stiffness"]
+
+    def solve(self, offsets, **kwargs) -> MooringResponse:
+        """Solve all lines quasi-statically for a batch of horizontal vessel offsets.
+
+        offsets: (K,3) or (3,) surge [m], sway [m] and yaw [deg] of the vessel
+        kwargs: passed on to hivemind.catenary.solve_catenary
+
+        Every line of every offset is solved in one vectorized catenary solve, including
+        seabed contact and elastic stretch. In states whose lines are not connected to
+        the vessel (e.g. LayDown) the lines exert no force and the fairlead tensions are zero.
+        """
+        offsets = np.atleast_2d(np.asarray(offsets, dtype=np.float64))
+        if not self.state.connected:
+            zeros = np.zeros((len(offsets), self.number_of_lines))
+            return MooringResponse(horizontal=zeros, vertical=zeros.copy(), tension=zeros.copy(),
+                                   force=np.zeros((len(offsets), 6)), converged=np.ones(zeros.shape, dtype=bool))
+        anchors, fairleads = self.get_layout()
+        length, weight, stiffness = self.get_line_properties()
+
+        yaw = np.radians(offsets[:, 2])
+        c, s = np.cos(yaw)[:, None], np.sin(yaw)[:, None]
+        # fairlead positions relative to the vessel origin, in the earth frame (K,n,3)
+        arm = np.stack([c*fairleads[:, 0] - s*fairleads[:, 1],
+                        s*fairleads[:, 0] + c*fairleads[:, 1],
+                        np.broadcast_to(fairleads[:, 2], c.shape[:1] + fairleads[:, 2].shape)], axis=-1)
+        position = arm + np.stack([offsets[:, 0], offsets[:, 1], np.zeros(len(offsets))], axis=1)[:, None, :]
+
+        towards_anchor = anchors[None, :, :2] - position[..., :2]
+        X = np.linalg.norm(towards_anchor, axis=-1)
+        Z = position[..., 2] - anchors[None, :, 2]
+        solution = solve_catenary(X, Z, length, weight, stiffness, **kwargs)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            direction = np.where(X[..., None] > 0, towards_anchor / X[..., None], 0.0)
+        line_force = np.concatenate([solution.horizontal[..., None]*direction, -solution.vertical[..., None]], axis=-1)
+        force = np.concatenate([line_force.sum(axis=1), np.cross(arm, line_force).sum(axis=1)], axis=-1)
+
+        return MooringResponse(
+            horizontal=solution.horizontal,
+            vertical=solution.vertical,
+            tension=solution.tension,
+            force=force,
+            converged=solution.converged,
+        )
+
+
+    def get_restoring_table(self, surge=(-50, 50, 41), sway=(-50, 50, 41), yaw=(-10, 10, 11),
+                            directory:Path|str|None=None) -> RestoringTable:
+        """Return the restoring-force table of the current state over a grid of offsets.
+
+        surge, sway [m] and yaw [deg]: grid axes, either (start, stop, num) or arrays.
+        directory: where tables are persisted, defaults to `self.table_directory`. If
+            None the table is only kept in memory.
+
+        Tables are memoized like the other cached methods (see Base) and persisted as
+        .npz files identified by the state and the hash of the parameters and the grid,
+        so they are rebuilt only when the parameters or the grid change.
+        """
+        axes = tuple(np.linspace(*axis) if isinstance(axis, tuple) else np.asarray(axis, dtype=np.float64)
+                     for axis in (surge, sway, yaw))
+        state = type(self.state).__name__
+        digest = hashlib.sha1(parameter_hash(self.parameters).encode())
+        for axis in axes:
+            digest.update(np.ascontiguousarray(axis, dtype=np.float64).tobytes())
+        key = f"{state}-{digest.hexdigest()[:16]}"
+
+        directory = directory if directory is not None else self.table_directory
+        file = Path(directory) / f"mooring-{key}.npz" if directory is not None else None
+        if file is not None and file.exists():
+            table = RestoringTable.load(file)
+        else:
+            table = RestoringTable.build(self, *axes)
+            if file is not None:
+                file.parent.mkdir(parents=True, exist_ok=True)
+                table.save(file)
+        return table
+
+    def restoring_force(self, offsets) -> np.ndarray:
+        """Return the (K,6) mooring force for (K,3) surge, sway, yaw offsets, interpolated
+        from the restoring table of the current state (built on first use)."""
+        return self.get_restoring_table().force(offsets)
+
+
+class RestoringTable:
+    """Mooring force and line tensions tabulated on a regular surge/sway/yaw grid.
+
+    Lookups are trilinear interpolations, vectorized over any number of offsets.
+    Offsets outside the grid are clamped to its edges.
+    """
+
+    def __init__(self, axes:Tuple[np.ndarray, np.ndarray, np.ndarray], forces:np.ndarray, tensions:np.ndarray):
+        self.axes = tuple(np.asarray(a, dtype=np.float64) for a in axes)
+        shape = tuple(len(a) for a in self.axes)
+        if any(n < 2 for n in shape):
+            raise ValueError("Every grid axis needs at least two points")
+        self.forces = np.asarray(forces).reshape(shape + (-1,))
+        self.tensions = np.asarray(tensions).reshape(shape + (-1,))
+
+    @classmethod
+    def build(cls, system:MooringSystem, surge, sway, yaw) -> RestoringTable:
+        """Solve the mooring system for every grid point in one batched call"""
+        grid = np.stack(np.meshgrid(surge, sway, yaw, indexing="ij"), axis=-1).reshape(-1, 3)
+        response = system.solve(grid)
+        return cls((surge, sway, yaw), response.force, response.tension)
+
+    def _corners(self, offsets):
+        offsets = np.atleast_2d(np.asarray(offsets, dtype=np.float64))
+        index, weight = [], []
+        for axis, x in zip(self.axes, offsets.T):
+            i = np.clip(np.searchsorted(axis, x) - 1, 0, len(axis) - 2)
+            t = np.clip((x - axis[i]) / (axis[i+1] - axis[i]), 0.0, 1.0)
+            index.append(i)
+            weight.append(t)
+        return index, weight
+
+    def _interpolate(self, values, offsets) -> np.ndarray:
+        (i, j, k), (u, v, w) = self._corners(offsets)
+        out = 0.0
+        for di, wi in ((0, 1-u), (1, u)):
+            for dj, wj in ((0, 1-v), (1, v)):
+                for dk, wk in ((0, 1-w), (1, w)):
+                    out = out + (wi*wj*wk)[:, None] * values[i+di, j+dj, k+dk]
+        return out
+
+    def force(self, offsets) -> np.ndarray:
+        """Return the (K,6) force on the vessel for (K,3) offsets"""
+        return self._interpolate(self.forces, offsets)
+
+    def tension(self, offsets) -> np.ndarray:
+        """Return the (K,n) fairlead tensions for (K,3) offsets"""
+        return self._interpolate(self.tensions, offsets)
+
+    def save(self, file:Path|str):
+        np.savez(file, surge=self.axes[0], sway=self.axes[1], yaw=self.axes[2],
+                 forces=self.forces, tensions=self.tensions)
+
+    @classmethod
+    def load(cls, file:Path|str) -> RestoringTable:
+        with np.load(file) as data:
+            return cls((data["surge"], data["sway"], data["yaw"]), data["forces"], data["tensions"])
+
+
+class MooringResponse(NamedTuple):
+    """Quasi-static response of all n lines for K vessel offsets"""
+    horizontal: np.ndarray  # (K,n) horizontal fairlead tension [N]
+    vertical: np.ndarray    # (K,n) vertical fairlead tension [N]
+    tension: np.ndarray     # (K,n) effective fairlead tension [N]
+    force: np.ndarray       # (K,6) total force [N] and moment [Nm] on the vessel about its origin
+    converged: np.ndarray   # (K,n) bool
+
 
 
 
 class MooringSystemState(State):
 
-    @abstractmethod
+    base: MooringSystem
+
     def create_in_ofx(self, model):
-        ...
+        """Create all objects of this state in `model` with one batched write,
+        see hivemind.export."""
+        description = ModelDescription()
+        self.describe(description)
+        write(description, model)
+
+    def describe(self, description:ModelDescription):
+        """Add the line type, the lines (anchor to fairlead) and their segments to `description`"""
+        system = self.base
+        anchors, fairleads = system.get_layout()
+        attributes = system.get_line_attributes(self)
+        length = attributes["length"]
+        name = type(self).__name__
+
+        line_type = description.add("line_types", name=f"{name} line type", weight=attributes["weight"][0],
+                                    axial_stiffness=attributes["axial_stiffness"][0],
+                                    drag_diameter=attributes["drag_diameter"][0])
+        lines = description.add("lines", name=[f"Line{i+1}" for i in range(len(anchors))],
+                                end_a=anchors, end_b=self._end_b(anchors, fairleads, length),
+                                connection_a="Anchored", connection_b=self._connection_b)
+        description.add("segments", line=lines, line_type=line_type[0], length=length,
+                        target_segment_length=5.0)
+
+    _connection_b = "Vessel"
+
+    @property
+    def connected(self) -> bool:
+        """Whether the lines are connected to the vessel and restrain it"""
+        return self._connection_b == "Vessel"
+
+    def _end_b(self, anchors, fairleads, length) -> np.ndarray:
+        return fairleads
 
 class LayDown(MooringSystemState):
     """State that represents the mooring system as it awaits hook-up"""
-    def create_in_ofx(self):
-        raise NotImplementedError()
+
+    _connection_b = "Free"
+
+    def _end_b(self, anchors, fairleads, length) -> np.ndarray:
+        # The line is laid on the seabed with its free end below the fairlead
+        end = np.array(fairleads)
+        end[:, 2] = anchors[:, 2]
+        return end
 
 class InSitu(MooringSystemState):
     """State that represents the mooring system after hook-up and tensioning"""
-    def create_in_ofx(self):
-        raise NotImplementedError()
 
-class Weathered(MooringSystemState):
+class Weathered(MooringSystemState, DeltaState):
     """State that represents the mooring system after a considerable amount of time.
-    This could include  e.g. marine growth, corrosion and creep."""
-    def create_in_ofx(self):
-        raise NotImplementedError()
+    This could include  e.g. marine growth, corrosion and creep.
+
+    Defined as deltas on InSitu: marine growth increases the drag diameter and the
+    submerged weight of the lines."""
+
+    parent = "InSitu"
+
+    def get_deltas(self):
+        p = self.base.parameters
+        return {
+            "drag_diameter": 2*magnitude(p.MarineGrowthThickness, "m"),
+            "weight": magnitude(p.MarineGrowthWeight, "N/m"),
+        }
 
 
 class MooringSystemParameters(ParameterSet):
     AnchorRadius:Parameter = 200 * units.m
     NumberOfLinesPerBundle:Parameter = 4
     NumberOfBundles:Parameter = 3
+    BundleSpread:Parameter = 5 * units.deg
+    FairleadRadius:Parameter = 20 * units.m
+    FairleadDepth:Parameter = 10 * units.m
+    WaterDepth:Parameter = 100 * units.m
+    LineLength:Parameter = 250 * units.m
+    LineSubmergedWeight:Parameter = 1500 * units.N/units.m
+    LineAxialStiffness:Parameter = 8e8 * units.N
+    LineDiameter:Parameter = 0.1 * units.m
+    MarineGrowthThickness:Parameter = 0.05 * units.m
+    MarineGrowthWeight:Parameter = 100 * units.N/units.m
     
 
 if __name__ == "__main__":
@@ -91,6 +376,6 @@ if __name__ == "__main__":
     from abstracts import test_subclass
     test_subclass(ms)
 
-    ms.create_in_ofx()
+    ms.create_in_ofx(LocalModel())
 
     
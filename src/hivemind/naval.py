@@ -1,17 +1,29 @@
 from __future__ import annotations
 from .abstracts import Base, State
-from .abstracts import Mesh, Inertia
+from .abstracts import Mesh, Inertia, magnitude
 from .structural import Structure
+from .mesh import ArrayMesh
+from . import hydrostatics
+from . import periods
+from . import rao
+from .equilibrium import Equilibrium, solve_equilibrium
+from .stability import GZCurves, gz_curves
+from .inertia import mass_matrix
 from abc import ABC, abstractmethod, abstractproperty
 from enum import Enum
 from typing import Dict
 from carg_io.abstracts import ParameterSet, Parameter, units
+import numpy as np
 
 
 
 class Naval(Base):
 
-    """Describe a structural object, i.e. anything that has mass and some spatial properties."""
+    """Describe a structural object, i.e. anything that has mass and some spatial properties.
+
+    The results of `get_stability` and `get_natural_periods` are cached, see Base.
+    """
+    _cached_methods = ("get_stability", "get_natural_periods")
 
     @abstractproperty
     def structure(self) -> Structure:
@@ -21,11 +33,115 @@ class Naval(Base):
     def get_stability(self):
         ...
     
-    def get_hydrostatic_stiffness(self):
-        ...
+    def solve_stability(self, drafts, angles=np.arange(0.0, 91.0), headings=(0.0,),
+                        free_surface_moment=None) -> GZCurves:
+        """Helper for implementations of `get_stability`.
+
+        Returns the GZ curves of `self.structure` for every upright draft [m] and heading
+        [deg], with the centre of gravity of `self.structure.get_inertia()`. See
+        `GZCurves.criteria()` for areas, maximum and angle of vanishing stability.
+
+        free_surface_moment: optional (2,) or (D,2) moments of slack tanks [kg m], e.g.
+            `TankCollection.evaluate(fills).free_surface_moment`, see hivemind.tanks.
+        """
+        cog = magnitude(self.structure.get_inertia().location, "m")
+        curves = gz_curves(self.structure.get_mesh(), drafts, cog, angles, headings)
+        if free_surface_moment is not None:
+            curves = curves.with_free_surface(free_surface_moment, self.water_density)
+        return curves
+
+    @property
+    def water_density(self) -> float:
+        """Water density in kg/m3, taken from the `WaterDensity` parameter"""
+        return magnitude(self.parameters.WaterDensity, "kg/m**3")
+
+    def get_hydrostatics(self, drafts, trims=0.0, heels=0.0) -> hydrostatics.HydrostaticProperties:
+        """Return the displaced volume, centre of buoyancy and waterplane properties
+        of `self.structure` for a batch of drafts [m], trims [deg] and heels [deg].
+
+        See hivemind.hydrostatics for the conventions used.
+        """
+        mesh = ArrayMesh.from_mesh(self.structure.get_mesh())
+        return hydrostatics.hydrostatics(mesh, drafts, trims, heels)
+
+    def get_hydrostatic_stiffness(self, drafts, trims=0.0, heels=0.0, include_weight:bool=False) -> np.ndarray:
+        """Return the 6x6 hydrostatic restoring matrix about the body origin.
+
+        The integration runs over the mesh of `self.structure` and uses the water density
+        of `self.parameters`. drafts [m], trims [deg] and heels [deg] may be scalars, which
+        returns a (6,6) matrix, or 1D arrays, which returns a stacked (K,6,6) result.
+
+        If `include_weight` is True the restoring contribution of the weight, as given by
+        `self.structure.get_inertia()`, is included.
+        """
+        batched = any(np.ndim(x) for x in (drafts, trims, heels))
+        properties = self.get_hydrostatics(drafts, trims, heels)
+
+        mass = cog = None
+        if include_weight:
+            inertia = self.structure.get_inertia()
+            mass = np.atleast_1d(magnitude(inertia.translation, "kg"))[-1]
+            cog = magnitude(inertia.location, "m")
+
+        stiffness = hydrostatics.stiffness_matrices(properties, self.water_density, mass=mass, centre_of_gravity=cog)
+        return stiffness if batched else stiffness[0]
 
     @abstractmethod
     def get_natural_periods(self):
         ...
 
+    def get_mass_matrix(self) -> np.ndarray:
+        """Return the 6x6 rigid-body mass matrix about the body origin, from `self.structure.get_inertia()`"""
+        return mass_matrix(self.structure.get_inertia())
+
+    def solve_natural_periods(self, drafts, trims=0.0, heels=0.0, added_mass=None, stiffness=None, coupled:bool=True):
+        """Helper for implementations of `get_natural_periods`.
+
+        Builds the mass matrix from `self.structure.get_inertia()` and the hydrostatic
+        stiffness (including weight) for the given positions, adds the optional added mass
+        and extra `stiffness` (e.g. mooring) and solves all positions in one batched
+        eigenproblem.
+
+        Returns (periods, modes) if `coupled`, otherwise the uncoupled heave, roll and
+        pitch periods only.
+        """
+        K = self.get_hydrostatic_stiffness(drafts, trims, heels, include_weight=True)
+        if stiffness is not None:
+            K = K + np.asarray(stiffness)
+        M = self.get_mass_matrix()
+        if not coupled:
+            return periods.uncoupled_natural_periods(M, K, added_mass)
+        return periods.natural_periods(M, 0.5*(K + np.swapaxes(K, -1, -2)), added_mass)
+
+    def get_raos(self, coefficients:rao.HydrodynamicCoefficients, draft, trim=0.0, heel=0.0,
+                 stiffness=None, damping=None) -> rao.RAO:
+        """Return the response amplitude operators at the given draft [m], trim [deg] and heel [deg].
+
+        The mass follows from `self.structure.get_inertia()`, the restoring from the
+        hydrostatic stiffness including weight, plus an optional extra `stiffness` (e.g.
+        mooring) and `damping` (e.g. linearized viscous damping). All frequencies and
+        headings of `coefficients` are solved at once, see hivemind.rao.
+        """
+        K = self.get_hydrostatic_stiffness(draft, trim, heel, include_weight=True)
+        if stiffness is not None:
+            K = K + np.asarray(stiffness)
+        return rao.response_amplitude_operators(self.get_mass_matrix(), K, coefficients, damping)
+
+    def get_equilibrium(self, extra_mass=0.0, extra_location=(0.0, 0.0, 0.0), guess=None, **kwargs) -> Equilibrium:
+        """Return the free floating draft, trim and heel for a batch of load cases.
+
+        Every load case adds a point mass `extra_mass` [kg] at `extra_location` [m] (body
+        coordinates) to `self.structure.get_inertia()`, e.g. the combined ballast and deck
+        load; pass (K,) and (K,3) arrays to solve K cases at once. `guess` warm starts
+        from a previous solution, see hivemind.equilibrium.
+        """
+        inertia = self.structure.get_inertia()
+        mass = np.atleast_1d(magnitude(inertia.translation, "kg"))[-1]
+        cog = np.asarray(magnitude(inertia.location, "m"), dtype=np.float64)
+        extra_mass = np.asarray(extra_mass, dtype=np.float64)
+        total = mass + extra_mass
+        centre = (mass*cog + extra_mass[..., None]*np.asarray(extra_location, dtype=np.float64)) / total[..., None]
+        mesh = ArrayMesh.from_mesh(self.structure.get_mesh())
+        return solve_equilibrium(mesh, self.water_density, total, centre, guess=guess, **kwargs)
+
     
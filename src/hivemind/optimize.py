@@ -0,0 +1,272 @@
+"""Surrogate-based design optimization over ParameterSet bounds.
+
+Grids over design dimensions grow combinatorially while every point needs a mesh and
+hydrostatics. The `Optimizer` instead evaluates a small Latin hypercube, fits a
+Gaussian process surrogate to the objective and to every constraint, and then picks
+batches of new designs by constrained expected improvement: the expected improvement
+over the best feasible design, times the probability that all constraints hold.
+Every batch is evaluated in parallel like a Sweep, with the same `base`, `build` and
+parameter names (see hivemind.sweep):
+
+    optimizer = Optimizer(base, build, objective="get_displacement",
+                          bounds={"Length": (80, 120), "Width": (30, 50)},
+                          constraints={"stability": Constraint(min_gm, lower=1.0),
+                                       "heave": Constraint("get_natural_periods", lower=20.0)})
+    result = optimizer.run(iterations=6, batch_size=4)
+    result.parameters   # {"Length": ..., "Width": ...}
+
+The objective is minimized (pass maximize=True otherwise). Constraints are feasible
+when they return a value >= 0; `Constraint` turns any output, e.g. of `get_stability`
+or `get_natural_periods`, into such a margin. Cases that raise are recorded in the
+history and left out of the surrogates.
+"""
+from __future__ import annotations
+from .sweep import ResultTable, Sweep, latin_hypercube, resolve
+from carg_io.abstracts import ParameterSet
+from operator import methodcaller
+from typing import Any, Callable, Dict, List, NamedTuple, Tuple
+import math
+import numpy as np
+
+
+LENGTH_SCALES = np.geomspace(0.05, 2.0, 12)  # candidates on the unit cube
+NUGGET = 1e-8
+
+
+_erf = np.vectorize(math.erf, otypes=[np.float64])
+
+
+def _normal_cdf(z):
+    return 0.5*(1 + _erf(np.asarray(z)/math.sqrt(2)))
+
+
+def _normal_pdf(z):
+    return np.exp(-0.5*np.asarray(z)**2)/math.sqrt(2*math.pi)
+
+
+class GaussianProcess:
+    """Gaussian process regression with a squared exponential kernel.
+
+    Inputs are expected on the unit cube and outputs are standardized internally. The
+    length scale is picked from LENGTH_SCALES by maximum marginal likelihood.
+    """
+
+    def __init__(self, length_scale:float|None=None, nugget:float=NUGGET):
+        self.length_scale = length_scale
+        self.nugget = nugget
+
+    def _kernel(self, a, b, length_scale):
+        d2 = ((a[:, None, :] - b[None, :, :])**2).sum(axis=-1)
+        return np.exp(-0.5*d2/length_scale**2)
+
+    def _factorize(self, length_scale):
+        K = self._kernel(self.X, self.X, length_scale) + self.nugget*np.eye(len(self.X))
+        L = np.linalg.cholesky(K)
+        alpha = np.linalg.solve(L.T, np.linalg.solve(L, self.z))
+        likelihood = -0.5*self.z @ alpha - np.log(np.diag(L)).sum()
+        return L, alpha, likelihood
+
+    def fit(self, X, y, length_scale:float|None=None) -> GaussianProcess:
+        self.X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        y = np.asarray(y, dtype=np.float64)
+        self.mean, self.scale = y.mean(), y.std() or 1.0
+        self.z = (y - self.mean) / self.scale
+        scales = [length_scale or self.length_scale] if (length_scale or self.length_scale) else LENGTH_SCALES
+        best = None
+        for ls in scales:
+            try:
+                L, alpha, likelihood = self._factorize(ls)
+            except np.linalg.LinAlgError:
+                continue
+            if best is None or likelihood > best[3]:
+                best = (ls, L, alpha, likelihood)
+        if best is None:
+            raise np.linalg.LinAlgError("Kernel matrix is not positive definite for any length scale")
+        self.fitted_length_scale, self._L, self._alpha, _ = best
+        return self
+
+    def predict(self, X) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the mean and standard deviation at the (n,d) points X"""
+        Ks = self._kernel(np.atleast_2d(X), self.X, self.fitted_length_scale)
+        mean = Ks @ self._alpha
+        v = np.linalg.solve(self._L, Ks.T)
+        variance = np.maximum(1.0 - (v**2).sum(axis=0), 1e-12)
+        return self.mean + self.scale*mean, self.scale*np.sqrt(variance)
+
+
+def expected_improvement(mean, std, best) -> np.ndarray:
+    """Expected improvement below `best` of a normal prediction"""
+    z = (best - mean) / std
+    return (best - mean)*_normal_cdf(z) + std*_normal_pdf(z)
+
+
+class Constraint:
+    """Margin of an analysis output with respect to limits, >= 0 when feasible.
+
+    evaluate: a callable of the built object, or the name of one of its methods
+    lower, upper: limits; arrays are reduced to their smallest margin, such that every
+        element (e.g. every natural period) must satisfy them
+    """
+
+    def __init__(self, evaluate:Callable[[Any], Any]|str, lower:float|None=None, upper:float|None=None):
+        if lower is None and upper is None:
+            raise ValueError("Give a lower or an upper limit")
+        self.evaluate = methodcaller(evaluate) if isinstance(evaluate, str) else evaluate
+        self.lower = lower
+        self.upper = upper
+
+    def __call__(self, obj) -> float:
+        values = np.asarray(self.evaluate(obj), dtype=np.float64)
+        margins = []
+        if self.lower is not None:
+            margins.append(np.min(values - self.lower))
+        if self.upper is not None:
+            margins.append(np.min(self.upper - values))
+        return float(min(margins))
+
+
+class _Evaluation:
+    """Picklable evaluate function of the batches: objective and constraint margins"""
+
+    def __init__(self, objective, constraints):
+        self.objective = objective
+        self.constraints = constraints
+
+    def __call__(self, obj) -> Dict[str, float]:
+        row = {"objective": float(self.objective(obj))}
+        row.update({name: float(c(obj)) for name, c in self.constraints.items()})
+        return row
+
+
+class OptimizationResult(NamedTuple):
+    parameters: Dict[str, float]  # best design, in the default units of the parameters
+    objective: float
+    feasible: bool                # False if no evaluated design met all constraints
+    history: ResultTable          # every evaluation, in order
+    evaluations: int
+
+
+class Optimizer:
+    """Constrained Bayesian optimization of a design, see the module docstring.
+
+    bounds: (low, high) per parameter name, plain numbers in the default unit
+    constraints: name to a callable of the built object returning a margin >= 0 when
+        feasible, such as a Constraint
+    """
+
+    def __init__(self, base:Dict[str, ParameterSet], build:Callable[..., Any], objective:Callable[[Any], float]|str,
+                 bounds:Dict[str, Tuple[float, float]], constraints:Dict[str, Callable[[Any], float]]|None=None,
+                 maximize:bool=False):
+        self.base = dict(base)
+        self.build = build
+        objective = methodcaller(objective) if isinstance(objective, str) else objective
+        self.constraints = dict(constraints or {})
+        self.evaluate = _Evaluation(objective, self.constraints)
+        self.names = list(bounds)
+        for name in self.names:
+            resolve(self.base, name)
+        self.low = np.array([bounds[n][0] for n in self.names], dtype=np.float64)
+        self.high = np.array([bounds[n][1] for n in self.names], dtype=np.float64)
+        self.sign = -1.0 if maximize else 1.0
+        self.history = ResultTable()
+
+    def _to_cases(self, unit:np.ndarray) -> List[Dict[str, float]]:
+        values = self.low + unit*(self.high - self.low)
+        return [dict(zip(self.names, row.tolist())) for row in values]
+
+    def _evaluate(self, unit:np.ndarray, processes:int|None):
+        offset = len(self.history)
+        sweep = Sweep(self.base, self.build, self.evaluate, self._to_cases(unit))
+        rows = sorted(sweep.iter_results(processes, chunksize=1), key=lambda row: row["case"])
+        for row in rows:
+            row["case"] += offset
+            self.history.append(row)
+
+    def _column(self, name:str) -> np.ndarray:
+        """Return a column of the history as floats, all NaN if no case produced it"""
+        if name not in self.history.columns:
+            return np.full(len(self.history), np.nan)
+        return np.array(self.history[name], dtype=np.float64)
+
+    def _observations(self):
+        """Return the unit inputs, objectives (minimized) and margins of all successful cases"""
+        if not len(self.history):
+            return np.zeros((0, len(self.names))), np.zeros(0), np.zeros((0, len(self.constraints)))
+        objective = self._column("objective")
+        ok = np.isfinite(objective)
+        for name in self.constraints:
+            ok &= np.isfinite(self._column(name))
+        X = np.stack([self._column(n) for n in self.names], axis=1)
+        X = (X - self.low) / (self.high - self.low)
+        margins = np.stack([self._column(n) for n in self.constraints], axis=1) \
+            if self.constraints else np.zeros((len(X), 0))
+        return X[ok], self.sign*objective[ok], margins[ok]
+
+    def propose(self, batch_size:int, rng:np.random.Generator, candidates:int=2000) -> np.ndarray:
+        """Return a (batch_size,d) batch of new unit points.
+
+        The batch is filled greedily: after every pick, the surrogates are refit as if
+        the pick returned its predicted mean ("kriging believer"), which lowers the
+        uncertainty around it and spreads the batch out.
+        """
+        X, y, margins = self._observations()
+        d = len(self.names)
+        feasible = np.all(margins >= 0, axis=1)
+        pool = latin_hypercube(candidates, d, rng)
+        if feasible.any():  # refine around the incumbent as well
+            best = X[feasible][np.argmin(y[feasible])]
+            local = best + 0.05*rng.standard_normal((candidates // 4, d))
+            pool = np.vstack([pool, np.clip(local, 0, 1)])
+
+        batch = []
+        for _ in range(batch_size):
+            objective = GaussianProcess().fit(X, y)
+            models = [GaussianProcess().fit(X, margins[:, j]) for j in range(margins.shape[1])]
+            probability = np.ones(len(pool))
+            for model in models:
+                mean, std = model.predict(pool)
+                probability *= _normal_cdf(mean/std)
+            if feasible.any():
+                mean, std = objective.predict(pool)
+                score = expected_improvement(mean, std, y[feasible].min())*probability
+            else:  # find a feasible design first
+                score = probability
+            pick = int(np.argmax(score))
+            x = pool[pick]
+            batch.append(x)
+            pool = np.delete(pool, pick, axis=0)
+            X = np.vstack([X, x])
+            y = np.append(y, objective.predict(x[None])[0])
+            margin = np.array([m.predict(x[None])[0][0] for m in models])
+            margins = np.vstack([margins, margin[None]])
+            feasible = np.append(feasible, False)  # beliefs are not incumbents
+        return np.array(batch)
+
+    def run(self, n_initial:int|None=None, iterations:int=5, batch_size:int=4, processes:int|None=None,
+            seed:int|None=None) -> OptimizationResult:
+        """Evaluate an initial design of `n_initial` points (default 2d+2), then
+        `iterations` batches of `batch_size` proposals, and return the best design.
+        Calling run again continues from the history."""
+        rng = np.random.default_rng(seed)
+        d = len(self.names)
+        if not len(self.history):
+            self._evaluate(latin_hypercube(n_initial or 2*d + 2, d, rng), processes)
+        for _ in range(iterations):
+            if len(self._observations()[1]) < 2:
+                batch = latin_hypercube(batch_size, d, rng)
+            else:
+                batch = self.propose(batch_size, rng)
+            self._evaluate(batch, processes)
+        return self.best()
+
+    def best(self) -> OptimizationResult:
+        """Return the best feasible design evaluated so far, or the least infeasible one"""
+        X, y, margins = self._observations()
+        if not len(y):
+            raise RuntimeError("No successful evaluations")
+        violation = np.maximum(-margins, 0).sum(axis=1)
+        feasible = violation == 0
+        i = int(np.argmin(np.where(feasible, y, np.inf))) if feasible.any() else int(np.argmin(violation))
+        values = self.low + X[i]*(self.high - self.low)
+        return OptimizationResult(dict(zip(self.names, values.tolist())), float(self.sign*y[i]),
+                                  bool(feasible[i]), self.history, len(self.history))
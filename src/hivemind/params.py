@@ -0,0 +1,126 @@
+"""Unit-stripped numeric views of ParameterSets for hot loops and vectorized sweeps.
+
+Reading a Parameter converts a pint quantity on every access, which dominates the cost
+of inner loops that only do a few float operations. A `ParameterArray` converts all
+values of a ParameterSet once, into a flat float64 array in SI base units, with a
+name to index mapping:
+
+    p = ParameterArray.compile(MooringSystemParameters())
+    p.LineLength                   # 250.0 [m]
+    p.values[p.index["WaterDepth"]]
+
+Angles are the exception: they are kept in degrees, like everywhere else in hivemind.
+Many ParameterSets with the same parameters can be stacked into one (K,n) array, in
+which case every name gives a (K,) column:
+
+    cases = ParameterArray.stack(sets)
+    draft = cases.Length * cases.Width   # vectorized over all K cases
+
+Units are re-attached at the API boundary with `to_parameter_set`, which only writes
+the parameters whose value changed.
+"""
+from __future__ import annotations
+from carg_io.abstracts import ParameterSet, units
+from typing import Dict, List, Sequence, Tuple
+import numpy as np
+
+
+def si_unit(unit) -> str:
+    """Return the SI base unit in which values of `unit` are stored (degrees for angles)"""
+    base = units.Quantity(1.0, unit).to_base_units().units
+    return "degree" if base == units.radian else str(base)
+
+
+class ParameterArray:
+    """Flat float64 array of the values of one ParameterSet, shape (n,), or of a stack
+    of K ParameterSets, shape (K,n). See the module docstring."""
+
+    def __init__(self, name:str, names:Sequence[str], si_units:Sequence[str], values):
+        self.name = name
+        self.names: Tuple[str, ...] = tuple(names)
+        self.units: Tuple[str, ...] = tuple(si_units)
+        self.values = np.asarray(values, dtype=np.float64)
+        if self.values.shape[-1:] != (len(self.names),) or self.values.ndim > 2:
+            raise ValueError(f"values must have shape (n,) or (K,n) with n={len(self.names)}, got {self.values.shape}")
+        self.index: Dict[str, int] = {n: i for i, n in enumerate(self.names)}
+
+    @classmethod
+    def compile(cls, parameters:ParameterSet) -> ParameterArray:
+        names, si_units, values = [], [], []
+        for parameter in parameters:
+            unit = si_unit(parameter._unit_default)
+            names.append(parameter.name)
+            si_units.append(unit)
+            values.append(parameter[unit] if unit != "dimensionless" else parameter[None])
+        return cls(parameters.name, names, si_units, values)
+
+    @classmethod
+    def stack(cls, sets:Sequence[ParameterSet]) -> ParameterArray:
+        """Stack ParameterSets with the same parameters into one (K,n) array"""
+        compiled = [cls.compile(ps) for ps in sets]
+        if not compiled:
+            raise ValueError("Nothing to stack")
+        first = compiled[0]
+        for other in compiled[1:]:
+            if other.names != first.names or other.units != first.units:
+                raise ValueError(f"Cannot stack '{other.name}' onto '{first.name}': parameters differ")
+        return cls(first.name, first.names, first.units, np.stack([c.values for c in compiled]))
+
+    @property
+    def stacked(self) -> bool:
+        return self.values.ndim == 2
+
+    def __len__(self) -> int:
+        """Number of stacked sets (1 for a single set)"""
+        return len(self.values) if self.stacked else 1
+
+    def __repr__(self):
+        return f"ParameterArray('{self.name}', n={len(self.names)}, sets={len(self)})"
+
+    def __getitem__(self, name:str):
+        """Return the value of a parameter in SI units, a (K,) column for a stack"""
+        return self.values[..., self.index[name]]
+
+    def __getattr__(self, name:str):
+        index = self.__dict__.get("index")
+        if index is None or name not in index:
+            raise AttributeError(name)
+        return self.values[..., index[name]]
+
+    def row(self, k:int) -> ParameterArray:
+        """Return the k-th set of a stack as a flat view"""
+        return ParameterArray(self.name, self.names, self.units, self.values[k])
+
+    def with_values(self, **columns) -> ParameterArray:
+        """Return a copy with some parameters replaced by numbers in SI units. Values
+        broadcast over the sets; giving (K,) arrays to a single set stacks it K times."""
+        shape = np.broadcast_shapes(self.values.shape[:-1], *(np.shape(v) for v in columns.values()))
+        values = np.array(np.broadcast_to(self.values, shape + (len(self.names),)))
+        for name, column in columns.items():
+            values[..., self.index[name]] = column
+        return ParameterArray(self.name, self.names, self.units, values)
+
+    def to_parameter_set(self, template:ParameterSet, k:int|None=None) -> ParameterSet:
+        """Return a copy of `template` holding the values of this view (of set k of a stack).
+        Only the parameters whose value differs from `template` are written, in their own
+        default unit, so unchanged parameters keep their unit and default status."""
+        values = self.values if k is None else self.values[k]
+        if values.ndim != 1:
+            raise ValueError("Pass k to select a set from a stack")
+        current = ParameterArray.compile(template)
+        out = template.copy()
+        for name, unit, value in zip(self.names, self.units, values.tolist()):
+            if np.isclose(value, current[name], rtol=1e-12, atol=0.0):
+                continue
+            parameter = out[name]
+            default = parameter._unit_default
+            if unit == "dimensionless":
+                parameter[None] = value
+            else:
+                parameter[default] = units.Quantity(value, unit).m_as(default)
+        return out
+
+    def to_parameter_sets(self, template:ParameterSet) -> List[ParameterSet]:
+        if not self.stacked:
+            return [self.to_parameter_set(template)]
+        return [self.to_parameter_set(template, k) for k in range(len(self))]
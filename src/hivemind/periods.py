@@ -0,0 +1,88 @@
+"""Natural periods and mode shapes of rigid bodies.
+
+Solves the generalized eigenproblem K x = w^2 (M + A) x for a stack of designs or
+states at once; mass, added mass and stiffness are (...,6,6) arrays (any square size
+works). Modes without positive restoring (e.g. surge, sway and yaw of an unmoored
+body) get an infinite period.
+"""
+from __future__ import annotations
+from typing import Sequence, Tuple
+import numpy as np
+
+
+HEAVE, ROLL, PITCH = 2, 3, 4
+
+
+def _total_mass(mass, added_mass) -> np.ndarray:
+    mass = np.asarray(mass, dtype=np.float64)
+    if added_mass is not None:
+        mass = mass + np.asarray(added_mass, dtype=np.float64)
+    return mass
+
+
+def _periods(omega2:np.ndarray) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(omega2 > 0, 2*np.pi/np.sqrt(np.abs(omega2)), np.inf)
+
+
+def natural_periods(mass, stiffness, added_mass=None, symmetric:bool|None=None) -> Tuple[np.ndarray, np.ndarray]:
+    """Return the natural periods (...,n) [s] and mode shapes (...,n,n) for a stack
+    of mass, stiffness and (optional) added mass matrices.
+
+    The periods are sorted from long to short; mode j is the column modes[..., :, j].
+    If `symmetric` (default: detected) the problem is reduced with a Cholesky
+    factorization of the mass and solved with a batched symmetric eigen solver, which
+    gives mass-normalized modes. Otherwise a batched general eigen solver is used.
+    """
+    M = _total_mass(mass, added_mass)
+    K = np.asarray(stiffness, dtype=np.float64)
+    M, K = np.broadcast_arrays(M, K)
+
+    if symmetric is None:
+        symmetric = np.allclose(K, np.swapaxes(K, -1, -2), rtol=1e-8, atol=1e-8*np.abs(K).max(initial=0.0)) \
+            and np.allclose(M, np.swapaxes(M, -1, -2))
+
+    if symmetric:
+        L = np.linalg.cholesky(M)
+        Linv = np.linalg.inv(L)
+        Ks = Linv @ K @ np.swapaxes(Linv, -1, -2)
+        Ks = 0.5*(Ks + np.swapaxes(Ks, -1, -2))
+        omega2, y = np.linalg.eigh(Ks)
+        modes = np.swapaxes(Linv, -1, -2) @ y
+    else:
+        omega2, modes = np.linalg.eig(np.linalg.solve(M, K))
+        omega2, modes = omega2.real, modes.real
+        order = np.argsort(omega2, axis=-1)
+        omega2 = np.take_along_axis(omega2, order, axis=-1)
+        modes = np.take_along_axis(modes, order[..., None, :], axis=-1)
+
+    # eigh returns ascending w^2; modes without restoring (w^2 <= 0) go first
+    periods = _periods(omega2)
+    order = np.argsort(-periods, axis=-1, kind="stable")
+    periods = np.take_along_axis(periods, order, axis=-1)
+    modes = np.take_along_axis(modes, order[..., None, :], axis=-1)
+    return periods, modes
+
+
+def uncoupled_natural_periods(mass, stiffness, added_mass=None, dofs:Sequence[int]=(HEAVE, ROLL, PITCH)) -> np.ndarray:
+    """Fast path ignoring coupling: T_i = 2 pi sqrt((M_ii + A_ii) / K_ii) for each dof in `dofs`.
+    Returns an (...,len(dofs)) array of periods [s]."""
+    M = _total_mass(mass, added_mass)
+    K = np.asarray(stiffness, dtype=np.float64)
+    dofs = list(dofs)
+    m = np.diagonal(M, axis1=-2, axis2=-1)[..., dofs]
+    k = np.diagonal(K, axis1=-2, axis2=-1)[..., dofs]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return _periods(np.broadcast_to(k, np.broadcast_shapes(k.shape, m.shape)) / m)
+
+
+def dominant_dofs(modes, mass=None) -> np.ndarray:
+    """Return (...,n) the index of the degree of freedom that dominates each mode,
+    judged by its share of the modal kinetic energy (or of the amplitude if no mass
+    is given). Useful to label coupled modes as e.g. 'heave' or 'roll'."""
+    modes = np.asarray(modes)
+    if mass is None:
+        share = np.abs(modes)
+    else:
+        share = np.abs(modes * (np.asarray(mass) @ modes))
+    return np.argmax(share, axis=-2)
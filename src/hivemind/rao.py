@@ -0,0 +1,74 @@
+"""Response amplitude operators (RAOs) in the frequency domain.
+
+For every wave frequency w and heading, the complex motion amplitudes X per unit wave
+amplitude follow from
+
+    [-w^2 (M + A(w)) + i w (B(w) + B_extra) + C] X = F(w, heading)
+
+with M the rigid-body mass matrix, A and B the frequency dependent added mass and
+radiation damping, C the restoring matrix and F the wave excitation force per unit
+wave amplitude, all about the body origin. The hydrodynamic coefficients come from a
+diffraction analysis and are passed in as `HydrodynamicCoefficients`.
+
+The system matrix only depends on the frequency, so it is factorized once per
+frequency and solved for all headings at once as multiple right-hand sides.
+"""
+from __future__ import annotations
+from typing import NamedTuple
+import numpy as np
+
+
+DOFS = ("surge", "sway", "heave", "roll", "pitch", "yaw")
+
+
+class HydrodynamicCoefficients(NamedTuple):
+    frequencies: np.ndarray    # (W,) [rad/s]
+    headings: np.ndarray       # (H,) [deg]
+    added_mass: np.ndarray     # (W,6,6) or (6,6)
+    damping: np.ndarray        # (W,6,6) or (6,6) radiation damping
+    excitation: np.ndarray     # (W,H,6) complex force per unit wave amplitude [N/m, Nm/m]
+
+
+class RAO(NamedTuple):
+    frequencies: np.ndarray    # (W,) [rad/s]
+    headings: np.ndarray       # (H,) [deg]
+    values: np.ndarray         # (W,H,6) complex motion per unit wave amplitude [m/m, rad/m]
+
+    @property
+    def amplitude(self) -> np.ndarray:
+        return np.abs(self.values)
+
+    @property
+    def phase(self) -> np.ndarray:
+        """Phase [deg] relative to the wave elevation at the body origin"""
+        return np.degrees(np.angle(self.values))
+
+    def dof(self, name:str) -> np.ndarray:
+        """Return the (W,H) RAO of one degree of freedom, e.g. rao.dof("heave")"""
+        return self.values[..., DOFS.index(name)]
+
+    def at_heading(self, heading:float) -> np.ndarray:
+        """Return the (W,6) RAO of the heading [deg] closest to `heading`"""
+        difference = (np.asarray(self.headings) - heading + 180) % 360 - 180
+        return self.values[:, np.argmin(np.abs(difference))]
+
+
+def response_amplitude_operators(mass, stiffness, coefficients:HydrodynamicCoefficients, damping=None) -> RAO:
+    """Solve the RAOs for all frequencies and headings of `coefficients` in one batched solve.
+
+    mass: (6,6) rigid-body mass matrix; stiffness: (6,6) restoring matrix, e.g. hydrostatic
+    plus mooring; damping: optional (6,6) or (W,6,6) damping on top of the radiation damping.
+    """
+    w = np.asarray(coefficients.frequencies, dtype=np.float64)
+    headings = np.asarray(coefficients.headings, dtype=np.float64)
+    F = np.asarray(coefficients.excitation, dtype=np.complex128)
+    if F.shape != (len(w), len(headings), 6):
+        raise ValueError(f"excitation has shape {F.shape}, expected {(len(w), len(headings), 6)}")
+
+    B = np.broadcast_to(coefficients.damping, (len(w), 6, 6))
+    if damping is not None:
+        B = B + np.asarray(damping)
+    ww = w[:, None, None]
+    Z = -ww**2*(np.asarray(mass) + np.asarray(coefficients.added_mass)) + 1j*ww*B + np.asarray(stiffness)
+    values = np.linalg.solve(Z, np.swapaxes(F, 1, 2))  # (W,6,H): all headings per factorization
+    return RAO(w, headings, np.swapaxes(values, 1, 2))
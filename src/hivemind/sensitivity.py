@@ -0,0 +1,106 @@
+"""Finite-difference sensitivities of analysis outputs to design parameters.
+
+Design reviews ask how natural periods or stability margins change with e.g. Length,
+Width, Depth or WaterDepth. `sensitivities` answers this in one call: it builds every
+perturbed variant of the base ParameterSets, evaluates them concurrently like a Sweep
+(with the same `base`, `build`, `evaluate` and parameter names, see hivemind.sweep)
+and returns the Jacobian of every output:
+
+    s = sensitivities(base, build, "get_natural_periods", ["Length", "Width", "WaterDepth"])
+    s.jacobian["result"]        # (..., 3) d period / d parameter
+    s.error["result"]           # estimated truncation error of the same shape
+
+Derivatives are central differences. Step-size control: every parameter is perturbed
+by a relative step h and by h/2, and the two estimates are combined by Richardson
+extrapolation, which cancels the leading error term; their difference estimates the
+remaining error. Outputs may be numbers, arrays or dictionaries of those (one Jacobian
+per key). Values and steps are in the default unit of every parameter.
+
+The baseline is evaluated once, on a fresh build or on an already built object passed
+as `built`, whose result cache (see Base) then serves it; or it is passed in directly.
+The perturbed designs are always fresh builds: their results are only reused between
+calls if a `Base.result_store` is set (see hivemind.store).
+"""
+from __future__ import annotations
+from .sweep import Sweep, resolve
+from carg_io.abstracts import ParameterSet
+from operator import methodcaller
+from typing import Any, Callable, Dict, List, NamedTuple, Sequence
+import numpy as np
+
+
+RELATIVE_STEP = 1e-3
+
+
+class Sensitivity(NamedTuple):
+    parameters: List[str]
+    values: np.ndarray               # (P,) baseline values, default units
+    steps: np.ndarray                # (P,) largest step used
+    baseline: Dict[str, np.ndarray]  # outputs at the baseline
+    jacobian: Dict[str, np.ndarray]  # output shape + (P,)
+    error: Dict[str, np.ndarray]     # estimated error of the jacobian
+
+    def matrix(self) -> np.ndarray:
+        """Return the Jacobian of all outputs flattened into one (M,P) matrix"""
+        return np.concatenate([j.reshape(-1, len(self.parameters)) for j in self.jacobian.values()])
+
+    def relative(self) -> Dict[str, np.ndarray]:
+        """Return the elasticities (dy/y)/(dx/x), i.e. the % change of every output per %
+        change of every parameter"""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return {k: j*self.values/self.baseline[k][..., None] for k, j in self.jacobian.items()}
+
+
+def _outputs(result) -> Dict[str, np.ndarray]:
+    if isinstance(result, dict):
+        return {k: np.asarray(v, dtype=np.float64) for k, v in result.items()}
+    return {"result": np.asarray(result, dtype=np.float64)}
+
+
+def _default_value(base:Dict[str, ParameterSet], name:str) -> float:
+    set_name, parm_name = resolve(base, name)
+    parameter = base[set_name][parm_name]
+    return float(parameter[parameter._unit_default])
+
+
+def sensitivities(base:Dict[str, ParameterSet], build:Callable[..., Any], evaluate:Callable[[Any], Any]|str,
+                  parameters:Sequence[str], relative_step:float|Dict[str, float]=RELATIVE_STEP,
+                  baseline=None, built=None, processes:int|None=None) -> Sensitivity:
+    """Return the Jacobian of `evaluate(build(**base))` with respect to `parameters`.
+
+    relative_step: step relative to the parameter value (absolute for zero values),
+        one for all or per parameter name
+    baseline: the output at the base design, if already known
+    built: the object built from `base`, to evaluate the baseline on instead of a new build
+    processes: see Sweep.iter_results
+    """
+    names = list(parameters)
+    evaluate = methodcaller(evaluate) if isinstance(evaluate, str) else evaluate
+    x0 = np.array([_default_value(base, n) for n in names])
+    rel = np.array([relative_step.get(n, RELATIVE_STEP) if isinstance(relative_step, dict) else relative_step
+                    for n in names], dtype=np.float64)
+    h = rel*np.where(x0 != 0, np.abs(x0), 1.0)
+
+    if baseline is None:
+        baseline = evaluate(built if built is not None else build(**base))
+    baseline = _outputs(baseline)
+
+    # cases: for every parameter +h, -h, +h/2, -h/2
+    factors = (1.0, -1.0, 0.5, -0.5)
+    cases = [{name: x0[p] + f*h[p]} for p, name in enumerate(names) for f in factors]
+    rows = sorted(Sweep(base, build, evaluate, cases).iter_results(processes), key=lambda row: row["case"])
+    failed = [row for row in rows if row.get("error")]
+    if failed:
+        raise RuntimeError(f"{len(failed)} perturbed cases failed, the first with:\n{failed[0]['error']}")
+
+    results = [_outputs({k: row[k] for k in baseline} if set(baseline) != {"result"} else row["result"])
+               for row in rows]
+    jacobian, error = {}, {}
+    for key, y0 in baseline.items():
+        y = np.stack([r[key] for r in results]).reshape((len(names), len(factors)) + y0.shape)
+        y = np.moveaxis(y, (0, 1), (-2, -1))                              # (..., P, 4)
+        coarse = (y[..., 0] - y[..., 1]) / (2*h)
+        fine = (y[..., 2] - y[..., 3]) / h
+        jacobian[key] = (4*fine - coarse) / 3
+        error[key] = np.abs(fine - coarse) / 3
+    return Sensitivity(names, x0, h, baseline, jacobian, error)
@@ -0,0 +1,183 @@
+"""Time-domain simulation of the 6-DOF rigid-body motions of a Naval object.
+
+The equations of motion about the body origin are
+
+    (M + A) x'' + B x' + C x = sum of forces(t, x, x')
+
+with x the surge, sway, heave [m] and roll, pitch, yaw [rad] motions, M the rigid-body
+mass matrix, A the added mass, B a linear damping matrix and C the hydrostatic
+restoring matrix (including weight) about a mean position. Any other load, such as the
+mooring or a wave excitation, is a callable `force(t, position, velocity)` returning a
+(S,6) array (or anything that broadcasts to it) of forces [N] and moments [Nm].
+
+Many independent runs, e.g. seeds of an irregular sea or load cases, are integrated
+together: positions and velocities are (S,6) arrays and every force is evaluated for
+all runs at once. `MotionSimulator.run` is a generator that yields a `Snapshot` per
+output interval, so long runs do not have to keep their history in memory:
+
+    sim = MotionSimulator.from_naval(naval, draft=10, damping=B, mooring=system)
+    for snapshot in sim.run(duration=3*3600, dt=0.1, position=x0):
+        ...
+"""
+from __future__ import annotations
+from typing import Callable, Generator, Iterable, NamedTuple
+import numpy as np
+
+
+Force = Callable[[float, np.ndarray, np.ndarray], np.ndarray]
+
+
+class Snapshot(NamedTuple):
+    time: float             # [s]
+    position: np.ndarray    # (S,6) [m, rad]
+    velocity: np.ndarray    # (S,6) [m/s, rad/s]
+
+
+# Dormand-Prince 5(4) tableau
+_C = np.array([0, 1/5, 3/10, 4/5, 8/9, 1, 1])
+_A = [
+    [],
+    [1/5],
+    [3/40, 9/40],
+    [44/45, -56/15, 32/9],
+    [19372/6561, -25360/2187, 64448/6561, -212/729],
+    [9017/3168, -355/33, 46732/5247, 49/176, -5103/18656],
+    [35/384, 0, 500/1113, 125/192, -2187/6784, 11/84],
+]
+_E = np.array([71/57600, 0, -71/16695, 71/1920, -17253/339200, 22/525, -1/40])  # 5th minus 4th order weights
+
+
+def mooring_force(system) -> Force:
+    """Return the mooring load of a MooringSystem as a force callable.
+
+    The force is interpolated from the restoring table of the current state of the
+    system, as a function of the surge, sway and yaw of the body.
+    """
+    def force(t, position, velocity):
+        offsets = np.stack([position[:, 0], position[:, 1], np.degrees(position[:, 5])], axis=-1)
+        return system.restoring_force(offsets)
+    return force
+
+
+def harmonic_force(amplitude, frequency, phase=0.0) -> Force:
+    """Return the force amplitude * cos(frequency*t + phase).
+
+    amplitude: (6,) or (S,6) [N, Nm]; frequency [rad/s]; phase [rad], e.g. (S,1) random
+    phases to run several seeds at once.
+    """
+    amplitude = np.asarray(amplitude, dtype=np.float64)
+    phase = np.asarray(phase, dtype=np.float64)
+
+    def force(t, position, velocity):
+        return amplitude*np.cos(frequency*t + phase)
+    return force
+
+
+class MotionSimulator:
+    """Integrate the linear 6-DOF equations of motion with extra (nonlinear) forces.
+
+    mass: (6,6) or (S,6,6) mass matrix, including added mass
+    stiffness: (6,6) or (S,6,6) restoring matrix
+    damping: (6,6) or (S,6,6) linear damping matrix, optional
+    forces: force callables, see the module docstring
+    """
+
+    def __init__(self, mass, stiffness, damping=None, forces:Iterable[Force]=()):
+        self.mass = np.asarray(mass, dtype=np.float64)
+        self.stiffness = np.asarray(stiffness, dtype=np.float64)
+        self.damping = np.zeros((6, 6)) if damping is None else np.asarray(damping, dtype=np.float64)
+        self.forces = list(forces)
+        self._inverse_mass = np.linalg.inv(self.mass)
+
+    @classmethod
+    def from_naval(cls, naval, draft, trim=0.0, heel=0.0, added_mass=None, damping=None, mooring=None,
+                   forces:Iterable[Force]=()) -> MotionSimulator:
+        """Linearize a Naval about the given draft [m], trim [deg] and heel [deg].
+
+        The mass follows from `naval.get_mass_matrix()` plus `added_mass`, the restoring
+        from `naval.get_hydrostatic_stiffness(..., include_weight=True)`. If a
+        MooringSystem is given, its restoring force is added to `forces`.
+        """
+        mass = naval.get_mass_matrix()
+        if added_mass is not None:
+            mass = mass + np.asarray(added_mass)
+        stiffness = naval.get_hydrostatic_stiffness(draft, trim, heel, include_weight=True)
+        forces = list(forces)
+        if mooring is not None:
+            forces.append(mooring_force(mooring))
+        return cls(mass, stiffness, damping, forces)
+
+    def acceleration(self, t:float, position:np.ndarray, velocity:np.ndarray) -> np.ndarray:
+        load = -(self.stiffness @ position[..., None])[..., 0] - (self.damping @ velocity[..., None])[..., 0]
+        for force in self.forces:
+            load = load + force(t, position, velocity)
+        return (self._inverse_mass @ load[..., None])[..., 0]
+
+    def _derivative(self, t:float, y:np.ndarray) -> np.ndarray:
+        return np.concatenate([y[:, 6:], self.acceleration(t, y[:, :6], y[:, 6:])], axis=1)
+
+    def _rk4(self, t:float, y:np.ndarray, h:float) -> np.ndarray:
+        k1 = self._derivative(t, y)
+        k2 = self._derivative(t + h/2, y + h/2*k1)
+        k3 = self._derivative(t + h/2, y + h/2*k2)
+        k4 = self._derivative(t + h, y + h*k3)
+        return y + h/6*(k1 + 2*k2 + 2*k3 + k4)
+
+    def _dopri(self, t:float, y:np.ndarray, h:float, k1:np.ndarray):
+        k = [k1]
+        for c, a in zip(_C[1:], _A[1:]):
+            k.append(self._derivative(t + c*h, y + h*sum(ai*ki for ai, ki in zip(a, k) if ai)))
+        y_new = y + h*sum(ai*ki for ai, ki in zip(_A[6], k) if ai)
+        error = h*sum(e*ki for e, ki in zip(_E, k) if e)
+        return y_new, error, k[-1]
+
+    def run(self, duration:float, dt:float, position=0.0, velocity=0.0, n:int|None=None,
+            method:str="rk4", output_interval:float|None=None, rtol:float=1e-6, atol:float=1e-9,
+            t0:float=0.0) -> Generator[Snapshot]:
+        """Yield a Snapshot at t0 and after every `output_interval` [s] up to t0 + duration.
+
+        position, velocity: initial conditions, (6,) or (S,6)
+        n: number of runs S, if not implied by the initial conditions or the matrices
+        method: "rk4" for fixed steps of `dt`, or "rk45" for adaptive Dormand-Prince
+            steps starting from `dt`. The adaptive step is shared by all runs and
+            controlled by the largest error among them.
+        output_interval: defaults to `dt`; with "rk4" it is rounded to a whole number of steps
+        """
+        shapes = [np.shape(position)[:-1], np.shape(velocity)[:-1], self.mass.shape[:-2], self.stiffness.shape[:-2],
+                  self.damping.shape[:-2], () if n is None else (n,)]
+        (S,) = np.broadcast_shapes((1,), *shapes)
+        y = np.empty((S, 12))
+        y[:, :6] = position
+        y[:, 6:] = velocity
+        t, end = float(t0), float(t0) + duration
+        interval = dt if output_interval is None else output_interval
+        yield Snapshot(t, y[:, :6].copy(), y[:, 6:].copy())
+
+        if method == "rk4":
+            every = max(1, int(round(interval/dt)))
+            steps = int(round(duration/dt))
+            for i in range(1, steps + 1):
+                y = self._rk4(t, y, dt)
+                t = t0 + i*dt
+                if i % every == 0 or i == steps:
+                    yield Snapshot(t, y[:, :6].copy(), y[:, 6:].copy())
+        elif method == "rk45":
+            h = dt
+            k1 = self._derivative(t, y)
+            output = t + interval
+            while t < end - 1e-12*max(1.0, abs(end)):
+                target = min(output, end)
+                step = min(h, target - t)
+                y_new, error, k7 = self._dopri(t, y, step, k1)
+                scale = atol + rtol*np.maximum(np.abs(y), np.abs(y_new))
+                norm = np.sqrt(np.mean((error/scale)**2, axis=1)).max()
+                h = step*min(5.0, max(0.2, 0.9*norm**-0.2)) if norm > 0 else 5.0*step
+                if norm > 1:
+                    continue
+                reached = step == target - t
+                t, y, k1 = (target if reached else t + step), y_new, k7
+                if reached:
+                    output += interval
+                    yield Snapshot(t, y[:, :6].copy(), y[:, 6:].copy())
+        else:
+            raise ValueError(f"Unknown method '{method}', use 'rk4' or 'rk45'")
@@ -1,10 +1,43 @@
+"""Site conditions and streaming environmental time series.
+
+A hindcast is a long series of environmental records: time, water level, current and
+sea state. Multi-year hindcasts do not fit in memory comfortably, so `Site.environment`
+reads them in chunks and yields one `EnvironmentChunk` at a time. Every record is
+mapped to the SiteState (MSL, HAT or LAT) whose water level is closest to it, so
+downstream analyses can group the records by state.
+
+Two file formats are supported:
+
+    .csv    a header row with (a subset of) the field names of `ENVIRONMENT`, parsed
+            lazily; `time` is an ISO 8601 timestamp, missing fields and empty cells
+            are NaN (NaT for `time`)
+    other   raw `ENVIRONMENT` records, memory-mapped. Convert a CSV once with
+            `write_binary(file, read_csv(csv_file))` for fast reruns.
+"""
 from __future__ import annotations
-from .abstracts import Base, State
+from .abstracts import Base, State, magnitude
 from abc import ABC, abstractmethod, abstractproperty
 from enum import Enum
-from typing import Dict
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Generator, Iterable, NamedTuple
 from carg_io.abstracts import ParameterSet, Parameter, units
+import csv
+import numpy as np
+
 
+CHUNK_SIZE = 100_000
+
+# Record layout of an environmental time series
+ENVIRONMENT = np.dtype([
+    ("time", "datetime64[s]"),
+    ("water_level", "f8"),                # w.r.t. mean sea level [m]
+    ("current_speed", "f8"),              # [m/s]
+    ("current_direction", "f8"),          # [deg]
+    ("significant_wave_height", "f8"),    # [m]
+    ("peak_period", "f8"),                # [s]
+    ("wave_direction", "f8"),             # [deg]
+])
 
 
 class SiteParameters(ParameterSet):
@@ -13,22 +46,143 @@ class SiteParameters(ParameterSet):
     WaterTemperature = 10
     MarineGrowthFactor = 100
     SoilStiffness = 50
+    HighestAstronomicalTide:Parameter = 1.5 * units.m   # w.r.t. mean sea level
+    LowestAstronomicalTide:Parameter = -1.5 * units.m   # w.r.t. mean sea level
+
+
+class EnvironmentChunk(NamedTuple):
+    records: np.ndarray    # (n,) structured array of ENVIRONMENT
+    states: np.ndarray     # (n,) object array with the matching SiteState of every record,
+                           # None where the water level is missing
+
+    def groups(self) -> Generator[tuple]:
+        """Yield (state, records) for every state that occurs in the chunk. Records
+        without a water level belong to no state and are left out."""
+        for state in dict.fromkeys(self.states.tolist()):
+            if state is not None:
+                yield state, self.records[self.states == state]
+
 
 class Site(Base):
 
     def __init__(self, parameters:SiteParameters) -> None:
         super().__init__()
         self._parameters = parameters
-        self._state = MSL(self)
+        self._possible_states = {
+            "MSL": MSL(self),
+            "HAT": HAT(self),
+            "LAT": LAT(self),
+        }
+        self._state = self._possible_states["MSL"]
+        self._previous_state = None
+
+    @property
+    def parameters(self) -> SiteParameters:
+        return self._parameters
+
+    @property
+    def possible_states(self) -> Dict[str, SiteState]:
+        return self._possible_states
+
+    def change_state(self, state:str) -> bool:
+        self._previous_state = self._state
+        self._state = self.possible_states[state]
+        return True
+
+    @property
+    def state(self) -> SiteState:
+        return self._state
+
+    @property
+    def previous_state(self) -> SiteState|None:
+        return self._previous_state
+
+    def classify(self, water_level) -> np.ndarray:
+        """Return the SiteState closest to every water level [m] w.r.t. mean sea level,
+        None for missing (non-finite) levels"""
+        states = list(self.possible_states.values())
+        levels = np.array([s.water_level for s in states])
+        water_level = np.asarray(water_level, dtype=np.float64)
+        nearest = np.argmin(np.abs(np.nan_to_num(water_level)[..., None] - levels), axis=-1)
+        out = np.array(states, dtype=object)[nearest]
+        out[~np.isfinite(water_level)] = None
+        return out
+
+    def environment(self, source:Path|str|Iterable[np.ndarray], chunk_size:int=CHUNK_SIZE) -> Generator[EnvironmentChunk]:
+        """Yield the records of a hindcast in chunks of at most `chunk_size`, each record
+        mapped to its SiteState. `source` is a file (see the module docstring) or any
+        iterable of ENVIRONMENT record arrays."""
+        if isinstance(source, (str, Path)):
+            source = read_csv(source, chunk_size) if Path(source).suffix.lower() == ".csv" else read_binary(source, chunk_size)
+        for records in source:
+            yield EnvironmentChunk(records, self.classify(records["water_level"]))
+
 
 class SiteState(State):
-    pass
+
+    @property
+    def water_level(self) -> float:
+        """Water level of this state w.r.t. mean sea level [m]"""
+        return 0.0
+
 
 class MSL(SiteState):
     pass
 
+
 class HAT(SiteState):
-    pass
+
+    @property
+    def water_level(self) -> float:
+        return magnitude(self.base.parameters.HighestAstronomicalTide, "m")
+
 
 class LAT(SiteState):
-    pass
\ No newline at end of file
+
+    @property
+    def water_level(self) -> float:
+        return magnitude(self.base.parameters.LowestAstronomicalTide, "m")
+
+
+def read_csv(file:Path|str, chunk_size:int=CHUNK_SIZE) -> Generator[np.ndarray]:
+    """Yield the records of a CSV hindcast in chunks of at most `chunk_size`"""
+    with open(file, newline="") as f:
+        reader = csv.reader(f)
+        header = [name.strip() for name in next(reader)]
+        unknown = set(header) - set(ENVIRONMENT.names)
+        if unknown:
+            raise KeyError(f"Unknown columns in {file}: {sorted(unknown)}")
+        while True:
+            rows = list(islice(reader, chunk_size))
+            if not rows:
+                return
+            width = len(header)
+            columns = list(zip(*(row + [""]*(width - len(row)) for row in rows)))
+            records = np.zeros(len(rows), dtype=ENVIRONMENT)
+            for name in ENVIRONMENT.names[1:]:
+                records[name] = np.nan
+            for name, values in zip(header, columns):
+                missing = "NaT" if name == "time" else "NaN"  # gaps in the hindcast
+                records[name] = np.array([v.strip() or missing for v in values], dtype=ENVIRONMENT[name])
+            yield records
+
+
+def read_binary(file:Path|str, chunk_size:int=CHUNK_SIZE) -> Generator[np.ndarray]:
+    """Yield the records of a binary hindcast in chunks of at most `chunk_size`.
+    The file is memory-mapped; only the chunk being yielded is read."""
+    if not Path(file).stat().st_size:
+        return
+    records = np.memmap(file, dtype=ENVIRONMENT, mode="r")
+    for start in range(0, len(records), chunk_size):
+        yield np.array(records[start:start + chunk_size])
+
+
+def write_binary(file:Path|str, chunks:Iterable[np.ndarray]) -> int:
+    """Write chunks of ENVIRONMENT records to a binary hindcast file, one chunk at a
+    time. Returns the number of records written."""
+    n = 0
+    with open(file, "wb") as f:
+        for records in chunks:
+            np.asarray(records, dtype=ENVIRONMENT).tofile(f)
+            n += len(records)
+    return n
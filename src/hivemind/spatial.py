@@ -0,0 +1,211 @@
+"""Bounding volume hierarchy (BVH) over the panels of an ArrayMesh.
+
+The hierarchy is a binary tree of axis-aligned bounding boxes stored in flat arrays.
+Every tree node covers a contiguous range of `order`, a permutation of the panels;
+nodes are split at the median panel centroid along their longest axis until at most
+`leaf_size` panels remain.
+
+Queries descend the tree level by level for all queries at once: the frontier is an
+array of (query, tree node) pairs, and pairs whose box cannot contain a hit are pruned
+before the children are expanded. Only the panels in the surviving leaves are tested
+exactly. The index is immutable, like the mesh it is built for; use
+`ArrayMesh.spatial_index` to build it lazily and cache it with the mesh.
+"""
+from __future__ import annotations
+from typing import Tuple
+import numpy as np
+
+
+LEAF_SIZE = 8
+
+
+def point_triangle_distance(points, a, b, c) -> np.ndarray:
+    """Return the distance between (...,3) points and (...,3,3) triangles (a, b, c)"""
+    p, a, b, c = (np.asarray(v, dtype=np.float64) for v in (points, a, b, c))
+    n = np.cross(b - a, c - a)
+    nn = np.einsum("...i,...i->...", n, n)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        height = np.einsum("...i,...i->...", p - a, n) / nn
+        q = p - height[..., None]*n  # projection on the plane of the triangle
+        # barycentric coordinates of the projection
+        u = np.einsum("...i,...i->...", np.cross(c - b, q - b), n) / nn
+        v = np.einsum("...i,...i->...", np.cross(a - c, q - c), n) / nn
+    inside = (u >= 0) & (v >= 0) & (u + v <= 1) & (nn > 0)
+
+    def segment(s0, s1):
+        d = s1 - s0
+        dd = np.einsum("...i,...i->...", d, d)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            t = np.clip(np.where(dd > 0, np.einsum("...i,...i->...", p - s0, d) / dd, 0.0), 0.0, 1.0)
+        return np.linalg.norm(p - s0 - t[..., None]*d, axis=-1)
+
+    edges = np.minimum(np.minimum(segment(a, b), segment(b, c)), segment(c, a))
+    return np.where(inside, np.abs(height)*np.sqrt(nn), edges)
+
+
+class BoundingVolumeHierarchy:
+    """Bounding volume hierarchy over the panels of an ArrayMesh, see the module docstring"""
+
+    def __init__(self, mesh, leaf_size:int=LEAF_SIZE):
+        self.mesh = mesh
+        self.leaf_size = max(int(leaf_size), 1)
+        local = mesh.indptr - mesh.indptr[0]
+        points = mesh.nodes[mesh.indices[mesh.indptr[0]:mesh.indptr[-1]]]
+        self.panel_low = np.minimum.reduceat(points, local[:-1], axis=0) if mesh.n_panels else np.zeros((0, 3))
+        self.panel_high = np.maximum.reduceat(points, local[:-1], axis=0) if mesh.n_panels else np.zeros((0, 3))
+        self._build(mesh.centroids)
+
+        # triangles of the fan triangulation, grouped by panel
+        i0, i1, i2, owner = mesh._fan
+        self._triangles = np.stack([i0, i1, i2], axis=1)
+        self._triangle_ptr = np.searchsorted(owner, np.arange(mesh.n_panels + 1))
+
+    def _build(self, centroids:np.ndarray):
+        n = len(centroids)
+        order = np.arange(n)
+        low, high, start, stop, children = [], [], [], [], []
+        stack = [(-1, 0, 0, n)]  # (parent, side, first, stop)
+        while stack:
+            parent, side, i0, i1 = stack.pop()
+            panels = order[i0:i1]
+            node = len(start)
+            low.append(self.panel_low[panels].min(axis=0) if i1 > i0 else np.zeros(3))
+            high.append(self.panel_high[panels].max(axis=0) if i1 > i0 else np.zeros(3))
+            start.append(i0)
+            stop.append(i1)
+            children.append([-1, -1])
+            if parent >= 0:
+                children[parent][side] = node
+            if i1 - i0 > self.leaf_size:
+                c = centroids[panels]
+                axis = int(np.argmax(c.max(axis=0) - c.min(axis=0)))
+                half = (i1 - i0) // 2
+                order[i0:i1] = panels[np.argpartition(c[:, axis], half)]
+                stack.append((node, 1, i0 + half, i1))
+                stack.append((node, 0, i0, i0 + half))
+        self.order = order
+        self.low, self.high = np.array(low).reshape(-1, 3), np.array(high).reshape(-1, 3)
+        self.start, self.stop = np.array(start, dtype=np.int64), np.array(stop, dtype=np.int64)
+        self.left, self.right = np.array(children, dtype=np.int64).reshape(-1, 2).T.copy()
+
+    def __len__(self) -> int:
+        """Number of tree nodes"""
+        return len(self.start)
+
+    def __repr__(self):
+        return f"BoundingVolumeHierarchy(panels={len(self.order)}, nodes={len(self)})"
+
+    # --- traversal -------------------------------------------------------------------
+
+    def _descend(self, queries:np.ndarray, nodes:np.ndarray, keep) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the (query, panel) pairs of all leaves reached from the (query, node)
+        pairs for which keep(queries, nodes) holds on the way down"""
+        hits_q, hits_p = [], []
+        while len(nodes):
+            mask = keep(queries, nodes)
+            queries, nodes = queries[mask], nodes[mask]
+            leaf = self.left[nodes] < 0
+            if leaf.any():
+                q, n = queries[leaf], nodes[leaf]
+                counts = self.stop[n] - self.start[n]
+                positions = np.repeat(self.start[n] - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+                hits_q.append(np.repeat(q, counts))
+                hits_p.append(self.order[positions])
+            inner = ~leaf
+            queries = np.repeat(queries[inner], 2)
+            nodes = np.stack([self.left[nodes[inner]], self.right[nodes[inner]]], axis=1).ravel()
+        if not hits_q:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        return np.concatenate(hits_q), np.concatenate(hits_p)
+
+    def _box_distance(self, points:np.ndarray, low:np.ndarray, high:np.ndarray) -> np.ndarray:
+        return np.linalg.norm(np.maximum(np.maximum(low - points, points - high), 0.0), axis=-1)
+
+    # --- queries ---------------------------------------------------------------------
+
+    def in_box(self, low, high) -> np.ndarray:
+        """Return the sorted indices of the panels whose bounding box overlaps the box [low, high]"""
+        low, high = np.asarray(low, dtype=np.float64), np.asarray(high, dtype=np.float64)
+        overlap = lambda q, n: np.all((self.low[n] <= high) & (self.high[n] >= low), axis=1)
+        _, panels = self._descend(np.zeros(1, dtype=np.int64), np.zeros(1, dtype=np.int64), overlap)
+        hit = np.all((self.panel_low[panels] <= high) & (self.panel_high[panels] >= low), axis=1)
+        return np.sort(panels[hit])
+
+    def cut(self, normal, offset:float=0.0, upper:float|None=None) -> np.ndarray:
+        """Return the sorted indices of the panels that intersect the plane normal . x = offset,
+        e.g. the panels that cross an (inclined) waterplane. With `upper`, return the
+        panels that intersect the slab offset <= normal . x <= upper instead."""
+        normal = np.asarray(normal, dtype=np.float64)
+        upper = offset if upper is None else upper
+        middle, half = 0.5*(offset + upper), 0.5*(upper - offset)
+
+        def straddles(q, n):
+            centre, extent = 0.5*(self.high[n] + self.low[n]), 0.5*(self.high[n] - self.low[n])
+            slack = 1e-9*(np.abs(centre) @ np.abs(normal) + abs(offset) + abs(upper))  # round-off on touching panels
+            return np.abs(centre @ normal - middle) <= extent @ np.abs(normal) + half + slack
+
+        _, panels = self._descend(np.zeros(1, dtype=np.int64), np.zeros(1, dtype=np.int64), straddles)
+        panels = np.sort(panels)
+        if not len(panels):
+            return panels
+        # exact test on the nodes of the candidate panels
+        subset = self.mesh.select(panels)
+        distance = subset.nodes[subset.indices] @ normal - offset
+        starts = subset.indptr[:-1]
+        hit = (np.minimum.reduceat(distance, starts) <= upper - offset) & (np.maximum.reduceat(distance, starts) >= 0)
+        return panels[hit]
+
+    def panel_triangles(self, panels) -> np.ndarray:
+        """Return the indices into `mesh.triangles()` of the triangles of the given panels"""
+        panels = np.asarray(panels, dtype=np.int64)
+        first, counts = self._triangle_ptr[panels], np.diff(self._triangle_ptr)[panels]
+        return np.repeat(first - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+
+    def _panel_distances(self, points:np.ndarray, queries:np.ndarray, panels:np.ndarray) -> np.ndarray:
+        """Exact distance of the (query, panel) pairs"""
+        first, last = self._triangle_ptr[panels], self._triangle_ptr[panels + 1]
+        counts = last - first
+        tri = self._triangles[np.repeat(first - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())]
+        nodes = self.mesh.nodes
+        d = point_triangle_distance(points[np.repeat(queries, counts)], nodes[tri[:, 0]], nodes[tri[:, 1]], nodes[tri[:, 2]])
+        return np.minimum.reduceat(d, np.cumsum(counts) - counts) if len(d) else d
+
+    def nearest(self, points) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the nearest panel of every (Q,3) point and its distance: (panels, distances)"""
+        points = np.atleast_2d(np.asarray(points, dtype=np.float64))
+        Q = len(points)
+        queries = np.arange(Q)
+        best = np.full(Q, np.inf)
+        best_panel = np.full(Q, -1, dtype=np.int64)
+        if not len(self.order):
+            return best_panel, best
+
+        def update(q, p):
+            if not len(q):
+                return
+            d = self._panel_distances(points, q, p)
+            order = np.lexsort((d, q))
+            q, p, d = q[order], p[order], d[order]
+            first = np.r_[True, q[1:] != q[:-1]]
+            q, p, d = q[first], p[first], d[first]
+            better = d < best[q]
+            best[q[better]], best_panel[q[better]] = d[better], p[better]
+
+        # greedy descent to one leaf per point gives a tight initial bound
+        node = np.zeros(Q, dtype=np.int64)
+        while True:
+            inner = self.left[node] >= 0
+            if not inner.any():
+                break
+            l, r = self.left[node[inner]], self.right[node[inner]]
+            p = points[inner]
+            nearer_left = self._box_distance(p, self.low[l], self.high[l]) <= self._box_distance(p, self.low[r], self.high[r])
+            node[inner] = np.where(nearer_left, l, r)
+        counts = self.stop[node] - self.start[node]
+        positions = np.repeat(self.start[node] - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+        update(np.repeat(queries, counts), self.order[positions])
+
+        # then visit every leaf that may still hold a nearer panel
+        closer = lambda q, n: self._box_distance(points[q], self.low[n], self.high[n]) < best[q]
+        update(*self._descend(queries, np.zeros(Q, dtype=np.int64), closer))
+        return best_panel, best
@@ -0,0 +1,196 @@
+"""Large angle stability: righting arm (GZ) curves and intact stability criteria.
+
+The body is inclined in steps over a range of heel angles at constant displacement
+(the volume displaced upright at the given draft) and fixed zero trim. At every angle
+the draft is solved such that the displaced volume matches, and the righting arm is
+the horizontal distance between the centre of gravity and the centre of buoyancy,
+positive when righting. Inclinations about other axes than x are run as headings: a
+heading rotates the heeling axis about z, 90 degrees inclines the body about y.
+
+Angles are processed in order so that each angle reuses the work of the previous one.
+The draft at the next angle is extrapolated from the previous angles and bounds a
+narrow band of drafts. Only the triangles of panels that cross this band, found with
+the spatial index of the mesh (`ArrayMesh.spatial_index`), are clipped; the remaining
+triangles below it are integrated unclipped once per angle, and their integrals are
+shifted analytically to every trial draft of the Newton iteration on the volume.
+Triangles above it are skipped. Positions follow the conventions of hivemind.hydrostatics.
+"""
+from __future__ import annotations
+from .hydrostatics import _integrate, _submerged_triangles, hydrostatics, rotation_matrices
+from .mesh import ArrayMesh
+from .spatial import BoundingVolumeHierarchy
+from typing import NamedTuple
+import numpy as np
+
+
+MIN_RANGE = 40.0  # [deg] largest angle used by the criteria
+
+
+class StabilityCriteria(NamedTuple):
+    """Intact stability quantities per heading and draft, cf. the IMO 2008 IS Code"""
+    area_0_30: np.ndarray        # area under the GZ curve [m rad]
+    area_0_40: np.ndarray
+    area_30_40: np.ndarray
+    gz_30: np.ndarray            # righting arm at 30 deg [m]
+    max_gz: np.ndarray           # [m]
+    angle_of_max_gz: np.ndarray  # [deg]
+    vanishing_angle: np.ndarray  # angle of vanishing stability [deg], inf if not reached
+    initial_gm: np.ndarray       # slope of the GZ curve at the first angle [m/rad]
+
+
+class GZCurves(NamedTuple):
+    headings: np.ndarray    # (H,) [deg]
+    drafts: np.ndarray      # (D,) upright drafts defining the displacements [m]
+    angles: np.ndarray      # (A,) heel angles [deg]
+    gz: np.ndarray          # (H,D,A) righting arm [m]
+    draft: np.ndarray       # (H,D,A) draft at every inclination [m]
+    volume: np.ndarray      # (D,) displaced volume [m3]
+
+    def area(self, start:float, stop:float) -> np.ndarray:
+        """Return the (H,D) area under the GZ curves between two angles [m rad]"""
+        if start < self.angles[0] or stop > self.angles[-1]:
+            raise ValueError(f"Area from {start} to {stop} deg is outside the computed angles "
+                             f"{self.angles[0]} to {self.angles[-1]} deg")
+        fine = np.linspace(start, stop, 201)
+        gz = self.interpolate(fine)
+        return 0.5*(gz[..., 1:] + gz[..., :-1]) @ np.diff(np.radians(fine))
+
+    def interpolate(self, angles) -> np.ndarray:
+        """Return the righting arm at the given angles [deg], (H,D,...) """
+        angles = np.asarray(angles, dtype=np.float64)
+        flat = self.gz.reshape(-1, len(self.angles))
+        out = np.stack([np.interp(angles.ravel(), self.angles, row) for row in flat])
+        return out.reshape(self.gz.shape[:2] + angles.shape)
+
+    def vanishing_angle(self) -> np.ndarray:
+        """Return the (H,D) first angle beyond the maximum at which GZ becomes zero [deg]"""
+        out = np.full(self.gz.shape[:2], np.inf)
+        for index in np.ndindex(*out.shape):
+            gz = self.gz[index]
+            top = int(np.argmax(gz))
+            below = np.flatnonzero(gz[top:] <= 0)
+            if len(below):
+                i = top + below[0]
+                a0, a1, g0, g1 = self.angles[i-1], self.angles[i], gz[i-1], gz[i]
+                out[index] = a0 + g0*(a1 - a0)/(g0 - g1) if g0 != g1 else a1
+        return out
+
+    def with_free_surface(self, moment, water_density:float=1025.0) -> GZCurves:
+        """Return the curves corrected for the free surface of slack tanks.
+
+        moment: (2,) or (D,2) free-surface moments about the x and y axis [kg m], see
+            hivemind.tanks. They raise the centre of gravity virtually by the moment
+            about the heeling axis over the displacement mass, which reduces GZ by
+            that rise times sin(angle).
+        """
+        moment = np.broadcast_to(np.asarray(moment, dtype=np.float64), (len(self.drafts), 2))
+        heading = np.radians(self.headings)[:, None]
+        about_axis = np.cos(heading)**2*moment[:, 0] + np.sin(heading)**2*moment[:, 1]  # (H,D)
+        rise = about_axis / (water_density*self.volume)
+        gz = self.gz - rise[..., None]*np.sin(np.radians(self.angles))
+        return self._replace(gz=gz)
+
+    def criteria(self) -> StabilityCriteria:
+        top = np.argmax(self.gz, axis=-1)
+        slope = (self.gz[..., 1] - self.gz[..., 0]) / np.radians(self.angles[1] - self.angles[0])
+        return StabilityCriteria(
+            area_0_30=self.area(0, 30),
+            area_0_40=self.area(0, 40),
+            area_30_40=self.area(30, 40),
+            gz_30=self.interpolate(30.0),
+            max_gz=self.gz.max(axis=-1),
+            angle_of_max_gz=self.angles[top],
+            vanishing_angle=self.vanishing_angle(),
+            initial_gm=slope,
+        )
+
+
+def _shifted(totals:np.ndarray, c:float) -> np.ndarray:
+    """Return the integrals of _integrate for the same triangles moved up by c"""
+    out = totals.copy()
+    V, A, Sx, Sy = totals[0], totals[4], totals[5], totals[6]
+    out[0] = V - c*A
+    out[1] = totals[1] - c*Sx
+    out[2] = totals[2] - c*Sy
+    out[3] = totals[3] + c*V - 0.5*c*c*A
+    return out
+
+
+def _solve_inclination(earth:np.ndarray, index:BoundingVolumeHierarchy, normal:np.ndarray, volume:float,
+                       lo:float, hi:float, tol:float, max_iter:int):
+    """Solve the draft at which the (T,3,3) triangles, rotated but not yet lowered,
+    displace `volume`, starting from the draft band [lo, hi]. `normal` is the vertical
+    in body coordinates, used to find the panels in the band with the spatial index of
+    the mesh. Returns (draft, totals)."""
+    top = earth[..., 2].max(axis=1)
+    draft = 0.5*(lo + hi)
+    wet = band = None
+    for _ in range(max_iter):
+        if wet is None or not lo <= draft <= hi:
+            half = max(0.5*(hi - lo), 1e-9)
+            lo, hi = draft - half, draft + half
+            band = index.panel_triangles(index.cut(normal, lo, hi))
+            wet = top < lo
+            wet[band] = False
+            lowered = earth[wet].copy()
+            lowered[..., 2] -= lo
+            wet_totals = _integrate(lowered[None])[0]
+        lowered = earth[band].copy()
+        lowered[..., 2] -= draft
+        totals = _shifted(wet_totals, lo - draft)
+        for tri in _submerged_triangles(lowered[None]):
+            totals = totals + _integrate(tri)[0]
+        error = totals[0] - volume
+        if abs(error) <= tol*volume or totals[4] <= 0:
+            break
+        draft = draft - error/totals[4]
+    return draft, totals
+
+
+def gz_curves(mesh:ArrayMesh, drafts, centre_of_gravity, angles=np.arange(0.0, 91.0), headings=(0.0,),
+              tol:float=1e-10, max_iter:int=50) -> GZCurves:
+    """Compute the GZ curves of `mesh` for every heading and upright draft.
+
+    drafts: (D,) upright drafts [m], which set the displacement of every curve
+    centre_of_gravity: (3,) or (D,3) in body coordinates [m]
+    angles: (A,) increasing heel angles [deg] from 0 up to at least MIN_RANGE, as
+        required by the areas and initial GM of `GZCurves.criteria()`
+    headings: (H,) directions of the heeling axis [deg], 0 heels about x
+    """
+    mesh = ArrayMesh.from_mesh(mesh)
+    drafts = np.atleast_1d(np.asarray(drafts, dtype=np.float64))
+    angles = np.asarray(angles, dtype=np.float64)
+    if angles.ndim != 1 or len(angles) < 2 or np.any(np.diff(angles) <= 0):
+        raise ValueError("angles must be a 1D array of at least two increasing values")
+    if angles[0] != 0 or angles[-1] < MIN_RANGE:
+        raise ValueError(f"angles must start at 0 and reach {MIN_RANGE} deg, got {angles[0]} to {angles[-1]}")
+    headings = np.atleast_1d(np.asarray(headings, dtype=np.float64))
+    cog = np.broadcast_to(np.asarray(centre_of_gravity, dtype=np.float64), (len(drafts), 3))
+    body = mesh.nodes[mesh.triangles()]
+    index = mesh.spatial_index
+    low, high = mesh.bounds
+    margin = 1e-3*(high[2] - low[2])
+
+    volume = hydrostatics(mesh, drafts).volume
+
+    H, D, A = len(headings), len(drafts), len(angles)
+    gz = np.zeros((H, D, A))
+    draft = np.zeros((H, D, A))
+    for h, heading in enumerate(headings):
+        c, s = np.cos(np.radians(heading)), np.sin(np.radians(heading))
+        Rz = np.array([[c, s, 0], [-s, c, 0], [0, 0, 1]])  # heeling axis onto x
+        R = rotation_matrices(angles, 0.0) @ Rz
+        for d in range(D):
+            previous = [drafts[d]]
+            for a in range(A):
+                earth = body @ R[a].T
+                guess = 2*previous[-1] - previous[-2] if len(previous) > 1 else previous[-1]
+                half = max(abs(guess - previous[-1]), margin)
+                z, totals = _solve_inclination(earth, index, R[a, 2], volume[d], guess - half, guess + half,
+                                               tol, max_iter)
+                previous.append(z)
+                y_b = totals[2] / totals[0]
+                y_g = R[a, 1] @ cog[d]
+                gz[h, d, a] = y_g - y_b
+                draft[h, d, a] = z
+    return GZCurves(headings, drafts, angles, gz, draft, volume)
@@ -0,0 +1,171 @@
+"""Persistent, content-addressed store for analysis results.
+
+Results of the cached methods of Base objects (see `Base._cached_methods`) are stored
+in a SQLite database under a key that hashes
+
+    - the hivemind version,
+    - the class and method name and the call arguments,
+    - the parameters and the state of the object, including the Base objects it
+      holds (e.g. the Structure of a Naval), see `Base._cache_key`.
+
+Identical analyses therefore hit the store across processes, restarts and machines
+that share the file. To enable it for all objects, or per class or instance:
+
+    Base.result_store = ResultStore("results.sqlite")
+
+Values are pickled. The database runs in WAL mode, so many worker processes can read
+and write concurrently; every process (and thread) opens its own connection. When the
+stored values exceed `max_size` bytes, the least recently used entries are evicted.
+"""
+from __future__ import annotations
+from . import __version__
+from .abstracts import Base, State
+from pathlib import Path
+from typing import Any, Callable, Dict
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import numpy as np
+
+
+MAX_SIZE = 2**30  # bytes
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    accessed REAL NOT NULL
+)
+"""
+
+
+def _canonical(value) -> str:
+    """Return a stable text representation of a call argument"""
+    if isinstance(value, np.ndarray):
+        digest = hashlib.sha1(np.ascontiguousarray(value).tobytes()).hexdigest()
+        return f"ndarray({value.dtype.str},{value.shape},{digest})"
+    if isinstance(value, (list, tuple)):
+        return f"{type(value).__name__}({','.join(_canonical(v) for v in value)})"
+    if isinstance(value, dict):
+        return f"dict({','.join(f'{_canonical(k)}:{_canonical(v)}' for k, v in sorted(value.items(), key=repr))})"
+    if isinstance(value, Base):
+        return configuration(value)
+    if isinstance(value, State):
+        return f"state({type(value).__qualname__})"
+    if hasattr(value, "m") and hasattr(value, "u"):  # quantity
+        return f"quantity({value.to_base_units()!r})"
+    return f"{type(value).__name__}({value!r})"
+
+
+def configuration(obj:Base) -> str:
+    """Return the parameter hash and state of `obj`, including the Base objects it holds"""
+    parameters, state = obj._cache_key()
+    return f"{type(obj).__qualname__}:{parameters}:{state}"
+
+
+def result_key(obj:Base, method:str, args:tuple=(), kwargs:Dict[str, Any]|None=None) -> str:
+    """Return the store key of `obj.method(*args, **kwargs)`"""
+    items = [f"hivemind={__version__}", f"{type(obj).__module__}.{type(obj).__qualname__}.{method}"]
+    items.append(configuration(obj))
+    items += [_canonical(a) for a in args]
+    items += [f"{k}={_canonical(v)}" for k, v in sorted((kwargs or {}).items())]
+    return hashlib.sha256("\n".join(items).encode()).hexdigest()
+
+
+class ResultStore:
+    """SQLite backed result store, see the module docstring"""
+
+    def __init__(self, path:Path|str, max_size:int=MAX_SIZE):
+        self.path = Path(path)
+        self.max_size = int(max_size)
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        self._connect()
+
+    def __getstate__(self):
+        return {"path": self.path, "max_size": self.max_size}
+
+    def __setstate__(self, state):
+        self.__init__(state["path"], state["max_size"])
+
+    def __repr__(self):
+        return f"ResultStore({str(self.path)!r}, entries={len(self)}, size={self.size})"
+
+    def _connect(self) -> sqlite3.Connection:
+        """Return the connection of this process and thread"""
+        local = self._local
+        if getattr(local, "pid", None) != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(_SCHEMA)
+            local.connection, local.pid = connection, os.getpid()
+        return local.connection
+
+    def __len__(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def __contains__(self, key:str) -> bool:
+        return self._connect().execute("SELECT 1 FROM results WHERE key = ?", (key,)).fetchone() is not None
+
+    @property
+    def size(self) -> int:
+        """Total size of the stored values [bytes]"""
+        return self._connect().execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+
+    def get(self, key:str, default=None):
+        connection = self._connect()
+        row = connection.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return default
+        connection.execute("UPDATE results SET accessed = ? WHERE key = ?", (time.time(), key))
+        self.hits += 1
+        return pickle.loads(row[0])
+
+    def put(self, key:str, value):
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(blob) > self.max_size:
+            return  # would evict everything else
+        connection = self._connect()
+        connection.execute("INSERT OR REPLACE INTO results (key, value, size, accessed) VALUES (?, ?, ?, ?)",
+                           (key, blob, len(blob), time.time()))
+        self.evict()
+
+    def evict(self, max_size:int|None=None):
+        """Drop the least recently used entries until the store fits in `max_size` bytes"""
+        max_size = self.max_size if max_size is None else max_size
+        connection = self._connect()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            excess = connection.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0] - max_size
+            if excess > 0:
+                victims, freed = [], 0
+                for key, size in connection.execute("SELECT key, size FROM results ORDER BY accessed"):
+                    victims.append((key,))
+                    freed += size
+                    if freed >= excess:
+                        break
+                connection.executemany("DELETE FROM results WHERE key = ?", victims)
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    def clear(self):
+        self._connect().execute("DELETE FROM results")
+
+    def lookup(self, obj:Base, method:str, args:tuple, kwargs:Dict[str, Any], compute:Callable[[], Any]):
+        """Return the stored result of `obj.method(*args, **kwargs)`, or compute and store it"""
+        key = result_key(obj, method, args, kwargs)
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = compute()
+            self.put(key, value)
+        return value
@@ -10,7 +10,11 @@ from carg_io.abstracts import ParameterSet, Parameter, units
 
 class Structure(Base):
 
-    """Describe a structural object, i.e. anything that has mass and some spatial properties."""
+    """Describe a structural object, i.e. anything that has mass and some spatial properties.
+    
+    The results of `get_mesh` and `get_inertia` are cached, see Base.
+    """
+    _cached_methods = ("get_mesh", "get_inertia")
 
     @abstractmethod
     def get_mesh(self) -> Mesh:
@@ -20,4 +24,16 @@ class Structure(Base):
     def get_inertia(self) -> Inertia:
         ...
 
+    def solve_modes(self, section, n:int=10, fixed=(), node_masses=None, edges=None):
+        """Helper for eigenmode analyses of frames such as jackets and towers.
+
+        Models the edges of `self.get_mesh()` (or the given (E,2) `edges` between its
+        nodes) as beams of `section` and returns the `n` lowest modes, see
+        `hivemind.frame`. Requires scipy.
+        """
+        from .frame import FrameModel, mesh_edges
+        mesh = self.get_mesh()
+        edges = mesh_edges(mesh) if edges is None else edges
+        return FrameModel(mesh.nodes, edges, section, fixed=fixed, node_masses=node_masses).modes(n)
+
     
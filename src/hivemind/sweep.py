@@ -0,0 +1,234 @@
+"""Parameter sweeps over ParameterSet variants on a process pool.
+
+A sweep is defined by
+
+    base:     the ParameterSets that define the nominal design, by name,
+              e.g. {"design": MyDesign(), "naval": MyNavalParameters()}
+    build:    a function that turns those ParameterSets (as keyword arguments) into the
+              object to analyse, e.g. lambda design, naval: MyNaval(naval, MyStructure(design))
+    evaluate: the analysis to run on the built object, either a callable or the name of
+              a method such as "get_stability" or "get_natural_periods"
+    cases:    a list of overrides, each a dict of parameter name to value, as generated
+              by `grid` or `sample`
+
+Parameter names may be qualified with the name of the set ("naval.WaterDepth") and must
+be when the name is ambiguous. Values are either quantities with a unit or plain numbers
+in the default unit of the parameter.
+
+For use with processes > 1, `build` and `evaluate` must be picklable, i.e. defined at
+module level. The base ParameterSets are sent to every worker once; each task only
+carries its overrides.
+"""
+from __future__ import annotations
+from .params import ParameterArray
+from carg_io.abstracts import ParameterSet, Parameter
+from itertools import product
+from multiprocessing import Pool
+from operator import methodcaller
+from typing import Any, Callable, Dict, Generator, Iterable, List, Tuple
+import os
+import traceback
+import numpy as np
+
+
+
+def grid(**axes) -> List[Dict[str, Any]]:
+    """Return the cartesian product of the given parameter values as a list of overrides.
+
+    >>> grid(Length=[80, 100], Width=[30, 40])  # doctest: +SKIP
+    """
+    names = list(axes)
+    return [dict(zip(names, values)) for values in product(*(list(axes[n]) for n in names))]
+
+
+def latin_hypercube(n:int, d:int, rng:np.random.Generator) -> np.ndarray:
+    """Return (n,d) points in the unit cube with one point in every stratum of every axis"""
+    return (rng.permuted(np.tile(np.arange(n), (d, 1)), axis=1).T + rng.random((n, d))) / n
+
+
+def sample(n:int, seed:int|None=None, **bounds:Tuple[float, float]) -> List[Dict[str, float]]:
+    """Return n overrides drawn by Latin hypercube sampling between (low, high) bounds.
+    Bounds are plain numbers in the default unit of each parameter."""
+    rng = np.random.default_rng(seed)
+    names = list(bounds)
+    u = latin_hypercube(n, len(names), rng)
+    low = np.array([bounds[k][0] for k in names], dtype=np.float64)
+    high = np.array([bounds[k][1] for k in names], dtype=np.float64)
+    values = low + u*(high - low)
+    return [dict(zip(names, row.tolist())) for row in values]
+
+
+def set_value(parameter:Parameter, value):
+    """Set a Parameter from a quantity, or from a plain number in its default unit"""
+    if hasattr(value, "m") and hasattr(value, "u"):
+        parameter[value.u] = value.m
+    else:
+        parameter[parameter._unit_default] = value
+
+
+def resolve(base:Dict[str, ParameterSet], name:str) -> Tuple[str, str]:
+    """Return (set name, parameter name) for a possibly qualified parameter name"""
+    if "." in name:
+        set_name, parm_name = name.split(".", 1)
+        if set_name not in base or parm_name not in base[set_name]._parameters:
+            raise KeyError(f"Unknown parameter '{name}'")
+        return set_name, parm_name
+    owners = [k for k, ps in base.items() if name in ps._parameters]
+    if len(owners) != 1:
+        reason = "Unknown" if not owners else f"Ambiguous (found in {owners})"
+        raise KeyError(f"{reason} parameter '{name}', qualify it as '<set>.{name}'")
+    return owners[0], name
+
+
+def apply_overrides(base:Dict[str, ParameterSet], overrides:Dict[str, Any]) -> Dict[str, ParameterSet]:
+    """Return copies of the base ParameterSets with the overrides applied.
+    Sets that are not affected are not copied."""
+    out = dict(base)
+    for name, value in overrides.items():
+        set_name, parm_name = resolve(base, name)
+        if out[set_name] is base[set_name]:
+            out[set_name] = base[set_name].copy()
+        set_value(out[set_name][parm_name], value)
+    return out
+
+
+class ResultTable:
+    """Column-oriented table of sweep results.
+
+    Every row is one case. The columns are the case index, the overridden parameters
+    (as numbers in their default unit), the result and an error column holding the
+    traceback of failed cases. Results that are dictionaries are spread over one column
+    per key.
+    """
+
+    def __init__(self):
+        self._columns: Dict[str, list] = {}
+        self._n = 0
+
+    def append(self, row:Dict[str, Any]):
+        for name in row:
+            if name not in self._columns:
+                self._columns[name] = [None]*self._n
+        for name, column in self._columns.items():
+            column.append(row.get(name))
+        self._n += 1
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self._columns)
+
+    def __len__(self) -> int:
+        return self._n
+
+    def __getitem__(self, name:str) -> np.ndarray:
+        column = self._columns[name]
+        try:
+            return np.array(column)
+        except ValueError:  # ragged results
+            out = np.empty(len(column), dtype=object)
+            out[:] = column
+            return out
+
+    def to_dict(self) -> Dict[str, np.ndarray]:
+        return {name: self[name] for name in self._columns}
+
+    def sorted(self, by:str="case") -> ResultTable:
+        """Return a copy with the rows sorted by column `by` (default: case index)"""
+        order = np.argsort(self._columns[by], kind="stable")
+        table = ResultTable()
+        table._columns = {k: [v[i] for i in order] for k, v in self._columns.items()}
+        table._n = self._n
+        return table
+
+    def to_dataframe(self):
+        import pandas as pd
+        return pd.DataFrame({k: list(v) for k, v in self._columns.items()})
+
+    def __repr__(self):
+        return f"ResultTable(rows={self._n}, columns={self.columns})"
+
+
+def _number(value):
+    return value.m if hasattr(value, "m") and hasattr(value, "u") else value
+
+
+# Per-worker state, set once by the pool initializer
+_worker = {}
+
+
+def _init_worker(base, build, evaluate):
+    _worker["base"] = base
+    _worker["build"] = build
+    _worker["evaluate"] = evaluate
+
+
+def _run_case(task:Tuple[int, Dict[str, Any]]) -> Dict[str, Any]:
+    index, overrides = task
+    row = {"case": index}
+    row.update({name: _number(value) for name, value in overrides.items()})
+    try:
+        sets = apply_overrides(_worker["base"], overrides)
+        obj = _worker["build"](**sets)
+        result = _worker["evaluate"](obj)
+    except Exception:
+        row["error"] = traceback.format_exc()
+        return row
+    if isinstance(result, dict):
+        row.update(result)
+    else:
+        row["result"] = result
+    return row
+
+
+class Sweep:
+    """Run an analysis for many ParameterSet variants, see the module docstring."""
+
+    def __init__(self, base:Dict[str, ParameterSet], build:Callable[..., Any], evaluate:Callable[[Any], Any]|str,
+                 cases:Iterable[Dict[str, Any]]):
+        self.base = dict(base)
+        self.build = build
+        self.evaluate = methodcaller(evaluate) if isinstance(evaluate, str) else evaluate
+        self.cases = list(cases)
+        for overrides in self.cases:  # fail early on typos
+            for name in overrides:
+                resolve(self.base, name)
+
+    def __len__(self) -> int:
+        return len(self.cases)
+
+    def parameter_arrays(self) -> Dict[str, ParameterArray]:
+        """Return the parameters of all cases as one stacked ParameterArray per set,
+        for analyses that can run vectorized over the cases instead of case by case"""
+        sets = [apply_overrides(self.base, overrides) for overrides in self.cases]
+        return {name: ParameterArray.stack([s[name] for s in sets]) for name in self.base}
+
+    def iter_results(self, processes:int|None=None, chunksize:int|None=None) -> Generator[Dict[str, Any]]:
+        """Yield one result row per case, in order of completion.
+
+        processes: number of worker processes, None for os.cpu_count(), 1 to run in
+            this process (useful for debugging).
+        chunksize: number of cases sent to a worker at once. Defaults to about four
+            chunks per worker, which amortizes the dispatch overhead of short analyses.
+        """
+        tasks = list(enumerate(self.cases))
+        if processes == 1:
+            _init_worker(self.base, self.build, self.evaluate)
+            try:
+                for task in tasks:
+                    yield _run_case(task)
+            finally:
+                _worker.clear()
+            return
+
+        processes = processes or os.cpu_count() or 1
+        if chunksize is None:
+            chunksize = max(1, len(tasks) // (4*processes))
+        with Pool(processes, initializer=_init_worker, initargs=(self.base, self.build, self.evaluate)) as pool:
+            yield from pool.imap_unordered(_run_case, tasks, chunksize=chunksize)
+
+    def run(self, processes:int|None=None, chunksize:int|None=None) -> ResultTable:
+        """Run all cases and return the results as a ResultTable sorted by case"""
+        table = ResultTable()
+        for row in self.iter_results(processes, chunksize):
+            table.append(row)
+        return table.sorted()
@@ -0,0 +1,220 @@
+"""Ballast tanks and vectorized loading conditions of many tanks.
+
+A `BallastTank` is the example of the Base docstring: a ParameterSet describes the
+tank, a rectangular box aligned with the body axes, and its states Empty,
+InterMediate and Full set how far it is filled.
+
+A vessel has tens of tanks and ballast planning evaluates thousands of fill
+combinations. A `TankCollection` holds the geometry of all tanks as arrays, and
+`evaluate` computes the combined fluid mass, centre of gravity and free-surface
+moments of a (K,T) batch of fill fractions, K combinations of T tanks, in one pass:
+
+    tanks = TankCollection.from_tanks(vessel_tanks)
+    loading = tanks.evaluate(fills)                 # fills: (K,T) in [0, 1]
+    ok = loading.mass + lightship_mass < limit
+
+Free-surface moments are the moments of inertia of the free surfaces of slack tanks
+times their fluid density [kg m], about the longitudinal (transverse heel) and the
+transverse axis (trim). Divided by the displacement mass they give the virtual rise of
+the centre of gravity, see `GZCurves.with_free_surface`.
+
+Locations are in body coordinates, see hivemind.hydrostatics: `Location` is the
+centre of the bottom of the tank.
+"""
+from __future__ import annotations
+from .abstracts import Base, State, magnitude
+from .inertia import InertiaCollection
+from carg_io.abstracts import ParameterSet, Parameter, units
+from typing import Dict, Iterable, NamedTuple
+import numpy as np
+
+
+SLACK = 1e-6  # fills within SLACK of empty or full have no free surface
+
+
+class BallastTankParameters(ParameterSet):
+    Length:Parameter = 10 * units.m
+    Width:Parameter = 10 * units.m
+    Height:Parameter = 5 * units.m
+    LocationX:Parameter = 0 * units.m
+    LocationY:Parameter = 0 * units.m
+    LocationZ:Parameter = 0 * units.m
+    FluidDensity:Parameter = 1025 * units.kg/units.m**3
+    IntermediateFilling = 0.5  # fill fraction of the InterMediate state
+
+
+class BallastTank(Base):
+
+    def __init__(self, parameters:BallastTankParameters) -> None:
+        super().__init__()
+        self._parameters = parameters
+        self._possible_states = {
+            "Empty": Empty(self),
+            "InterMediate": InterMediate(self),
+            "Full": Full(self),
+        }
+        self._state = self._possible_states["Empty"]
+        self._previous_state = None
+
+    @property
+    def parameters(self) -> BallastTankParameters:
+        return self._parameters
+
+    @property
+    def possible_states(self) -> Dict[str, TankState]:
+        return self._possible_states
+
+    def change_state(self, state:str) -> bool:
+        self._previous_state = self._state
+        self._state = self.possible_states[state]
+        return True
+
+    @property
+    def state(self) -> TankState:
+        return self._state
+
+    @property
+    def previous_state(self) -> TankState|None:
+        return self._previous_state
+
+    @property
+    def fill(self) -> float:
+        return self.state.fill
+
+    def get_inertia(self) -> InertiaCollection:
+        """Return the fluid in the tank as a single item collection"""
+        return TankCollection.from_tanks([self]).inertia()
+
+
+class TankState(State):
+
+    @property
+    def fill(self) -> float:
+        """Fill fraction of the tank [-]"""
+        return 0.0
+
+
+class Empty(TankState):
+    pass
+
+
+class InterMediate(TankState):
+
+    @property
+    def fill(self) -> float:
+        return float(magnitude(self.base.parameters.IntermediateFilling, None))
+
+
+class Full(TankState):
+
+    @property
+    def fill(self) -> float:
+        return 1.0
+
+
+class TankLoading(NamedTuple):
+    mass: np.ndarray                  # (K,) fluid mass [kg]
+    centre_of_gravity: np.ndarray     # (K,3) of the fluid [m], zero if all tanks are empty
+    free_surface_moment: np.ndarray   # (K,2) about the x and y axis [kg m]
+
+    def combined(self, mass, centre_of_gravity) -> TankLoading:
+        """Return the loading with a body of `mass` [kg] at `centre_of_gravity` [m]
+        added, e.g. the lightship, such that mass and centre of gravity are the totals"""
+        mass = np.asarray(mass, dtype=np.float64)
+        total = self.mass + mass
+        moment = self.mass[:, None]*self.centre_of_gravity + mass[..., None]*np.asarray(centre_of_gravity, dtype=np.float64)
+        return TankLoading(total, moment / total[:, None], self.free_surface_moment)
+
+
+class TankCollection:
+    """Rectangular tanks as arrays, see the module docstring.
+
+    lengths, widths, heights: (T,) [m]
+    locations: (T,3) centres of the tank bottoms [m]
+    densities: (T,) or scalar fluid density [kg/m3]
+    fills: (T,) current fill fractions, empty by default
+    """
+
+    def __init__(self, lengths, widths, heights, locations, densities=1025.0, fills=None, names=None):
+        self.lengths = np.atleast_1d(np.asarray(lengths, dtype=np.float64))
+        T = len(self.lengths)
+        self.widths = np.broadcast_to(np.asarray(widths, dtype=np.float64), (T,)).copy()
+        self.heights = np.broadcast_to(np.asarray(heights, dtype=np.float64), (T,)).copy()
+        self.locations = np.broadcast_to(np.asarray(locations, dtype=np.float64), (T, 3)).copy()
+        self.densities = np.broadcast_to(np.asarray(densities, dtype=np.float64), (T,)).copy()
+        self.fills = np.zeros(T) if fills is None else np.broadcast_to(np.asarray(fills, dtype=np.float64), (T,)).copy()
+        self.names = list(names) if names is not None else [f"tank{i}" for i in range(T)]
+
+        self.capacities = self.lengths*self.widths*self.heights*self.densities  # full mass [kg]
+        # free-surface moment of every tank when slack [kg m]
+        self.free_surface_moments = np.stack([
+            self.densities*self.lengths*self.widths**3/12,
+            self.densities*self.widths*self.lengths**3/12,
+        ], axis=1)
+
+    @classmethod
+    def from_tanks(cls, tanks:Iterable[BallastTank], names:Iterable[str]|None=None) -> TankCollection:
+        """Collect BallastTanks, with their current states as fills, named `names` or
+        tank0, tank1, ... in order"""
+        tanks = list(tanks)
+        p = [t.parameters for t in tanks]
+        return cls(
+            lengths=[magnitude(q.Length, "m") for q in p],
+            widths=[magnitude(q.Width, "m") for q in p],
+            heights=[magnitude(q.Height, "m") for q in p],
+            locations=np.reshape([[magnitude(q.LocationX, "m"), magnitude(q.LocationY, "m"),
+                                   magnitude(q.LocationZ, "m")] for q in p], (-1, 3)),
+            densities=[magnitude(q.FluidDensity, "kg/m**3") for q in p],
+            fills=[t.fill for t in tanks],
+            names=names,
+        )
+
+    def __len__(self) -> int:
+        return len(self.lengths)
+
+    def __repr__(self):
+        return f"TankCollection(n={len(self)}, capacity={self.capacities.sum():g})"
+
+    def _fills(self, fills) -> np.ndarray:
+        fills = self.fills if fills is None else np.asarray(fills, dtype=np.float64)
+        if fills.shape[-1:] != (len(self),):
+            raise ValueError(f"fills must have shape (T,) or (K,T) with T={len(self)}, got {fills.shape}")
+        if np.any((fills < 0) | (fills > 1)):
+            raise ValueError("fills must be fractions between 0 and 1")
+        return fills
+
+    def evaluate(self, fills=None) -> TankLoading:
+        """Return the loading of a (K,T) batch of fills, or of the (T,) current fills as
+        a batch of one"""
+        fills = np.atleast_2d(self._fills(fills))
+        masses = fills*self.capacities                         # (K,T)
+        mass = masses.sum(axis=1)
+        z = self.locations[:, 2] + 0.5*fills*self.heights       # (K,T) centroid of the fluid
+        moment = np.stack([masses @ self.locations[:, 0], masses @ self.locations[:, 1],
+                           np.einsum("kt,kt->k", masses, z)], axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cog = np.where(mass[:, None] > 0, moment / mass[:, None], 0.0)
+        slack = ((fills > SLACK) & (fills < 1 - SLACK)).astype(np.float64)
+        return TankLoading(mass, cog, slack @ self.free_surface_moments)
+
+    def inertia(self, fills=None, lightship:InertiaCollection|None=None) -> InertiaCollection:
+        """Return the fluid of every tank as an item of an InertiaCollection, for the
+        (T,) `fills` or the current fills, appended to a copy of `lightship` if given.
+        The result can be returned from `Structure.get_inertia()`."""
+        fills = self._fills(fills)
+        if fills.ndim != 1:
+            raise ValueError("Pass a single fill combination")
+        masses = fills*self.capacities
+        level = fills*self.heights
+        locations = self.locations + np.outer(0.5*level, [0, 0, 1])
+        l, w = self.lengths, self.widths
+        rotations = np.zeros((len(self), 3, 3))
+        rotations[:, 0, 0] = masses*(w**2 + level**2)/12
+        rotations[:, 1, 1] = masses*(l**2 + level**2)/12
+        rotations[:, 2, 2] = masses*(l**2 + w**2)/12
+
+        collection = InertiaCollection(capacity=len(self) + (len(lightship) if lightship is not None else 0))
+        if lightship is not None:
+            collection.add(lightship.masses, lightship.locations, lightship.rotations)
+        collection.add(masses, locations, rotations)
+        return collection
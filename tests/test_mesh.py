@@ -0,0 +1,177 @@
+import numpy as np
+import pytest
+
+from hivemind.mesh import ArrayMesh, box, merge
+
+
+def test_box_properties():
+    mesh = box(100, 40, 20, nx=4, ny=3, nz=2)
+    assert mesh.nodes.dtype == np.float64
+    assert mesh.nodes.flags["C_CONTIGUOUS"]
+    assert mesh.total_area == pytest.approx(2*(100*40 + 100*20 + 40*20))
+    # closed surface
+    np.testing.assert_allclose(mesh.area_vectors.sum(axis=0), 0, atol=1e-9)
+    # outward normals
+    radial = mesh.centroids - [0, 0, 10]
+    assert np.all(np.einsum("ij,ij->i", radial, mesh.normals) > 0)
+
+
+def test_mixed_panels():
+    nodes = [[0, 0, 0], [1, 0, 0], [1, 1, 0], [0, 1, 0], [2, 0, 0]]
+    mesh = ArrayMesh.from_panels(nodes, [[0, 1, 2, 3], [1, 4, 2]])
+    np.testing.assert_allclose(mesh.areas, [1.0, 0.5])
+    np.testing.assert_allclose(mesh.centroids[0], [0.5, 0.5, 0])
+    np.testing.assert_allclose(mesh.normals, [[0, 0, 1], [0, 0, 1]])
+    assert len(mesh.triangles()) == 3
+
+
+def test_views_are_zero_copy():
+    mesh = box(10, 10, 10, 2, 2, 2)
+    view = mesh.view(3, 10)
+    assert np.shares_memory(view.nodes, mesh.nodes)
+    assert np.shares_memory(view.indices, mesh.indices)
+    np.testing.assert_allclose(view.centroids, mesh.centroids[3:10])
+
+    mask = mesh.centroids[:, 2] < 5
+    selected = mesh.select(mask)
+    assert np.shares_memory(selected.nodes, mesh.nodes)
+    np.testing.assert_allclose(selected.areas, mesh.areas[mask])
+
+
+def test_merge_components():
+    a, b = box(10, 10, 10), box(2, 2, 2)
+    mesh = merge([a, b])
+    part = mesh.component(1)
+    assert np.shares_memory(part.indices, mesh.indices)
+    assert part.total_area == pytest.approx(b.total_area)
+    assert part.compact().n_nodes == b.n_nodes
+
+
+def test_save_and_memory_map(tmp_path):
+    mesh = merge([box(100, 40, 20, 10, 4, 4), box(5, 5, 5)])
+    file = mesh.save(tmp_path / "hull.mesh", metadata={"key": "abc"})
+
+    loaded = ArrayMesh.load(file)
+    assert isinstance(loaded.centroids, np.memmap)  # derived arrays page in from disk
+    np.testing.assert_array_equal(loaded.nodes, mesh.nodes)
+    np.testing.assert_array_equal(loaded.indices, mesh.indices)
+    np.testing.assert_allclose(loaded.areas, mesh.areas)
+    assert loaded.component(1).total_area == pytest.approx(150)
+
+    # views are compacted when stored
+    view = mesh.view(5, 20)
+    reloaded = ArrayMesh.load(view.save(tmp_path / "view.mesh"), mmap=False)
+    np.testing.assert_allclose(reloaded.centroids, view.centroids)
+
+
+def test_cached_mesh_rebuilds_on_new_key(tmp_path):
+    from hivemind.mesh import cached_mesh, read_metadata
+
+    calls = []
+
+    def build():
+        calls.append(1)
+        return box(1, 1, 1)
+
+    file = tmp_path / "box.mesh"
+    cached_mesh(file, build, "k1")
+    cached_mesh(file, build, "k1")
+    assert len(calls) == 1
+    cached_mesh(file, build, "k2")
+    assert len(calls) == 2
+    assert read_metadata(file) == {"key": "k2"}
+
+
+def test_delta_state_is_copy_on_write():
+    from hivemind.abstracts import DeltaState, State
+    from hivemind.inertia import InertiaCollection, inertia_in_state
+
+    class Hull:
+        def __init__(self):
+            self.possible_states = {"InSitu": State(self), "Weathered": Weathered(self)}
+
+    class Weathered(DeltaState):
+        parent = "InSitu"
+
+        def get_deltas(self):
+            return {"thickness": 0.05, "mass_per_area": 10.0}
+
+        def where(self, mesh):
+            return mesh.centroids[:, 2] < 5  # submerged panels only
+
+    hull = Hull()
+    mesh = box(10, 10, 10, 2, 2, 2)
+    mesh = mesh.with_attributes({"thickness": np.full(mesh.n_panels, 0.02), "label": np.arange(mesh.n_panels)})
+    mesh.centroids  # computed once for the root state
+
+    weathered = mesh.in_state(hull.possible_states["Weathered"])
+    assert weathered.nodes is mesh.nodes
+    assert weathered.centroids is mesh.centroids
+    assert weathered.attributes["label"] is mesh.attributes["label"]
+    wet = mesh.centroids[:, 2] < 5
+    np.testing.assert_allclose(weathered.attributes["thickness"][wet], 0.07)
+    np.testing.assert_allclose(weathered.attributes["thickness"][~wet], 0.02)
+    np.testing.assert_allclose(mesh.attributes["thickness"], 0.02)
+    assert mesh.in_state(hull.possible_states["InSitu"]) is mesh
+
+    root = InertiaCollection.from_arrays([1000.0], [[0, 0, 5]])
+    inertia = inertia_in_state(root, mesh, hull.possible_states["Weathered"])
+    assert inertia.translation == pytest.approx(1000 + 10*mesh.areas[wet].sum())
+    assert len(root) == 1
+
+
+def test_spatial_index_queries_match_scans():
+    from hivemind.spatial import point_triangle_distance
+
+    mesh = box(100, 40, 20, nx=20, ny=8, nz=6)
+    index = mesh.spatial_index
+    assert mesh.spatial_index is index
+
+    normal, offset = np.array([0, 0.1, 1.0]), 10.0
+    distance = mesh.nodes[mesh.indices] @ normal - offset
+    starts = mesh.indptr[:-1]
+    crossing = (np.minimum.reduceat(distance, starts) <= 0) & (np.maximum.reduceat(distance, starts) >= 0)
+    np.testing.assert_array_equal(index.cut(normal, offset), np.flatnonzero(crossing))
+
+    band = index.cut(normal, offset - 3, offset + 2)
+    lowest, highest = np.minimum.reduceat(distance, starts), np.maximum.reduceat(distance, starts)
+    np.testing.assert_array_equal(band, np.flatnonzero((lowest <= 2) & (highest >= -3)))
+    triangles = index.panel_triangles(band)
+    np.testing.assert_array_equal(np.unique(mesh._fan[3][triangles]), band)
+
+    low, high = np.array([-10, -10, -1]), np.array([10, 10, 1])
+    overlap = np.all((index.panel_low <= high) & (index.panel_high >= low), axis=1)
+    np.testing.assert_array_equal(index.in_box(low, high), np.flatnonzero(overlap))
+
+    points = np.random.default_rng(0).uniform([-70, -30, -10], [70, 30, 30], (50, 3))
+    panels, distances = index.nearest(points)
+    nodes, tri = mesh.nodes, mesh.triangles()
+    owner = mesh._fan[3]
+    for point, panel, d in zip(points, panels, distances):
+        all_distances = point_triangle_distance(point, nodes[tri[:, 0]], nodes[tri[:, 1]], nodes[tri[:, 2]])
+        assert d == pytest.approx(all_distances.min())
+        assert all_distances[owner == panel].min() == pytest.approx(d)
+
+
+def test_frame_cantilever_modes():
+    pytest.importorskip("scipy")
+    from hivemind.frame import FrameModel, Section, mesh_edges
+
+    length, n = 10.0, 40
+    section = Section.tube(0.5, 0.02)
+    x = np.linspace(0, length, n + 1)
+    edges = np.stack([np.arange(n), np.arange(1, n + 1)], axis=1)
+    analytic = 1.8751**2/(2*np.pi*length**2) * np.sqrt(2.1e11*section.Iy/(7850*section.area))
+
+    direction = np.array([1.0, 2.0, 2.0])/3  # rotation invariant
+    for axis in (np.array([1.0, 0, 0]), direction):
+        model = FrameModel(x[:, None]*axis, edges, section, fixed=[0])
+        modes = model.modes(4)
+        assert modes.frequencies[:2] == pytest.approx([analytic, analytic], rel=1e-4)
+        assert modes.shapes[:6, 0] == pytest.approx(np.zeros(6))
+        tip = modes.displacements(0)[-1]
+        assert abs(tip @ axis) < 1e-6*np.linalg.norm(tip)  # bending, not axial
+
+    mesh = box(10, 4, 2, nx=4, ny=2, nz=2)
+    edges = mesh_edges(mesh)
+    assert len(edges) == len(mesh.nodes) + mesh.n_panels - 2  # Euler, closed surface
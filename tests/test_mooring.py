@@ -0,0 +1,134 @@
+import numpy as np
+import pytest
+
+from hivemind.catenary import solve_catenary
+from hivemind.mooring import MooringSystem, MooringSystemParameters
+
+
+def test_catenary_satisfies_geometry():
+    from hivemind.catenary import _residual_and_jacobian
+
+    rng = np.random.default_rng(0)
+    n = 1000
+    X, Z = rng.uniform(150, 300, n), rng.uniform(20, 150, n)
+    L, w, EA = rng.uniform(200, 400, n), rng.uniform(100, 3000, n), rng.uniform(1e7, 2e9, n)
+    solution = solve_catenary(X, Z, L, w, EA)
+    taut = solution.converged & (X + Z > L)
+    assert solution.converged.mean() > 0.99
+    H, V = solution.horizontal[taut], solution.vertical[taut]
+    rx, rz = _residual_and_jacobian(H, V, X[taut], Z[taut], L[taut], w[taut], EA[taut])[:2]
+    assert np.all(np.abs(rx) < 1e-6*L[taut])
+    assert np.all(np.abs(rz) < 1e-6*L[taut])
+
+
+def test_slack_line_hangs_vertically():
+    solution = solve_catenary(X=100, Z=50, L=200, w=1000, EA=1e9)
+    assert solution.horizontal == 0
+    assert solution.vertical == pytest.approx(50*1000)
+
+
+def test_mooring_restoring_force():
+    system = MooringSystem(MooringSystemParameters())
+    response = system.solve([[0, 0, 0], [10, 0, 0], [-10, 0, 0], [0, 0, 5]])
+    assert response.tension.shape == (4, system.number_of_lines)
+    assert response.converged.all()
+    # symmetric layout: no horizontal force in the neutral position
+    np.testing.assert_allclose(response.force[0, [0, 1, 5]], 0, atol=1e-6)
+    # restoring in surge and yaw
+    assert response.force[1, 0] < 0 < response.force[2, 0]
+    assert response.force[3, 5] < 0
+
+
+def test_restoring_table_interpolates_and_persists(tmp_path):
+    system = MooringSystem(MooringSystemParameters())
+    grid = dict(surge=(-20, 20, 21), sway=(-20, 20, 21), yaw=(-5, 5, 5))
+    table = system.get_restoring_table(directory=tmp_path, **grid)
+    assert system.get_restoring_table(directory=tmp_path, **grid) is table
+    assert len(list(tmp_path.glob("*.npz"))) == 1
+
+    rng = np.random.default_rng(0)
+    offsets = np.c_[rng.uniform(-15, 15, (50, 2)), rng.uniform(-4, 4, 50)]
+    exact = system.solve(offsets).force
+    np.testing.assert_allclose(table.force(offsets), exact, rtol=0, atol=0.01*np.abs(exact).max())
+
+    # a new instance with equal parameters reads the table from disk
+    other = MooringSystem(MooringSystemParameters())
+    loaded = other.get_restoring_table(directory=tmp_path, **grid)
+    np.testing.assert_array_equal(loaded.forces, table.forces)
+
+    # changed parameters give a new table
+    other.parameters.AnchorRadius["m"] = 250
+    other.get_restoring_table(directory=tmp_path, **grid)
+    assert len(list(tmp_path.glob("*.npz"))) == 2
+
+
+def test_restoring_table_per_state():
+    system = MooringSystem(MooringSystemParameters())
+    grid = dict(surge=(-20, 20, 5), sway=(-20, 20, 5), yaw=(-5, 5, 3))
+    in_situ = system.get_restoring_table(**grid)
+    assert np.abs(in_situ.forces).max() > 0
+
+    system.change_state("LayDown")
+    laid_down = system.get_restoring_table(**grid)
+    assert laid_down is not in_situ
+    np.testing.assert_array_equal(laid_down.forces, 0)
+    np.testing.assert_array_equal(system.restoring_force([[10, 0, 0]]), 0)
+
+
+def test_batch_export_to_local_model():
+    from hivemind.export import LocalModel, write_per_object
+
+    system = MooringSystem(MooringSystemParameters())
+    model = LocalModel()
+    system.create_in_ofx(model)
+    n = system.number_of_lines
+    assert model.calls == 1
+    assert len(model.tables["lines"]) == len(model.tables["segments"]) == n
+    anchors, fairleads = system.get_layout()
+    np.testing.assert_allclose(model.tables["lines"]["end_a"], anchors)
+    np.testing.assert_allclose(model.tables["segments"]["length"], 250)
+
+    reference = LocalModel()
+    write_per_object(system.describe(), reference)
+    assert reference.calls == len(reference) == len(model)
+
+    system.change_state("LayDown")
+    lines = system.describe()["lines"]
+    assert set(lines["connection_b"]) == {"Free"}
+    np.testing.assert_allclose(lines["end_b"][:, 2], -100)
+
+    from hivemind.export import ModelDescription
+    description = ModelDescription()
+    description.add("lines", name=["L"*64])
+    with pytest.raises(ValueError):
+        description.add("lines", name=["short", "L"*65])
+    assert len(description) == 1
+
+
+def test_weathered_state_applies_deltas():
+    system = MooringSystem(MooringSystemParameters())
+    in_situ = system.get_line_attributes()
+    system.change_state("Weathered")
+    weathered = system.get_line_attributes()
+    assert system.previous_state is system.possible_states["InSitu"]
+    np.testing.assert_allclose(weathered["drag_diameter"], in_situ["drag_diameter"] + 0.1)
+    np.testing.assert_allclose(weathered["weight"], in_situ["weight"] + 100)
+    np.testing.assert_array_equal(weathered["length"], in_situ["length"])
+    # the previous state stays queryable without switching back
+    previous = system.get_line_attributes(system.previous_state)
+    np.testing.assert_array_equal(previous["weight"], in_situ["weight"])
+
+
+def test_fairlead_attachments_on_hull():
+    from hivemind.mesh import box
+
+    system = MooringSystem(MooringSystemParameters())  # fairleads at radius 20 m, 10 m below water
+    hull = box(40, 40, 20, nx=8, ny=8, nz=4)
+    panels, distances = system.get_fairlead_attachments(hull, draft=12)
+    _, fairleads = system.get_layout()
+    heading = np.arctan2(fairleads[:, 1], fairleads[:, 0])
+    # every fairlead lies inside the box, below the waterline, nearest to a side wall
+    side = np.abs(heading) < np.radians(45)
+    np.testing.assert_allclose(distances[side], 20*(1 - np.cos(heading[side])), atol=1e-9)
+    normals = hull.normals[panels[side]]
+    np.testing.assert_allclose(normals, np.tile([1, 0, 0], (side.sum(), 1)), atol=1e-12)
@@ -0,0 +1,238 @@
+import numpy as np
+import pytest
+
+from hivemind.hydrostatics import GRAVITY, hydrostatics, stiffness_matrices
+from hivemind.mesh import box
+from hivemind.abstracts import units
+
+
+RHO = 1025.0
+
+
+def test_box_hydrostatics():
+    mesh = box(100, 40, 20, nx=4, ny=2, nz=2)
+    props = hydrostatics(mesh, drafts=10)
+    assert props.volume[0] == pytest.approx(100*40*10)
+    np.testing.assert_allclose(props.centre_of_buoyancy[0], [0, 0, -5], atol=1e-9)
+    assert props.waterplane_area[0] == pytest.approx(4000)
+
+    C = stiffness_matrices(props, RHO)[0] / (RHO*GRAVITY)
+    assert C[2, 2] == pytest.approx(4000)
+    assert C[3, 3] == pytest.approx(100*40**3/12 + 40000*5)
+    assert C[4, 4] == pytest.approx(40*100**3/12 + 40000*5)
+
+
+def test_batched_positions_match_single():
+    mesh = box(100, 40, 20, nx=4, ny=2, nz=2)
+    drafts, trims, heels = [8, 10, 12], [0, 1.5, -2], [3, 0, 10]
+    batch = stiffness_matrices(hydrostatics(mesh, drafts, trims, heels), RHO)
+    assert batch.shape == (3, 6, 6)
+    for k in range(3):
+        single = stiffness_matrices(hydrostatics(mesh, drafts[k], trims[k], heels[k]), RHO)[0]
+        np.testing.assert_allclose(batch[k], single, rtol=1e-10, atol=1e-6)
+
+
+def test_roll_stiffness_matches_moment_derivative():
+    mesh = box(100, 40, 20, nx=4, ny=2, nz=2)
+    mass = 40000*RHO
+    C = stiffness_matrices(hydrostatics(mesh, 10), RHO, mass=mass, centre_of_gravity=[0, 0, 0])[0]
+
+    def moment(heel):
+        props = hydrostatics(mesh, 10, heels=heel)
+        arm = props.centre_of_buoyancy[0, 1] - props.to_earth([0, 0, 0])[0, 1]
+        return RHO*GRAVITY*props.volume[0]*arm
+
+    h = 0.01
+    derivative = -(moment(h) - moment(-h)) / (2*np.radians(h))
+    assert C[3, 3] == pytest.approx(derivative, rel=1e-6)
+
+
+def test_natural_periods_batched():
+    from hivemind.inertia import rigid_body_mass_matrix
+    from hivemind.periods import natural_periods, uncoupled_natural_periods
+
+    mesh = box(100, 40, 20, nx=4, ny=2, nz=2)
+    drafts = np.array([8.0, 10.0, 12.0])
+    props = hydrostatics(mesh, drafts)
+    mass = props.volume*RHO
+    radii = np.array([14.0, 30.0, 30.0])
+    rotation = mass[:, None, None]*np.diag(radii**2)
+    M = rigid_body_mass_matrix(mass, [0, 0, 6], rotation)
+    C = stiffness_matrices(props, RHO, mass=mass, centre_of_gravity=[0, 0, 6])
+    C = 0.5*(C + np.swapaxes(C, -1, -2))
+
+    periods, modes = natural_periods(M, C)
+    assert periods.shape == (3, 6) and modes.shape == (3, 6, 6)
+    assert np.all(np.isinf(periods[:, :3]))  # surge, sway and yaw are free
+
+    uncoupled = uncoupled_natural_periods(M, C)
+    expected_heave = 2*np.pi*np.sqrt(mass / (RHO*GRAVITY*4000))
+    np.testing.assert_allclose(uncoupled[:, 0], expected_heave)
+    # heave decouples from roll/pitch for a symmetric box about its cog
+    assert np.any(np.isclose(periods, expected_heave[:, None]), axis=1).all()
+    for k in range(3):
+        single, _ = natural_periods(M[k], C[k])
+        np.testing.assert_allclose(periods[k], single)
+
+
+def test_inertia_collection_matches_parallel_axis():
+    from hivemind.inertia import InertiaCollection, rigid_body_mass_matrix
+
+    rng = np.random.default_rng(0)
+    masses = rng.random(500)*1e4
+    locations = rng.normal(size=(500, 3))*10
+    rotations = np.einsum("i,jk->ijk", rng.random(500), np.eye(3))
+    reference = [1.0, 2.0, 3.0]
+
+    items = InertiaCollection.from_arrays(masses, locations, rotations)
+    expected = rigid_body_mass_matrix(masses, locations, rotations, reference).sum(axis=0)
+    np.testing.assert_allclose(items.mass_matrix(reference), expected)
+
+    new = items.add([5.0, 6.0], [[1, 1, 1], [2, 2, 2]])
+    items.remove([3, new[0], 0])
+    keep = np.ones(500, dtype=bool)
+    keep[[0, 3]] = False
+    expected = rigid_body_mass_matrix(
+        np.r_[masses[keep], 6.0], np.r_[locations[keep], [[2, 2, 2]]],
+        np.r_[rotations[keep], np.zeros((1, 3, 3))], reference).sum(axis=0)
+    assert len(items) == 499
+    np.testing.assert_allclose(items.mass_matrix(reference), expected)
+
+    # as an Inertia it describes the combined body about its centre of gravity
+    combined = rigid_body_mass_matrix(items.translation, items.location, items.rotation, reference)
+    np.testing.assert_allclose(combined, expected)
+
+
+def test_motion_simulator_free_decay():
+    from hivemind.simulation import MotionSimulator, harmonic_force
+
+    M = np.diag([1e6, 1e6, 2e6, 1e9, 1e9, 1e9])
+    K = np.diag([1e4, 1e4, 8e6, 2e8, 2e8, 1e6])
+    omega = np.sqrt(np.diag(K)/np.diag(M))
+    x0 = np.array([[0, 0, 1.0, 0, 0, 0], [0, 0, 2.0, 0.1, 0, 0]])  # two runs at once
+    sim = MotionSimulator(M, K)
+    for method in ("rk4", "rk45"):
+        snapshots = list(sim.run(duration=20, dt=0.05, position=x0, method=method, output_interval=1.0))
+        assert len(snapshots) == 21
+        times = np.array([s.time for s in snapshots])
+        positions = np.stack([s.position for s in snapshots])
+        np.testing.assert_allclose(times, np.arange(21.0))
+        expected = x0[None]*np.cos(omega*times[:, None, None])
+        np.testing.assert_allclose(positions, expected, atol=1e-4)
+
+    # a forced, damped run reaches the steady-state amplitude of the linear system
+    B = 2*0.1*np.sqrt(np.diag(K)*np.diag(M))*np.eye(6)
+    force = harmonic_force([0, 0, 1e6, 0, 0, 0], omega[2])
+    last = list(MotionSimulator(M, K, B, [force]).run(duration=200, dt=0.05, output_interval=10))[-1]
+    assert abs(last.position[0, 2]) < 1e6/(B[2, 2]*omega[2]) * 1.01
+    assert np.abs(last.position[0, [0, 1, 3, 4, 5]]).max() == 0
+
+
+def test_raos_match_pointwise_solve():
+    from hivemind.rao import HydrodynamicCoefficients, response_amplitude_operators
+
+    rng = np.random.default_rng(1)
+    w = np.linspace(0.1, 2.0, 50)
+    headings = np.arange(0, 360, 30.0)
+    M = np.diag([1e6, 1e6, 1e6, 1e9, 1e9, 1e9])
+    C = np.diag([1e3, 1e3, 4e6, 1e8, 1e8, 1e3])
+    A = 0.3*M*(1 + 0.1*np.sin(w))[:, None, None]
+    B = 0.05*np.sqrt(M*C)*np.ones((len(w), 1, 1))
+    F = rng.normal(size=(len(w), len(headings), 6)) + 1j*rng.normal(size=(len(w), len(headings), 6))
+    rao = response_amplitude_operators(M, C, HydrodynamicCoefficients(w, headings, A, B, F))
+
+    assert rao.values.shape == (50, 12, 6)
+    for i in (0, 17, 49):
+        Z = -w[i]**2*(M + A[i]) + 1j*w[i]*B[i] + C
+        for j in (0, 5):
+            np.testing.assert_allclose(rao.values[i, j], np.linalg.solve(Z, F[i, j]))
+    np.testing.assert_array_equal(rao.dof("heave"), rao.values[..., 2])
+    np.testing.assert_array_equal(rao.at_heading(355), rao.values[:, 0])
+
+
+def test_equilibrium_batched_with_warm_start():
+    from hivemind.equilibrium import solve_equilibrium
+
+    mesh = box(100, 40, 20, nx=4, ny=2, nz=2)
+    mass = np.array([40000, 32000, 48000, 40000])*RHO
+    cog = np.array([[0, 0, 8], [0, 0, 8], [5, 0, 8], [0, 1, 8]])
+    result = solve_equilibrium(mesh, RHO, mass, cog)
+    assert result.converged.all()
+    np.testing.assert_allclose(result.draft[:2], [10, 8])
+    assert result.trim[2] > 0 and result.heel[3] < 0
+
+    props = hydrostatics(mesh, result.draft, result.trim, result.heel)
+    np.testing.assert_allclose(props.volume*RHO, mass)
+    # centre of buoyancy on the vertical through the centre of gravity
+    np.testing.assert_allclose(props.centre_of_buoyancy[:, :2], props.to_earth(cog)[:, :2], atol=1e-6)
+
+    nearby = solve_equilibrium(mesh, RHO, mass*1.001, cog + [0.05, 0.01, 0], guess=result)
+    assert nearby.converged.all() and nearby.iterations.max() <= 2
+
+
+def test_gz_curve_matches_wall_sided_formula():
+    from hivemind.stability import gz_curves
+
+    mesh = box(100, 40, 20, nx=4, ny=2, nz=2)
+    cog = [0, 0, 9]
+    curves = gz_curves(mesh, [10], cog, angles=np.arange(0, 61.0, 2), headings=[0, 90])
+    assert curves.gz.shape == (2, 1, 31)
+
+    # wall-sided until the deck edge immerses at atan(10/20) = 26.6 deg
+    phi = np.radians(curves.angles[:13])
+    BM, KB = 40**2/(12*10), 5
+    GM = KB + BM - 9
+    np.testing.assert_allclose(curves.gz[0, 0, :13], np.sin(phi)*(GM + 0.5*BM*np.tan(phi)**2), atol=1e-9)
+
+    # the same inclination computed directly from the hydrostatics
+    props = hydrostatics(mesh, curves.draft[1, 0, 20], trims=40)
+    assert props.volume[0] == pytest.approx(40000)
+    gz = props.centre_of_buoyancy[0, 0] - props.to_earth(cog)[0, 0]
+    assert curves.gz[1, 0, 20] == pytest.approx(gz)
+
+    criteria = curves.criteria()
+    assert criteria.area_0_30.shape == (2, 1)
+    assert criteria.initial_gm[0, 0] == pytest.approx(GM, rel=1e-3)
+    assert np.all(criteria.area_0_40 > criteria.area_0_30)
+
+    for angles in ([10, 20, 30, 40], [0, 10, 20, 30], [0, 20, 10, 40]):
+        with pytest.raises(ValueError):
+            gz_curves(mesh, [10], cog, angles=angles)
+    with pytest.raises(ValueError):
+        curves.area(0, 70)
+
+
+def test_tank_collection_batched_loading():
+    from hivemind.stability import gz_curves
+    from hivemind.tanks import BallastTank, BallastTankParameters, TankCollection
+
+    tanks = []
+    for x, y in [(-30, -10), (-30, 10), (30, -10), (30, 10)]:
+        p = BallastTankParameters()
+        p.LocationX[units.m] = x
+        p.LocationY[units.m] = y
+        tanks.append(BallastTank(p))
+    tanks[1].change_state("Full")
+    tanks[2].change_state("InterMediate")
+    collection = TankCollection.from_tanks(tanks)
+    np.testing.assert_allclose(collection.fills, [0, 1, 0.5, 0])
+    assert len(set(collection.names)) == len(tanks)
+    named = TankCollection.from_tanks(tanks, names=["AP", "AS", "FP", "FS"])
+    assert named.names == ["AP", "AS", "FP", "FS"]
+
+    fills = np.random.default_rng(1).choice([0.0, 0.3, 1.0], size=(50, 4))
+    loading = collection.evaluate(fills)
+    for k in [0, 17, 49]:
+        inertia = collection.inertia(fills[k])
+        assert loading.mass[k] == pytest.approx(inertia.total_mass)
+        if inertia.total_mass:
+            np.testing.assert_allclose(loading.centre_of_gravity[k], inertia.location, atol=1e-9)
+        slack = np.isclose(fills[k], 0.3)
+        assert loading.free_surface_moment[k, 0] == pytest.approx(slack.sum()*RHO*10**4/12)
+
+    mesh = box(100, 40, 20, nx=4, ny=2, nz=2)
+    curves = gz_curves(mesh, 10, [0, 0, 8], angles=[0, 10, 20, 30, 40])
+    single = collection.evaluate([0, 0.3, 0, 0])
+    corrected = curves.with_free_surface(single.free_surface_moment[0], RHO)
+    rise = RHO*10**4/12 / (RHO*40000)
+    np.testing.assert_allclose(corrected.gz - curves.gz, -rise*np.sin(np.radians([[[0, 10, 20, 30, 40]]])))
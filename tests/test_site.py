@@ -0,0 +1,63 @@
+import numpy as np
+
+from hivemind.site import ENVIRONMENT, Site, SiteParameters, read_csv, write_binary
+
+
+def test_environment_streams_chunks_by_state(tmp_path):
+    site = Site(SiteParameters())
+    levels = 1.6*np.sin(np.linspace(0, 20, 1000))
+    csv = tmp_path / "hindcast.csv"
+    with open(csv, "w") as f:
+        f.write("time,water_level,significant_wave_height\n")
+        for i, level in enumerate(levels):
+            f.write(f"2020-01-01T{i // 60 % 24:02d}:{i % 60:02d}:00,{level},{1 + i/1000}\n")
+
+    chunks = list(site.environment(csv, chunk_size=300))
+    assert [len(c.records) for c in chunks] == [300, 300, 300, 100]
+    records = np.concatenate([c.records for c in chunks])
+    np.testing.assert_allclose(records["water_level"], levels)
+    assert np.isnan(records["peak_period"]).all()
+    assert records["time"][61] == np.datetime64("2020-01-01T01:01:00")
+
+    states = np.concatenate([c.states for c in chunks])
+    names = np.array([type(s).__name__ for s in states])
+    assert set(names[levels > 0.75]) == {"HAT"}
+    assert set(names[levels < -0.75]) == {"LAT"}
+    assert set(names[np.abs(levels) < 0.75]) == {"MSL"}
+    for state, group in chunks[0].groups():
+        assert state is site.possible_states[type(state).__name__]
+        assert len(group) == np.sum(chunks[0].states == state)
+
+    binary = tmp_path / "hindcast.bin"
+    assert write_binary(binary, read_csv(csv, chunk_size=128)) == 1000
+    again = np.concatenate([c.records for c in site.environment(binary, chunk_size=256)])
+    assert again.dtype == ENVIRONMENT
+    np.testing.assert_array_equal(again["time"], records["time"])
+    np.testing.assert_array_equal(again["water_level"], records["water_level"])
+
+
+def test_read_csv_with_gaps(tmp_path):
+    csv = tmp_path / "gaps.csv"
+    csv.write_text("time,water_level,peak_period\n"
+                   "2020-01-01T00:00:00,0.5,8\n"
+                   "2020-01-01T01:00:00,,9\n"
+                   ",0.7, \n"
+                   "2020-01-01T03:00:00,0.8\n")
+    records = np.concatenate(list(read_csv(csv)))
+    assert len(records) == 4
+    np.testing.assert_array_equal(np.isnan(records["water_level"]), [False, True, False, False])
+    np.testing.assert_array_equal(np.isnan(records["peak_period"]), [False, False, True, True])
+    assert np.isnat(records["time"][2])
+    assert records["peak_period"][1] == 9
+
+
+def test_missing_water_level_has_no_state(tmp_path):
+    site = Site(SiteParameters())
+    csv = tmp_path / "gap.csv"
+    csv.write_text("time,water_level\n2020-01-01T00:00:00,1.4\n2020-01-01T01:00:00,\n2020-01-01T02:00:00,-2.0\n")
+    chunk, = site.environment(csv)
+    names = [type(s).__name__ if s is not None else None for s in chunk.states]
+    assert names == ["HAT", None, "LAT"]
+    groups = {type(state).__name__: records for state, records in chunk.groups()}
+    assert set(groups) == {"HAT", "LAT"}
+    assert sum(len(r) for r in groups.values()) == 2
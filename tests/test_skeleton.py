@@ -1,25 +1,33 @@
+import importlib
+import pkgutil
+
 import pytest
 
-from hivemind.skeleton import fib, main
+import hivemind
 
 __author__ = "eelco van Vliet"
 __copyright__ = "eelco van Vliet"
 __license__ = "MIT"
 
 
-def test_fib():
-    """API Tests"""
-    assert fib(1) == 1
-    assert fib(2) == 1
-    assert fib(7) == 13
-    with pytest.raises(AssertionError):
-        fib(-10)
+OPTIONAL = {"hivemind.frame": "scipy"}
+
 
+@pytest.mark.parametrize("name", sorted(m.name for m in pkgutil.iter_modules(hivemind.__path__, "hivemind.")))
+def test_import(name):
+    """API Tests: every module imports"""
+    if name in OPTIONAL:
+        pytest.importorskip(OPTIONAL[name])
+    importlib.import_module(name)
 
-def test_main(capsys):
+
+def test_main(capsys, tmp_path):
     """CLI Tests"""
-    # capsys is a pytest fixture that allows asserts against stdout/stderr
-    # https://docs.pytest.org/en/stable/capture.html
-    main(["7"])
+    from hivemind.benchmark import main
+
+    baseline = tmp_path / "baseline.json"
+    assert main(["--sizes", "small", "--benchmarks", "periods", "--repeat", "1", "--save", str(baseline)]) == 0
     captured = capsys.readouterr()
-    assert "The 7-th Fibonacci number is 13" in captured.out
+    assert "periods" in captured.out and baseline.exists()
+    assert main(["--sizes", "small", "--benchmarks", "periods", "--repeat", "1", "--compare", str(baseline),
+                 "--tolerance", "100", "--memory-tolerance", "100"]) == 0
@@ -0,0 +1,297 @@
+import numpy as np
+import pytest
+
+from hivemind.implementation import MyDesign, MyNaval, MyNavalParameters, MyStructure
+from hivemind.abstracts import units
+from hivemind.sweep import Sweep, apply_overrides, grid, sample
+
+
+def build(design, naval):
+    return MyNaval(naval, MyStructure(design))
+
+
+def waterplane_area(naval):
+    return {"area": naval.get_hydrostatics(10).waterplane_area[0]}
+
+
+def base():
+    return {"design": MyDesign(), "naval": MyNavalParameters()}
+
+
+def test_overrides_copy_only_affected_sets():
+    sets = base()
+    out = apply_overrides(sets, {"Length": 80, "naval.WaterDepth": 50})
+    assert out["design"] is not sets["design"]
+    assert out["design"].Length["m"] == 80
+    assert sets["design"].Length["m"] == 100
+    assert out["naval"].WaterDepth["m"] == 50
+
+
+def test_unknown_parameter_fails_early():
+    with pytest.raises(KeyError):
+        Sweep(base(), build, waterplane_area, [{"Lenght": 80}])
+
+
+@pytest.mark.parametrize("processes", [1, 2])
+def test_sweep_grid(processes):
+    cases = grid(Length=[80, 100], Width=[30, 40])
+    table = Sweep(base(), build, waterplane_area, cases).run(processes=processes, chunksize=1)
+    assert len(table) == 4
+    np.testing.assert_array_equal(table["case"], np.arange(4))
+    np.testing.assert_allclose(table["area"], table["Length"]*table["Width"])
+
+
+def test_sample_within_bounds():
+    cases = sample(10, seed=1, Length=(80, 120))
+    values = np.array([c["Length"] for c in cases])
+    assert np.all((values >= 80) & (values <= 120))
+    # Latin hypercube: one sample per stratum
+    assert sorted(np.floor((values - 80) / 4).astype(int)) == list(range(10))
+
+
+def test_structure_cache_invalidation():
+    structure = MyStructure(MyDesign())
+    mesh = structure.get_mesh()
+    assert structure.get_mesh() is mesh
+    assert structure.cache_info().hits == 1
+
+    structure.parameters.Length["m"] = 80
+    changed = structure.get_mesh()
+    assert changed is not mesh
+    assert changed.bounds[1][0] == pytest.approx(40)
+
+    # same value in another unit hits the cache
+    structure.parameters.Length["mm"] = 80000
+    assert structure.get_mesh() is changed
+    info = structure.cache_info()
+    assert (info.hits, info.misses, info.currsize) == (2, 2, 1)
+
+
+def test_cache_is_thread_safe():
+    import pickle
+    from concurrent.futures import ThreadPoolExecutor
+
+    structure = MyStructure(MyDesign())
+    structure.cache_size = 2
+
+    def work(i):
+        for j in range(200):
+            if i == 0 and j % 10 == 0:
+                structure.cache_clear()
+            structure.get_mesh()
+        return True
+
+    with ThreadPoolExecutor(8) as pool:
+        assert all(pool.map(work, range(8)))
+    info = structure.cache_info()
+    assert info.hits + info.misses == 8*200
+
+    copy = pickle.loads(pickle.dumps(structure))
+    assert copy.get_mesh().n_panels == structure.get_mesh().n_panels
+
+
+def test_dependency_graph_recomputes_affected_nodes_only():
+    from concurrent.futures import ThreadPoolExecutor
+    from hivemind.graph import DependencyGraph
+    from hivemind.mooring import MooringSystem, MooringSystemParameters
+    from hivemind.site import Site, SiteParameters
+
+    site, mooring = Site(SiteParameters()), MooringSystem(MooringSystemParameters())
+    graph = DependencyGraph()
+    graph.add("level", lambda: site.state.water_level, sources=[site])
+    graph.add("lines", mooring.get_line_attributes, sources=[mooring])
+    graph.add("weight", lambda lines: lines["weight"].sum(), inputs=["lines"])
+    graph.add("summary", lambda level, weight: (level, weight), inputs=["level", "weight"])
+
+    with ThreadPoolExecutor(2) as pool:
+        first = graph.run(pool)
+        assert sorted(graph.computed) == ["level", "lines", "summary", "weight"]
+        assert graph.dirty() == []
+        graph.run(pool)
+        assert graph.computed == []
+
+        site.change_state("HAT")
+        assert graph.dirty() == ["level", "summary"]
+        graph.run(pool)
+        assert graph.computed == ["level", "summary"]
+        assert graph["summary"][0] == 1.5
+
+    mooring.parameters.MarineGrowthWeight[units.N/units.m] = 200
+    mooring.change_state("Weathered")
+    graph.run()
+    assert graph.computed == ["lines", "weight", "summary"]
+    assert graph["weight"] == pytest.approx(first["weight"] + 200*mooring.number_of_lines)
+
+
+def test_dependency_graph_threads_share_a_source():
+    from concurrent.futures import ThreadPoolExecutor
+    from hivemind.graph import DependencyGraph
+
+    naval = build(MyDesign(), MyNavalParameters())
+    graph = DependencyGraph()
+    graph.add("panels", lambda: naval.structure.get_mesh().n_panels, sources=[naval])
+    graph.add("area", lambda: naval.structure.get_mesh().areas.sum(), sources=[naval])
+    for length in [100, 80, 100]:
+        naval.structure.parameters.Length["m"] = length
+        with ThreadPoolExecutor(2) as pool:
+            results = graph.run(pool)
+        assert sorted(graph.computed) == ["area", "panels"]
+        assert results["area"] == pytest.approx(2*(length*40 + 40*40 + length*40))
+    info = naval.structure.cache_info()
+    assert info.hits + info.misses == 6
+
+
+def _store_mesh(args):
+    store, length = args
+    structure = MyStructure(MyDesign())
+    structure.result_store = store
+    structure.parameters.Length["m"] = length
+    return structure.get_mesh().n_panels
+
+
+def test_result_store_persists_across_instances(tmp_path):
+    from multiprocessing import Pool
+    from hivemind.store import ResultStore, result_key
+
+    store = ResultStore(tmp_path / "results.sqlite")
+    first = MyStructure(MyDesign())
+    first.result_store = store
+    mesh = first.get_mesh()
+    assert (store.hits, store.misses, len(store)) == (0, 1, 1)
+
+    # a new instance (e.g. after a restart) with equal parameters reads the stored mesh
+    second = MyStructure(MyDesign())
+    second.result_store = ResultStore(store.path)
+    np.testing.assert_array_equal(second.get_mesh().nodes, mesh.nodes)
+    assert second.result_store.hits == 1
+
+    second.parameters.Width["m"] = 30
+    assert result_key(second, "get_mesh") != result_key(first, "get_mesh")
+    second.get_mesh()
+    assert len(store) == 2
+
+    # concurrent writers
+    with Pool(2) as pool:
+        assert pool.map(_store_mesh, [(store, 60 + i) for i in range(6)]) == [mesh.n_panels]*6
+    assert len(store) == 8
+
+    store.evict(max_size=store.size // 2)
+    assert 0 < len(store) < 8
+    assert result_key(first, "get_mesh") not in store  # least recently used goes first
+
+
+def test_parameter_array_round_trip_and_stacking():
+    from hivemind.mooring import MooringSystemParameters
+    from hivemind.params import ParameterArray
+
+    parameters = MooringSystemParameters()
+    parameters.LineLength["km"] = 0.3
+    p = ParameterArray.compile(parameters)
+    assert p.LineLength == pytest.approx(300)
+    assert p["BundleSpread"] == 5  # angles stay in degrees
+    assert p.units[p.index["LineSubmergedWeight"]] == "kilogram / second ** 2"
+    assert p.NumberOfBundles == 3
+
+    sweep = Sweep({"design": MyDesign(), "naval": MyNavalParameters()}, build, waterplane_area,
+                  grid(Length=[80, 100], Width=[30, 40, 50]))
+    cases = sweep.parameter_arrays()["design"]
+    assert cases.values.shape == (6, 3)
+    np.testing.assert_allclose(cases.Length*cases.Width, [2400, 3200, 4000, 3000, 4000, 5000])
+
+    wider = p.with_values(LineLength=[200.0, 250.0])
+    assert len(wider) == 2
+    back = wider.to_parameter_sets(parameters)
+    assert back[0].LineLength["m"] == pytest.approx(200)
+    assert back[1].BundleSpread["deg"] == pytest.approx(5)
+    assert parameters.LineLength["m"] == pytest.approx(300)
+
+    fresh = MooringSystemParameters()
+    same = ParameterArray.compile(fresh).to_parameter_set(fresh)
+    assert all(q.is_default for q in same)
+    deeper = ParameterArray.compile(fresh).with_values(WaterDepth=120.0, BundleSpread=7.5).to_parameter_set(fresh)
+    assert not deeper.WaterDepth.is_default and deeper.LineLength.is_default
+    assert deeper.WaterDepth["m"] == pytest.approx(120) and deeper.BundleSpread["deg"] == pytest.approx(7.5)
+
+
+def distance_to_target(naval):
+    p = naval.structure.parameters
+    return (p.Length["m"] - 90)**2 + (p.Width["m"] - 35)**2
+
+
+def test_optimizer_finds_constrained_optimum():
+    from hivemind.optimize import Constraint, Optimizer
+
+    area = Constraint(lambda naval: waterplane_area(naval)["area"], upper=3000.0)
+    optimizer = Optimizer(base(), build, distance_to_target, bounds={"Length": (60, 120), "Width": (20, 50)},
+                          constraints={"area": area})
+    result = optimizer.run(iterations=6, batch_size=3, processes=1, seed=0)
+    assert result.evaluations == 6 + 6*3
+    assert result.feasible
+    assert result.parameters["Length"]*result.parameters["Width"] <= 3000
+
+    L = np.linspace(60, 120, 1201)
+    W = np.minimum(3000/L, 50)
+    W = np.clip(np.minimum(W, 35), 20, None)  # best width below the constraint
+    optimum = ((L - 90)**2 + (W - 35)**2).min()
+    assert result.objective < optimum + 0.5
+
+
+def failing_build(design, naval):
+    raise ValueError("no hull")
+
+
+def test_optimizer_without_successful_cases():
+    from hivemind.optimize import Optimizer
+
+    optimizer = Optimizer(base(), failing_build, distance_to_target, bounds={"Length": (60, 120)})
+    with pytest.raises(RuntimeError, match="No successful evaluations"):
+        optimizer.run(iterations=1, batch_size=2, processes=1, seed=0)
+    assert len(optimizer.history) == 4 + 2
+
+
+def hydrostatic_outputs(naval):
+    props = naval.get_hydrostatics([8.0, 10.0])
+    return {"area": props.waterplane_area, "volume": props.volume}
+
+
+@pytest.mark.parametrize("processes", [1, 2])
+def test_sensitivities_match_analytic_jacobian(processes):
+    from hivemind.sensitivity import sensitivities
+
+    s = sensitivities(base(), build, hydrostatic_outputs, ["Length", "Width", "WaterDepth"], processes=processes)
+    np.testing.assert_allclose(s.values, [100, 40, 100])
+    np.testing.assert_allclose(s.jacobian["area"], [[40, 100, 0]]*2, rtol=1e-9)
+    np.testing.assert_allclose(s.jacobian["volume"], [[320, 800, 0], [400, 1000, 0]], rtol=1e-9)
+    assert s.matrix().shape == (4, 3)
+    np.testing.assert_allclose(s.relative()["volume"][:, :2], 1.0, rtol=1e-9)
+
+
+def test_sensitivities_baseline_on_built_object():
+    from hivemind.sensitivity import sensitivities
+
+    builds = []
+    def counting_build(**sets):
+        builds.append(sets)
+        return build(**sets)
+
+    naval = build(**base())
+    s = sensitivities(base(), counting_build, hydrostatic_outputs, ["Length", "Width"], built=naval, processes=1)
+    assert len(builds) == 2*4  # perturbed cases only
+    np.testing.assert_allclose(s.baseline["area"], hydrostatic_outputs(naval)["area"])
+
+
+def test_benchmark_baseline_comparison(tmp_path):
+    from hivemind import benchmark
+
+    results = benchmark.run(sizes=["small"], names=["mesh", "mooring"], repeat=1)
+    assert [(r.name, r.size) for r in results] == [("mesh", "small"), ("mooring", "small")]
+    assert all(r.seconds > 0 and r.peak_memory > 0 for r in results)
+
+    file = benchmark.save(results, tmp_path / "baseline.json")
+    assert benchmark.load(file) == results
+    assert benchmark.compare(results, benchmark.load(file)) == []
+
+    slower = [results[0]._replace(seconds=2*results[0].seconds), results[1]]
+    regressions = benchmark.compare(slower, results)
+    assert [(r.name, r.metric) for r in regressions] == [("mesh", "seconds")]
+    assert regressions[0].ratio == pytest.approx(2)